@@ -6,6 +6,13 @@
 // Initialize Socket.IO connection
 const socket = io();
 
+// Camera shown by this dashboard (select with ?camera_id=N in the page URL)
+const CAMERA_ID = parseInt(new URLSearchParams(window.location.search).get('camera_id') || '0', 10);
+
+// Glare histogram encoding requested from the server: 'uint16' (256 bins), 'buckets26'
+// (26 bins, smallest) or 'float'. Select with ?histogram=buckets26 on thin links.
+const HISTOGRAM_FORMAT = new URLSearchParams(window.location.search).get('histogram') || 'uint16';
+
 // DOM Elements
 const statusBadge = document.getElementById('statusBadge');
 const alertBanner = document.getElementById('alertBanner');
@@ -187,7 +194,7 @@ function dismissRepositionAlert() {
     repositionAlertModal.classList.add('hidden');
     systemState.repositionAlertShownThisCycle = false;  // Reset flag
     // Tell backend that alert was dismissed so it can reset tracking
-    socket.emit('dismiss_reposition_alert');
+    socket.emit('dismiss_reposition_alert', { camera_id: CAMERA_ID });
 }
 
 function checkAndClearAlerts() {
@@ -226,6 +233,70 @@ function updateAudioIndicator(isRecording) {
 socket.on('connect', () => {
     console.log('Connected to server');
     addLogEntry('Connected to Aegis server', 'secure');
+    // (Re)subscribe to the binary frame push and compact detection updates on every connect
+    socket.emit('subscribe_frames', { camera_id: CAMERA_ID, streams: ['raw', 'processed'] });
+    detectionState = {};
+    const channels = ['blur', 'shake', 'reposition', 'glare', 'liveness'];
+    if (glareHistogramContainer) channels.push('histogram');
+    socket.emit('subscribe_detection', {
+        camera_id: CAMERA_ID,
+        channels: channels,
+        histogram: HISTOGRAM_FORMAT,
+        delta: true
+    });
+});
+
+// Latest detection data of this camera, rebuilt from full and delta updates
+let detectionState = {};
+
+/**
+ * Merge a detection_update into detectionState. Delta updates carry only the
+ * fields that changed, and null for sections or fields that are gone; a full
+ * update (delta: false) replaces the state.
+ */
+function mergeDetectionUpdate(update) {
+    if (update.delta === false) detectionState = {};
+    for (const [key, value] of Object.entries(update)) {
+        if (value === null) {
+            delete detectionState[key];
+        } else if (typeof value === 'object' && !Array.isArray(value) && !(value instanceof ArrayBuffer)) {
+            const section = Object.assign(detectionState[key] || {}, value);
+            for (const [field, fieldValue] of Object.entries(value)) {
+                if (fieldValue === null) delete section[field];
+            }
+            detectionState[key] = section;
+        } else {
+            detectionState[key] = value;
+        }
+    }
+    const glare = detectionState.glare;
+    if (glare && glare.histogram instanceof ArrayBuffer) {
+        // Binary histograms are little-endian uint16 counts
+        glare.histogram = Array.from(new Uint16Array(glare.histogram));
+    }
+    return detectionState;
+}
+
+// Object URLs currently shown by each feed, revoked once the next frame has loaded
+const frameUrls = { raw: null, processed: null };
+
+// Binary JPEG pushed by the server. The server sends the next frame of a stream
+// only after this one is acknowledged, so ack once the image has been decoded.
+socket.on('frame', (msg, ack) => {
+    const img = msg.stream === 'processed' ? processedFeed : rawFeed;
+    if (msg.camera_id !== CAMERA_ID || !img) {
+        if (ack) ack();
+        return;
+    }
+
+    const previousUrl = frameUrls[msg.stream];
+    const url = URL.createObjectURL(new Blob([msg.jpeg], { type: 'image/jpeg' }));
+    frameUrls[msg.stream] = url;
+    img.onload = img.onerror = () => {
+        if (previousUrl) URL.revokeObjectURL(previousUrl);
+        if (ack) ack();
+    };
+    img.src = url;
 });
 
 socket.on('disconnect', () => {
@@ -234,8 +305,10 @@ socket.on('disconnect', () => {
     triggerAlert('CONNECTION', 'Lost connection to server');
 });
 
-socket.on('detection_update', (data) => {
-    console.log('Detection update received:', data);
+socket.on('detection_update', (update) => {
+    if (update.camera_id !== undefined && update.camera_id !== CAMERA_ID) return;
+    const data = update.delta === undefined ? update : mergeDetectionUpdate(update);
+    console.log('Detection update received:', update);
     
     if (data.blur) {
         const blurStatus = data.blur.detected ? 'alert' : 'secure';
@@ -387,6 +460,7 @@ socket.on('status_update', (data) => {
 });
 
 socket.on('sensor_states', (data) => {
+    if (data.camera_id !== undefined && data.camera_id !== CAMERA_ID) return;
     console.log('Received sensor states:', data);
     
     // Update all checkboxes (both settings tab and inline) to match backend state
@@ -461,6 +535,7 @@ document.addEventListener('DOMContentLoaded', () => {
             
             // Send to backend
             socket.emit('set_sensor_enabled', {
+                camera_id: CAMERA_ID,
                 sensor: sensor,
                 enabled: enabled
             });
@@ -470,25 +545,28 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 
     // Request initial sensor states from backend
-    socket.emit('get_sensor_states');
+    socket.emit('get_sensor_states', { camera_id: CAMERA_ID });
 
     startVideoStream();
 });
 
+let videoStreamStarted = false;
+
 function startVideoStream() {
-    setInterval(() => {
-        const timestamp = new Date().getTime();
-        rawFeed.src = `/video_frame?t=${timestamp}`;
-    }, 100);
+    if (videoStreamStarted) return;
+    videoStreamStarted = true;
 
+    // Frames arrive as Socket.IO 'frame' events; poll the HTTP snapshot only while disconnected
     setInterval(() => {
+        if (socket.connected) return;
         const timestamp = new Date().getTime();
-        processedFeed.src = `/processed_frame?t=${timestamp}`;
+        rawFeed.src = `/video_frame?camera_id=${CAMERA_ID}&t=${timestamp}`;
+        processedFeed.src = `/processed_frame?camera_id=${CAMERA_ID}&t=${timestamp}`;
     }, 100);
     
     // Poll the HTTP API for detection data as fallback
     setInterval(() => {
-        fetch('/api/detection')
+        fetch(`/api/detection?camera_id=${CAMERA_ID}`)
             .then(response => {
                 if (!response.ok) throw new Error('Network response was not ok');
                 return response.json();
@@ -809,6 +887,7 @@ document.addEventListener('DOMContentLoaded', () => {
             
             // Send to backend
             socket.emit('set_sensor_enabled', {
+                camera_id: CAMERA_ID,
                 sensor: sensor,
                 enabled: enabled
             });
@@ -818,7 +897,7 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 
     // Request initial sensor states from backend
-    socket.emit('get_sensor_states');
+    socket.emit('get_sensor_states', { camera_id: CAMERA_ID });
     
     // Setup video validation
     setupVideoValidation();
@@ -3,39 +3,32 @@ AEGIS: Active Defense System - Main Flask Server
 Streams live video feed with tamper detection and real-time alerts via Socket.IO
 """
 
-from flask import Flask, render_template, Response, send_from_directory, send_file, request, jsonify
+from flask import Flask, render_template, Response, send_from_directory, send_file, request, jsonify, stream_with_context
 from flask_socketio import SocketIO, emit
-import cv2
 import numpy as np
-from backend import tamper_detector
-from backend.tamper_detector import fix_blur_unsharp_mask
+import argparse
+import json
+import math
 import os
+import sys
 import threading
 import time
 import speech_recognition
 from werkzeug.utils import secure_filename
 
 # Import backend modules
-from backend.database import aegis_db, save_glare_image, get_incident_description
+from backend.database import (aegis_db, get_incident_description, INCIDENT_PAGE_LIMIT,
+                              encode_incident_cursor, decode_incident_cursor)
 from backend.watermark_validator import validate_video
-from backend.watermark_embedder import get_watermark_embedder
 from backend.pocketsphinx_recognizer import get_pocketsphinx_recognizer, is_pocketsphinx_available
-
-# Try to import glare rescue functions, but make them optional
-try:
-    # <--- FIX 1: Only import functions that exist in your new file ---
-    from backend.glare_rescue import (
-        apply_unsharp_mask, 
-        get_image_viability_stats
-    )
-    GLARE_RESCUE_AVAILABLE = True
-except ImportError as e:
-    print(f"Warning: Glare rescue functions not available: {e}")
-    GLARE_RESCUE_AVAILABLE = False
-    # Dummy functions
-    def apply_unsharp_mask(frame, amount=1.0):
-        return frame
-    def get_image_viability_stats(frame, **kwargs): return False, 0, 0, 0, None, None
+from backend.camera_pipeline import BLUR_THRESHOLD, SHAKE_THRESHOLD
+from backend.tamper_detector import MOTION_ENGINES
+from backend.pipeline_supervisor import DEFAULT_JPEG_QUALITY, PipelineSupervisor
+from backend.frame_push import FRAME_STREAMS, FramePusher
+from backend.emit_queue import EmitQueue
+from backend.detection_channels import DetectionChannels
+from backend.retention import RetentionPolicy, RetentionWorker, enable_incremental_vacuum
+from backend.metrics_store import MetricsStore
 
 
 # ============================================================================
@@ -49,70 +42,43 @@ app = Flask(__name__,
 
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-# Configuration
-BLUR_THRESHOLD = 25.0
-SHAKE_THRESHOLD = 5.0
-REPOSITION_THRESHOLD = 7.0  # Threshold for directional shift magnitude - reduced false positives
-CAMERA_INDEX = 0
-BLUR_FIX_ENABLED = True
-BLUR_FIX_STRENGTH = 5
-GLARE_RESCUE_ENABLED = True  # This is controlled by sensor_config
-GLARE_RESCUE_MODE = 'MSR'  # This is controlled by sensor_config
-
-# <--- FIX 2: Use your tuned CLAHE parameters ---
-if GLARE_RESCUE_AVAILABLE:
-    clahe = cv2.createCLAHE(clipLimit=16.0, tileGridSize=(4, 4))
-else:
-    clahe = None
-
-# Sensor enable/disable configuration - all enabled by default
-sensor_config = {
-    'blur': True,           # Blur detection
-    'shake': True,          # Shake detection
-    'glare': True,          # Glare detection
-    'liveness': True,       # Liveness detection
-    'reposition': True,     # Reposition detection
-    'blur_fix': True,       # Blur correction
-    'glare_rescue': True,   # Glare rescue
-    'audio_alerts': True,    # Audio alerts/logging
-    'glare_rescue_mode': 'CLAHE' # <--- NEW: Add glare_rescue_mode here
-}
-sensor_config_lock = threading.Lock()  # Thread-safe config updates
-
-# Liveness detection configuration
-LIVENESS_THRESHOLD = 3.0        # LOW threshold: detects freezing/static feed
-BLACKOUT_BRIGHTNESS_THRESHOLD = 25.0  # Mean pixel intensity threshold for blackout (0-255 range)
-LIVENESS_CHECK_INTERVAL = 3.0   # Time (in seconds) between capturing a new reference frame
-LIVENESS_ACTIVATION_TIME = 10.0 # Time (s) after startup before "FROZEN FEED ALERT" becomes active
+# Camera results are emitted from a sender thread so the result path never waits on clients
+emit_queue = EmitQueue(socketio, app)
+# Per-client detection_update channels (subscribe_detection); others get the full broadcast
+detection_channels = DetectionChannels(socketio)
+
+# Camera configuration: camera_id -> frame source spec. A spec is a webcam index,
+# a video file path, an image directory, or 'synthetic[:blur@30-60,glare@90-120]'
+# (see backend/frame_sources.py). Override from the command line with --source.
+CAMERA_SOURCES = {0: 0}
+DEFAULT_CAMERA_ID = 0
+# 'process' runs each camera pipeline in its own worker process (uses all cores),
+# 'thread' keeps every pipeline inside the server process
+PIPELINE_MODE = 'process'
+# Per-camera sensor_config overrides: camera_id -> {key: value}, e.g.
+# {1: {'motion_engine': 'phase'}} runs camera 1 on phase correlation
+CAMERA_SENSOR_CONFIG = {}
+# CameraPipeline tuning for every camera, in both modes, e.g. {'analysis_max_width': 480,
+# 'detector_cadence': {'glare': 2}, 'detector_budget_ms': {'motion': 12.0}}
+PIPELINE_OPTIONS = {}
+
+# MJPEG streams (/video_feed, /processed_feed)
+MJPEG_QUALITY = 95          # JPEG quality (OpenCV's default)
+MJPEG_MAX_FPS = 15.0        # Per-client frame rate cap; clients may ask for less with ?max_fps=
+MJPEG_IDLE_TIMEOUT = 1.0    # Seconds to wait for a new frame before re-checking the pipeline
+
+# Socket.IO frame push ('frame' events, see backend/frame_push.py)
+PUSH_MAX_FPS = 15.0         # Per-client frame rate cap; clients may ask for less in subscribe_frames
 
 # Global variables
-cap = None
-prev_gray = None
-current_frame = None  # Raw frame without text
-processed_frame = None  # Frame with detection text
-frame_lock = threading.Lock()
-reposition_alert_active = False
-reposition_alert_shown = False  # Track if we've already shown the alert for this event
-reposition_alert_frames = 0
-
-# Liveness detection globals
-liveness_reference_frame = None
-liveness_reference_time = None
-liveness_startup_time = None
-liveness_is_frozen = False
-liveness_status_text = "INITIALIZING"
-
-# Initialize frames with blank black images (640x480) so they display while loading
-current_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-processed_frame = np.zeros((480, 640, 3), dtype=np.uint8)
+supervisor = None
 
 # Audio logging globals
 LOG_AUDIO_SUBTITLES = False
 audio_logging_lock = threading.Lock()
-detection_data_cache = None
+tampered_cameras = {}  # Camera currently reporting a tamper (audio trigger) -> its tamper incident id
 
 # Incident tracking globals
-current_incident_id = None
 last_detection_timestamp = None
 detection_tracking_lock = threading.Lock()
 
@@ -126,37 +92,67 @@ if not os.path.exists(UPLOAD_FOLDER):
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB max file size
 
-def initialize_camera():
-    """Initialize the camera capture object."""
-    global cap
+# Incident retention (see backend/retention.py): limits set to None are not enforced.
+# Override from the command line with --retention-days, --retention-max-incidents, --retention-max-gb.
+RETENTION_POLICY = RetentionPolicy(max_age_days=30, max_incidents=100000, max_storage_bytes=5 * 1024 ** 3)
+retention_worker = RetentionWorker(aegis_db, RETENTION_POLICY)
+
+# Per-frame detector metrics time series (see backend/metrics_store.py), served by /api/metrics/history
+metrics_store = MetricsStore()
+
+def initialize_cameras():
+    """Create the pipeline supervisor and start one pipeline per camera."""
+    global supervisor
     
-    cap = cv2.VideoCapture(CAMERA_INDEX)
+    emit_queue.start()
+    supervisor = PipelineSupervisor(CAMERA_SOURCES, on_result=handle_pipeline_result, mode=PIPELINE_MODE,
+                                    sensor_configs=CAMERA_SENSOR_CONFIG, pipeline_options=PIPELINE_OPTIONS)
     
-    if not cap.isOpened():
-        print("Error: Could not open camera.")
+    if not supervisor.start():
+        print("Error: Could not open any camera.")
         return False
     
-    # Set camera resolution
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-    cap.set(cv2.CAP_PROP_FPS, 30)
-    
-    print("Camera initialized successfully.")
+    print(f"Camera pipelines started ({len(CAMERA_SOURCES)} camera(s), mode: {PIPELINE_MODE}).")
     return True
 
-def record_detection(detection_type, timestamp):
+def get_request_camera_id():
+    """Read the camera id from the request (?camera_id=N), defaulting to the first camera."""
+    return request.args.get('camera_id', DEFAULT_CAMERA_ID, type=int)
+
+def get_request_number(name, cast, default=None):
+    """
+    Read a numeric query parameter with cast (int or float).
+    Unlike request.args.get(type=...), a malformed value raises ValueError instead of
+    falling back to the default.
+    """
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        number = cast(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be finite, got {value!r}")
+    return number
+
+def get_feed(camera_id):
+    """Return the CameraFeed for a camera id, or None if unknown."""
+    if supervisor is None:
+        return None
+    return supervisor.get_feed(camera_id)
+
+frame_pusher = FramePusher(socketio, get_feed, max_fps=PUSH_MAX_FPS)
+
+def record_detection(detection_type, timestamp, camera_id):
     """
     Record a detection incident to the database.
-    Groups same-type detections within 5 seconds as one incident.
+    Groups same-type detections on the same camera within 5 seconds as one incident;
+    the id is returned immediately while the row is written behind.
     """
-    global current_incident_id
-    
     with detection_tracking_lock:
         description = get_incident_description(detection_type)
-        incident_id = aegis_db.record_detection(detection_type, timestamp, description)
-        current_incident_id = incident_id
-    
-    return incident_id
+        return aegis_db.record_detection(detection_type, timestamp, description, camera_id)
 
 def audio_logging_thread():
     """
@@ -183,6 +179,8 @@ def audio_logging_thread():
         # Thread-safe check of audio logging flag
         with audio_logging_lock:
             should_log = LOG_AUDIO_SUBTITLES
+            # Speech is attached to the latest tamper incident of the cameras that triggered logging
+            incident_id = max(tampered_cameras.values(), default=None)
         
         if should_log:
             try:
@@ -216,7 +214,7 @@ def audio_logging_thread():
                     # Save audio log to database
                     audio_timestamp = time.time()
                     try:
-                        aegis_db.add_audio_log(text, audio_timestamp, current_incident_id)
+                        aegis_db.add_audio_log(text, audio_timestamp, incident_id)
                         print(f"[AUDIO] ✓ Audio log saved to database")
                     except Exception as e:
                         print(f"[AUDIO] ✗ Error saving audio log: {e}")
@@ -238,340 +236,107 @@ def audio_logging_thread():
         else:
             time.sleep(0.5)  # Sleep when not logging
 
-def camera_thread():
+def handle_pipeline_result(feed, detection_data, detections, glare_image_path, current_time):
     """
-    Continuously capture frames and run detections.
-    This runs in a separate thread to avoid blocking.
+    Apply the side effects of one processed frame in the server process:
+    database records, glare image metadata, audio logging trigger and Socket.IO updates.
+    Called by the PipelineSupervisor for every frame of every camera.
     """
-    global prev_gray, current_frame, processed_frame, frame_lock, detection_data_cache
-    global liveness_reference_frame, liveness_reference_time, liveness_startup_time
-    global liveness_is_frozen, liveness_status_text, clahe
-    
-    print("[CAMERA] Camera thread starting...")
-    
-    if cap is None:
-        print("[CAMERA] ERROR: Camera not initialized!")
-        return
+    global LOG_AUDIO_SUBTITLES
     
-    ret, first_frame = cap.read()
-    if not ret:
-        print("[CAMERA] Error: Could not read first frame.")
-        return
+    camera_id = feed.camera_id
+    sensor_enabled = feed.sensor_config
     
-    prev_gray = cv2.cvtColor(first_frame, cv2.COLOR_BGR2GRAY)
-    liveness_reference_frame = cv2.cvtColor(first_frame, cv2.COLOR_BGR2GRAY)
-    liveness_reference_time = time.time()
-    liveness_startup_time = time.time()  # Grace period tracker
-    frame_count = 0
+    metrics_store.record(camera_id, detection_data, current_time)
     
-    print("[CAMERA] Camera thread initialized successfully. Starting main loop...")
-    print(f"[CAMERA] Frame size: {first_frame.shape}")
+    # --- RECORD DETECTIONS TO DATABASE ---
+    incident_ids = {}  # detection type -> incident it was grouped into
+    for detection_type in detections:
+        incident_ids[detection_type] = record_detection(detection_type, current_time, camera_id)
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("[CAMERA] Error: Could not read frame.")
-            break
-        
-        frame_count += 1
-        if frame_count == 1:
-            print("[CAMERA] ✓ First frame captured! Stream is live.")
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        current_time = time.time()
-        
-        # --- RUN DETECTIONS ---
-        is_blurred, blur_variance = tamper_detector.check_blur(gray, threshold=BLUR_THRESHOLD)
-        is_shaken, shake_magnitude = tamper_detector.check_shake(gray, prev_gray, threshold=SHAKE_THRESHOLD)
-        is_repositioned, shift_magnitude, shift_x, shift_y = tamper_detector.detect_camera_reposition(
-            gray, prev_gray, threshold_shift=REPOSITION_THRESHOLD
-        )
-        
-        # <--- FIX 3: Replace old glare check with the robust one ---
-        # is_glare, glare_percentage, glare_histogram = tamper_detector.check_glare(frame, threshold_pct=10.0) # <--- DELETED
-        
-        # Read sensor configuration (thread-safe)
-        with sensor_config_lock:
-            sensor_enabled = sensor_config.copy()
-
-        if GLARE_RESCUE_AVAILABLE and sensor_enabled['glare']:
-            # Use your tuned thresholds
-            is_glare, dark_pct, mid_pct, bright_pct, hist_for_plot, _ = get_image_viability_stats(
-                frame, dark_thresh=50, bright_thresh=252
-            )
-        else:
-            is_glare, dark_pct, mid_pct, bright_pct, hist_for_plot = False, 0.0, 100.0, 0.0, None
-        
-        # --- LIVENESS DETECTION ---
-        diff_frame = cv2.absdiff(gray, liveness_reference_frame)
-        mean_diff = np.mean(diff_frame)
-        mean_brightness = np.mean(gray)
-        
-        # Check if grace period (10s startup) has passed
-        is_liveness_active = (current_time - liveness_startup_time) > LIVENESS_ACTIVATION_TIME
-        
-        # Determine liveness state - frozen feed and blackout detection
-        is_blackout = mean_brightness < BLACKOUT_BRIGHTNESS_THRESHOLD
-        is_frozen = False
-        
-        if is_liveness_active and mean_diff < LIVENESS_THRESHOLD:
-            is_frozen = True
-        
-        # Update liveness status text
-        if is_blackout:
-            liveness_status_text = "BLACKOUT DETECTED"
-        elif is_frozen:
-            liveness_status_text = "FROZEN FEED ALERT"
-        elif not is_liveness_active:
-            time_left = LIVENESS_ACTIVATION_TIME - (current_time - liveness_startup_time)
-            liveness_status_text = f"INITIALIZING... ({time_left:.1f}s)"
-        else:
-            liveness_status_text = "LIVE"
-        
-        # Update reference frame if check interval has passed
-        if current_time - liveness_reference_time >= LIVENESS_CHECK_INTERVAL:
-            liveness_reference_frame = gray.copy()
-            liveness_reference_time = current_time
-        
-        # Store frozen state globally
-        liveness_is_frozen = is_frozen
-        
-        # Respect sensor configuration - disable detections if sensor is disabled
-        if not sensor_enabled['blur']:
-            is_blurred = False
-        if not sensor_enabled['shake']:
-            is_shaken = False
-        if not sensor_enabled['glare']:
-            is_glare = False
-        if not sensor_enabled['liveness']:
-            is_frozen = is_blackout = False
-            liveness_status_text = "INITIALIZING"
-        if not sensor_enabled['reposition']:
-            is_repositioned = False
-        
-        # Determine if ANY tamper is detected (for audio logging trigger)
-        any_tamper_detected = is_blurred or is_shaken or is_glare or is_frozen or is_blackout
-        
-        # --- RECORD DETECTIONS TO DATABASE ---
-        if is_blurred:
-            record_detection('blur', current_time)
-        if is_shaken:
-            record_detection('shake', current_time)
-        if is_glare:
-            record_detection('glare', current_time)
-        if is_repositioned:
-            record_detection('reposition', current_time)
-        if is_frozen:
-            record_detection('freeze', current_time)
-        if is_blackout:
-            record_detection('blackout', current_time)
-        
-        # Manage repositioning alert state
-        global reposition_alert_active, reposition_alert_shown, reposition_alert_frames
-        if is_repositioned:
-            reposition_alert_frames = 0
-            # Only set alert_active ONCE per repositioning event
-            if not reposition_alert_shown:
-                reposition_alert_shown = True
-                reposition_alert_active = True  # Send alert to frontend ONLY on first detection
-                print(f"🚨 REPOSITION DETECTED - Magnitude: {shift_magnitude:.2f}px, Shift: ({shift_x:.2f}, {shift_y:.2f})")
-            else:
-                # Motion still detected but we've already shown alert, keep it inactive
-                reposition_alert_active = False
-        else:
-            reposition_alert_frames += 1
-            if reposition_alert_frames > 30:  # Clear alert after 30 frames without detection
-                reposition_alert_shown = False  # Reset flag when motion fully stops
-            # Always keep alert inactive when motion isn't detected
-            reposition_alert_active = False
-        
-        # <--- FIX 4: Populate detection_data with the NEW glare stats ---
-        detection_data = {
-            'blur': {
-                'detected': bool(is_blurred),
-                'variance': float(blur_variance)
-            },
-            'shake': {
-                'detected': bool(is_shaken),
-                'magnitude': float(shake_magnitude)
-            },
-            'reposition': {
-                'detected': bool(is_repositioned),
-                'magnitude': float(shift_magnitude),
-                'shift_x': float(shift_x),
-                'shift_y': float(shift_y),
-                'alert_active': bool(reposition_alert_active)
-            },
-            'glare': {
-                'detected': bool(is_glare),
-                'dark_pct': float(dark_pct),
-                'mid_pct': float(mid_pct),
-                'bright_pct': float(bright_pct),
-                'histogram': hist_for_plot.tolist() if hist_for_plot is not None else []
-            },
-            'liveness': {
-                'frozen': bool(is_frozen),
-                'blackout': bool(is_blackout),
-                'status': liveness_status_text,
-                'mean_diff': float(mean_diff),
-                'mean_brightness': float(mean_brightness),
-                'is_active': bool(is_liveness_active)
-            }
-        }
-        
-        # --- AUDIO LOGGING TRIGGER ---
-        # Audio logging is triggered when ANY tamper (blur, shake, glare) is detected
-        global LOG_AUDIO_SUBTITLES
-        should_enable_audio = any_tamper_detected and sensor_enabled['audio_alerts']
-        
-        with audio_logging_lock:
-            current_audio_state = LOG_AUDIO_SUBTITLES
-        
-        if should_enable_audio:
-            if not current_audio_state:
-                with audio_logging_lock:
-                    LOG_AUDIO_SUBTITLES = True
-                print(f"[TRIGGER] ✓ Audio logging ENABLED - Detections: Blur={is_blurred}, Shake={is_shaken}, Glare={is_glare}, Frozen={is_frozen}")
-                try:
-                    with app.app_context():
-                        socketio.emit('alert', {
-                            'type': 'AUDIO_LOGGING',
-                            'message': 'ALERT: TAMPER DETECTED! Audio logging engaged.'
-                        }, namespace='/', skip_sid=None)
-                except Exception as e:
-                    print(f"[TRIGGER] ✗ Error emitting alert: {e}")
-        else:
-            if current_audio_state:
-                with audio_logging_lock:
-                    LOG_AUDIO_SUBTITLES = False
-                print(f"[TRIGGER] ✓ Audio logging DISABLED - No tampering detected")
-                try:
-                    with app.app_context():
-                        socketio.emit('alert_clear', {}, namespace='/', skip_sid=None)
-                except Exception as e:
-                    print(f"[TRIGGER] ✗ Error emitting alert_clear: {e}")
-        
-        # Cache detection data
-        detection_data_cache = detection_data
-        
-        # Emit detection update to all connected clients (every 3 frames to reduce jank)
-        if frame_count % 3 == 0:
-            try:
-                with app.app_context():
-                    socketio.emit('detection_update', detection_data, namespace='/', skip_sid=None)
-                if frame_count % 30 == 0:
-                    print(f"Emitted detection data: Blur={blur_variance:.2f}, Shake={shake_magnitude:.2f}, Dark%={dark_pct:.1f}")
-            except Exception as e:
-                print(f"Error emitting detection data: {e}")
-        
-        # --- GLARE RESCUE (Applied FIRST, before blur fixing) ---
-        frame_for_processing = frame.copy()  # Start with original frame
-        
-        # <--- FIX 5: Replaced rescue block with your tuned CLAHE pipeline ---
-        if is_glare and sensor_enabled['glare_rescue'] and clahe is not None:
-            try:
-                with sensor_config_lock:
-                    current_mode = sensor_config.get('glare_rescue_mode', 'CLAHE')
-                print(f"[GLARE] Applying glare rescue (mode: {current_mode})...")
-
-                if current_mode == 'CLAHE':
-                    # --- 1. CLAHE Rescue ---
-                    lab_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
-                    l, a, b = cv2.split(lab_frame)
-                    l_clahe = clahe.apply(l) # Use global clahe object
-                    enhanced_lab_frame = cv2.merge((l_clahe, a, b))
-                    clahe_rescued_frame = cv2.cvtColor(enhanced_lab_frame, cv2.COLOR_LAB2BGR)
-                    
-                    # --- 2. Sharpening ---
-                    processed_frame_clahe = apply_unsharp_mask(clahe_rescued_frame, amount=1.0)
-                    
-                    # --- 3. TAME HIGHLIGHTS (Your Hack) ---
-                    gray_raw = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                    ret, mask = cv2.threshold(gray_raw, 252, 255, cv2.THRESH_BINARY)
-                    # Set those pixels to a neutral gray
-                    processed_frame_clahe[mask > 0] = (150, 150, 150) 
-                    
-                    frame_for_processing = processed_frame_clahe # Set as final frame
-                    print(f"[GLARE] CLAHE + Tame rescue applied successfully!")
-
-                elif current_mode == 'MSR':
-                    # --- MSR Rescue (DITCHED) ---
-                    print(f"[GLARE] MSR mode selected, but not applying (as requested).")
-                    frame_for_processing = frame.copy() # Just pass the raw frame
-                
-                # Save glare image to storage and database
-                try:
-                    file_path = save_glare_image(frame_for_processing, dark_pct, current_time) # Use dark_pct
-                    aegis_db.add_glare_image(file_path, dark_pct, current_time, current_incident_id)
-                    print(f"[GLARE] ✓ Rescued image saved: {file_path}")
-                except Exception as e:
-                    print(f"[GLARE] ✗ Error saving glare image: {e}")
-                        
-            except Exception as e:
-                print(f"[GLARE] Rescue error: {e}")
-                frame_for_processing = frame.copy()
-        
-        # Create processed frame with blur fixing (applied AFTER glare rescue)
-        if sensor_enabled['blur_fix']:
-            # Always apply unsharp masking, but dynamically adjust strength
-            if blur_variance < 50:
-                dynamic_strength = 8.5  # Very blurry - maximum sharpening
-            elif blur_variance < 100:
-                dynamic_strength = 3 + (100 - blur_variance) / 8  # Scale between 5.0-8.5
-            else:
-                dynamic_strength = max(3, 8.5 - (blur_variance - 100) / 40)  # Scale down
-            
-            # Apply unsharp masking with dynamic strength
-            processed_frame_final = fix_blur_unsharp_mask(frame_for_processing, kernel_size=5, sigma=1.0, strength=dynamic_strength)
-        else:
-            # Blur fix disabled, use glare-rescued frame as-is
-            processed_frame_final = frame_for_processing
-        
-        # --- EMBED WATERMARK ON PROCESSED FRAME ---
+    if glare_image_path:
         try:
-            watermark_embedder = get_watermark_embedder()
-            processed_frame_final = watermark_embedder.embed(processed_frame_final)
+            aegis_db.add_glare_image(glare_image_path, detection_data['glare']['dark_pct'], current_time,
+                                     incident_ids.get('glare'))
         except Exception as e:
-            print(f"[WATERMARK] Error embedding watermark: {e}")
-        
-        # Update previous frame
-        prev_gray = gray
-        
-        # Store frames for streaming
-        with frame_lock:
-            current_frame = frame.copy()  # Raw unmodified frame
-            processed_frame = processed_frame_final.copy()  # Frame with glare rescue + blur fix + watermark
-        
-        # Small delay to prevent CPU overload
-        if frame_count % 10 == 0:
-            print(f"Frame {frame_count}: Blur={blur_variance:.2f}, Shake={shake_magnitude:.2f}")
-        
-        # Sleep briefly to avoid 100% CPU usage (~30 FPS)
-        time.sleep(0.01)
-
-def gen_frames():
+            print(f"[GLARE] ✗ Error saving glare image: {e}")
+    
+    # --- AUDIO LOGGING TRIGGER ---
+    # Audio logging is triggered when ANY tamper (blur, shake, glare, liveness) is detected on ANY camera
+    tamper_incidents = [incident_ids[d] for d in detections if d in ('blur', 'shake', 'glare', 'freeze', 'blackout')]
+    with audio_logging_lock:
+        if tamper_incidents and sensor_enabled['audio_alerts']:
+            tampered_cameras[camera_id] = max(tamper_incidents)
+        else:
+            tampered_cameras.pop(camera_id, None)
+        should_enable_audio = bool(tampered_cameras)
+        current_audio_state = LOG_AUDIO_SUBTITLES
+    
+    if should_enable_audio:
+        if not current_audio_state:
+            with audio_logging_lock:
+                LOG_AUDIO_SUBTITLES = True
+            print(f"[TRIGGER] ✓ Audio logging ENABLED - Camera {camera_id} detections: {', '.join(detections)}")
+            emit_queue.emit('alert', {
+                'type': 'AUDIO_LOGGING',
+                'camera_id': camera_id,
+                'message': 'ALERT: TAMPER DETECTED! Audio logging engaged.'
+            })
+    else:
+        if current_audio_state:
+            with audio_logging_lock:
+                LOG_AUDIO_SUBTITLES = False
+            print(f"[TRIGGER] ✓ Audio logging DISABLED - No tampering detected")
+            emit_queue.emit('alert_clear', {'camera_id': camera_id})
+    
+    # Emit detection update to all connected clients (every 3 frames to reduce jank).
+    # Only the newest update per camera waits in the queue; older ones are replaced.
+    feed.results_received += 1
+    if feed.results_received % 3 == 0:
+        emit_queue.emit('detection_update', detection_data, coalesce_key=('detection_update', camera_id),
+                        send=detection_channels.publish)
+        if feed.results_received % 30 == 0:
+            print(f"[CAMERA {camera_id}] Emitted detection data: Blur={detection_data['blur']['variance']:.2f}, "
+                  f"Shake={detection_data['shake']['magnitude']:.2f}, Dark%={detection_data['glare']['dark_pct']:.1f}")
+
+def get_request_max_fps():
+    """Per-client MJPEG frame rate from ?max_fps=, capped at MJPEG_MAX_FPS."""
+    max_fps = request.args.get('max_fps', type=float)
+    if not max_fps or max_fps <= 0:
+        return MJPEG_MAX_FPS
+    return min(max_fps, MJPEG_MAX_FPS)
+
+def gen_frames(feed, stream='raw', max_fps=MJPEG_MAX_FPS):
     """
     Generator function that yields frames as MJPEG encoded frames.
-    """
-    global current_frame, frame_lock
     
+    Blocks until the feed publishes a new frame version, so an idle stream
+    costs nothing, and sends at most max_fps frames per second to this client
+    (intermediate versions are skipped, never queued).
+    """
+    min_interval = 1.0 / max_fps
+    last_version = -1
+    next_send_time = 0.0
     while True:
-        if current_frame is None:
-            continue
-        
-        with frame_lock:
-            if current_frame is None:
+        snapshot = feed.wait_for_snapshot(last_version, timeout=MJPEG_IDLE_TIMEOUT)
+        if snapshot is None:
+            if feed.is_running or last_version < 0:
                 continue
-            frame = current_frame.copy()
-        
-        # Encode frame as JPEG
-        ret, buffer = cv2.imencode('.jpg', frame)
-        if not ret:
+            return  # Pipeline stopped: end the stream
+        
+        # Pace this client; after sleeping, send the newest version
+        delay = next_send_time - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+            snapshot = feed.snapshot
+        next_send_time = max(next_send_time + min_interval, time.monotonic())
+        last_version = snapshot.version
+        
+        # Encoded once per frame version and shared by every viewer
+        frame_bytes = snapshot.jpeg(stream, MJPEG_QUALITY, feed.jpeg_stats)
+        if frame_bytes is None:
             continue
         
-        frame_bytes = buffer.tobytes()
-        
         # Yield frame in MJPEG format
         yield (b'--frame\r\n'
                b'Content-Type: image/jpeg\r\n'
@@ -590,69 +355,84 @@ def index():
 @app.route('/video_frame')
 def video_frame():
     """Serve a single JPEG frame from the raw feed (without detection text)."""
-    global current_frame, frame_lock
+    feed = get_feed(get_request_camera_id())
     
-    if current_frame is None or frame_lock is None:
-        return "No frame available", 503
+    if feed is None:
+        return "Unknown camera", 404
     
-    try:
-        with frame_lock:
-            if current_frame is None:
-                return "No frame available", 503
-            frame = current_frame.copy()
-    except:
-        return "Error accessing frame", 500
-    
-    # Encode frame as JPEG
-    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-    if not ret:
+    # Encoded once per frame version and shared by every viewer
+    _, frame_bytes = feed.get_jpeg('raw', DEFAULT_JPEG_QUALITY)
+    if frame_bytes is None:
         return "Could not encode frame", 500
     
-    return Response(buffer.tobytes(), mimetype='image/jpeg')
+    return Response(frame_bytes, mimetype='image/jpeg')
 
 @app.route('/processed_frame')
 def get_processed_frame():
     """Serve a single JPEG frame from the processed feed (with detection text)."""
-    global processed_frame, frame_lock
+    feed = get_feed(get_request_camera_id())
     
-    if processed_frame is None or frame_lock is None:
-        return "No frame available", 503
+    if feed is None:
+        return "Unknown camera", 404
     
-    try:
-        with frame_lock:
-            if processed_frame is None:
-                return "No frame available", 503
-            frame = processed_frame.copy()
-    except:
-        return "Error accessing frame", 500
-    
-    # Encode frame as JPEG
-    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-    if not ret:
+    # Encoded once per frame version and shared by every viewer
+    _, frame_bytes = feed.get_jpeg('processed', DEFAULT_JPEG_QUALITY)
+    if frame_bytes is None:
         return "Could not encode frame", 500
     
-    return Response(buffer.tobytes(), mimetype='image/jpeg')
+    return Response(frame_bytes, mimetype='image/jpeg')
 
 @app.route('/api/detection')
 def get_detection():
     """Get the latest detection data as JSON."""
-    global detection_data_cache
+    feed = get_feed(get_request_camera_id())
     
-    if detection_data_cache is None:
+    if feed is None:
+        return {"error": "Unknown camera"}, 404
+    if feed.detection_data_cache is None:
         return {"error": "No detection data available"}, 503
     
-    return detection_data_cache
+    return feed.detection_data_cache
+
+@app.route('/api/cameras')
+def get_cameras():
+    """List the configured cameras, whether their pipelines are running, and capture metrics."""
+    cameras = []
+    if supervisor is not None:
+        for camera_id in supervisor.camera_ids():
+            feed = supervisor.get_feed(camera_id)
+            detection_data = feed.detection_data_cache
+            capture = detection_data.get('capture', {}) if detection_data else {}
+            cameras.append({
+                'camera_id': camera_id,
+                'source': feed.source if isinstance(feed.source, (int, str, dict)) else repr(feed.source),
+                'running': feed.is_running,
+                'capture': capture,  # frame_id, captured_frames, dropped_frames, lag_ms
+                'jpeg_cache': feed.jpeg_stats.to_dict(),  # hits, misses, hit_ratio
+                'frame_push': frame_pusher.stats(camera_id)  # subscribers, sent, dropped
+            })
+    return jsonify({'success': True, 'cameras': cameras, 'mode': PIPELINE_MODE,
+                    'emit_queue': emit_queue.stats(),  # depth, coalesced, dropped, latency_ms
+                    'detection_channels': detection_channels.stats(),
+                    'retention': retention_worker.stats(),  # deleted_incidents, deleted_files, freed_bytes
+                    'metrics_store': metrics_store.stats()})  # recorded, pending, written_seconds, flush_ms
 
 @app.route('/video_feed')
 def video_feed():
     """Stream the raw video feed with detections."""
-    return Response(gen_frames(),
+    feed = get_feed(get_request_camera_id())
+    if feed is None:
+        return "Unknown camera", 404
+    return Response(gen_frames(feed, 'raw', get_request_max_fps()),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/processed_feed')
 def processed_feed():
-    """Stream processed video feed (same as raw for now)."""
-    return Response(gen_frames(),
+    """Stream the processed video feed (glare rescue + blur fix + watermark)."""
+    feed = get_feed(get_request_camera_id())
+    if feed is None:
+        return "Unknown camera", 404
+    return Response(gen_frames(feed, 'processed', get_request_max_fps()),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/style.css')
@@ -671,20 +451,65 @@ def serve_js():
 
 @app.route('/api/incidents', methods=['GET'])
 def get_incidents():
-    """Get recent incidents (last 5)."""
+    """
+    Incident history, newest first (the last 5 without parameters).
+    
+    Query parameters: since, until (Unix seconds, since <= timestamp < until),
+    type (incident type), detection (primary detection), limit (1-INCIDENT_PAGE_LIMIT)
+    and cursor (next_cursor of the previous page). Malformed values are rejected
+    with 400. A first page of up to 5 incidents without filters is served from the
+    recent-incidents cache; every other page is streamed.
+    """
     try:
-        incidents = aegis_db.get_recent_incidents(limit=5)
-        return jsonify({
-            'success': True,
-            'incidents': incidents,
-            'count': len(incidents)
-        })
-    except Exception as e:
-        print(f"Error retrieving incidents: {e}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+        since = get_request_number('since', float)
+        until = get_request_number('until', float)
+        limit = get_request_number('limit', int, 5)
+        if not 1 <= limit <= INCIDENT_PAGE_LIMIT:
+            raise ValueError(f"limit must be between 1 and {INCIDENT_PAGE_LIMIT}")
+        cursor = request.args.get('cursor')
+        after = decode_incident_cursor(cursor) if cursor is not None else None
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    incident_type = request.args.get('type')
+    detection = request.args.get('detection')
+    
+    if since is None and until is None and incident_type is None and detection is None and after is None:
+        try:
+            # One extra incident tells whether there is a next page
+            incidents = aegis_db.get_recent_incidents(limit=limit + 1)
+        except Exception as e:
+            print(f"Error retrieving incidents: {e}")
+            return jsonify({'success': False, 'error': str(e)}), 500
+        next_cursor = None
+        if len(incidents) > limit:
+            last = incidents[limit - 1]['incident']
+            next_cursor = encode_incident_cursor(last['timestamp'], last['id'])
+        return jsonify({'success': True, 'incidents': incidents[:limit], 'count': min(len(incidents), limit),
+                        'next_cursor': next_cursor})
+    
+    # One extra incident tells whether there is a next page
+    incidents = aegis_db.iter_incidents(since=since, until=until, incident_type=incident_type,
+                                        detection=detection, after=after, limit=limit + 1)
+    
+    def generate():
+        yield '{"success": true, "incidents": ['
+        count, next_cursor, last = 0, None, None
+        try:
+            for incident in incidents:
+                if count == limit:
+                    next_cursor = encode_incident_cursor(last['timestamp'], last['id'])
+                    break
+                yield (',' if count else '') + json.dumps(incident)
+                last = incident['incident']
+                count += 1
+        except Exception as e:
+            # Headers are already sent: end the JSON and report the error in it
+            print(f"Error retrieving incidents: {e}")
+            yield f'], "count": {count}, "next_cursor": null, "error": {json.dumps(str(e))}}}'
+            return
+        yield f'], "count": {count}, "next_cursor": {json.dumps(next_cursor)}}}'
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 @app.route('/api/incidents/<int:incident_id>', methods=['GET'])
 def get_incident(incident_id):
@@ -738,6 +563,27 @@ def get_glare_image(image_id):
             'error': str(e)
         }), 500
 
+@app.route('/api/metrics/history', methods=['GET'])
+def get_metrics_history():
+    """
+    Detector metric history of one camera.
+    
+    Query parameters: camera_id, since and until (Unix seconds; default the last hour),
+    metrics (comma-separated names; default all) and resolution ('raw', '1s', '1m' or '1h';
+    default the finest that covers the range in at most MAX_HISTORY_POINTS points).
+    Raw samples stop after MAX_HISTORY_POINTS with truncated set.
+    """
+    metrics = request.args.get('metrics')
+    try:
+        until = get_request_number('until', float, time.time())
+        since = get_request_number('since', float, until - 3600.0)
+        history = metrics_store.history(get_request_camera_id(), since, until,
+                                        resolution=request.args.get('resolution'),
+                                        metrics=metrics.split(',') if metrics else None)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify(dict(history, success=True, since=since, until=until))
+
 @app.route('/api/validate-liveness-video', methods=['POST'])
 def validate_liveness_video():
     """
@@ -824,20 +670,74 @@ def validate_liveness_video():
 # SOCKET.IO EVENT HANDLERS
 # ============================================================================
 
+def get_event_camera_id(data):
+    """Read the camera id from a Socket.IO payload, defaulting to the first camera."""
+    if isinstance(data, dict) and data.get('camera_id') is not None:
+        try:
+            return int(data['camera_id'])
+        except (TypeError, ValueError):
+            pass
+    return DEFAULT_CAMERA_ID
+
+def get_sensor_states(camera_id):
+    """Sensor configuration payload for one camera."""
+    states = supervisor.get_sensor_config(camera_id) if supervisor is not None else None
+    if states is None:
+        return None
+    states['camera_id'] = camera_id
+    return states
+
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection."""
     print("Client connected")
     emit('status_update', {'status': 'healthy', 'message': 'Connected to Aegis server'})
     # Send current state on connect
-    with sensor_config_lock:
-        emit('sensor_states', sensor_config)
+    states = get_sensor_states(DEFAULT_CAMERA_ID)
+    if states is not None:
+        emit('sensor_states', states)
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection."""
+    frame_pusher.unsubscribe(request.sid)
+    detection_channels.unsubscribe(request.sid)
     print("Client disconnected")
 
+@socketio.on('subscribe_detection')
+def handle_subscribe_detection(data=None):
+    """Send this client compact detection_update payloads (chosen channels, histogram format, deltas)."""
+    data = data if isinstance(data, dict) else {}
+    camera_id = get_event_camera_id(data) if data.get('camera_id') is not None else None
+    
+    if not detection_channels.subscribe(request.sid, camera_id, data.get('channels'),
+                                        data.get('histogram'), data.get('delta', True)):
+        print(f"Warning: Invalid detection subscription {data}")
+
+@socketio.on('unsubscribe_detection')
+def handle_unsubscribe_detection(data=None):
+    """Return this client to the full detection_update broadcast."""
+    detection_channels.unsubscribe(request.sid)
+
+@socketio.on('subscribe_frames')
+def handle_subscribe_frames(data=None):
+    """Push binary JPEG 'frame' events for a camera's raw and/or processed stream to this client."""
+    camera_id = get_event_camera_id(data)
+    streams = data.get('streams', FRAME_STREAMS) if isinstance(data, dict) else FRAME_STREAMS
+    max_fps = data.get('max_fps') if isinstance(data, dict) else None
+    try:
+        max_fps = float(max_fps) if max_fps is not None else None
+    except (TypeError, ValueError):
+        max_fps = None
+    
+    if not frame_pusher.subscribe(request.sid, camera_id, streams, max_fps):
+        print(f"Warning: Cannot subscribe to frames of camera {camera_id} ({streams})")
+
+@socketio.on('unsubscribe_frames')
+def handle_unsubscribe_frames(data=None):
+    """Stop pushing frames to this client."""
+    frame_pusher.unsubscribe(request.sid)
+
 @socketio.on('test_alert')
 def handle_test_alert(data):
     """Emit a test alert to all clients."""
@@ -847,50 +747,62 @@ def handle_test_alert(data):
     }, broadcast=True)
 
 @socketio.on('dismiss_reposition_alert')
-def handle_dismiss_reposition_alert():
+def handle_dismiss_reposition_alert(data=None):
     """Handle reposition alert dismissal from frontend."""
-    global reposition_alert_shown
-    reposition_alert_shown = False
-    print("Reposition alert dismissed by user")
+    camera_id = get_event_camera_id(data)
+    if supervisor is not None:
+        supervisor.dismiss_reposition_alert(camera_id)
+    print(f"Reposition alert dismissed by user (camera {camera_id})")
 
 @socketio.on('get_sensor_states')
-def handle_get_sensor_states():
+def handle_get_sensor_states(data=None):
     """Send current sensor configuration to client."""
-    with sensor_config_lock:
-        emit('sensor_states', sensor_config)
+    states = get_sensor_states(get_event_camera_id(data))
+    if states is not None:
+        emit('sensor_states', states)
 
 @socketio.on('set_sensor_enabled')
 def handle_set_sensor_enabled(data):
     """Handle sensor enable/disable request from frontend."""
+    camera_id = get_event_camera_id(data)
     sensor = data.get('sensor')
     enabled = data.get('enabled', True)
     
-    if sensor in sensor_config:
-        with sensor_config_lock:
-            sensor_config[sensor] = enabled
-        print(f"Sensor '{sensor}' set to {enabled}")
+    if supervisor is not None and supervisor.set_sensor_config(camera_id, sensor, enabled):
+        print(f"Camera {camera_id}: sensor '{sensor}' set to {enabled}")
         # Broadcast sensor state update to all connected clients
         emit('status_update', {'status': 'healthy', 'message': f'{sensor} toggled to {enabled}'}, broadcast=True)
-        emit('sensor_states', sensor_config, broadcast=True) # Send update to all clients
+        emit('sensor_states', get_sensor_states(camera_id), broadcast=True) # Send update to all clients
     else:
-        print(f"Warning: Unknown sensor '{sensor}'")
+        print(f"Warning: Unknown sensor '{sensor}' (camera {camera_id})")
 
-# <--- NEW: Add handler for glare_rescue_mode ---
 @socketio.on('set_glare_mode')
 def handle_set_glare_mode(data):
     """Handle glare rescue mode toggle request from frontend."""
+    camera_id = get_event_camera_id(data)
     mode = data.get('mode')
     
-    if mode in ['CLAHE', 'MSR']:
-        with sensor_config_lock:
-            sensor_config['glare_rescue_mode'] = mode
-        print(f"Glare Rescue Mode set to {mode}")
+    if mode in ['CLAHE', 'MSR'] and supervisor is not None and supervisor.set_sensor_config(camera_id, 'glare_rescue_mode', mode):
+        print(f"Camera {camera_id}: Glare Rescue Mode set to {mode}")
         # Broadcast to all connected clients
         emit('status_update', {'status': 'healthy', 'message': f'Glare Mode set to {mode}'}, broadcast=True)
-        emit('sensor_states', sensor_config, broadcast=True) # Send updated config back
+        emit('sensor_states', get_sensor_states(camera_id), broadcast=True) # Send updated config back
     else:
         print(f"Warning: Unknown glare mode '{mode}'")
 
+@socketio.on('set_motion_engine')
+def handle_set_motion_engine(data):
+    """Handle shake/reposition motion engine selection from frontend."""
+    camera_id = get_event_camera_id(data)
+    engine = data.get('engine')
+    
+    if engine in MOTION_ENGINES and supervisor is not None and supervisor.set_sensor_config(camera_id, 'motion_engine', engine):
+        print(f"Camera {camera_id}: Motion engine set to {engine}")
+        emit('status_update', {'status': 'healthy', 'message': f'Motion engine set to {engine}'}, broadcast=True)
+        emit('sensor_states', get_sensor_states(camera_id), broadcast=True)
+    else:
+        print(f"Warning: Unknown motion engine '{engine}'")
+
 # ============================================================================
 # STARTUP AND SHUTDOWN
 # ============================================================================
@@ -902,37 +814,87 @@ def startup():
     print("=" * 60)
     print(f"Blur Threshold: {BLUR_THRESHOLD}")
     print(f"Shake Threshold: {SHAKE_THRESHOLD}")
+    print(f"Cameras: {len(CAMERA_SOURCES)} ({PIPELINE_MODE} mode)")
     print("✓ Dynamic Watermarking: ENABLED")
     print("✓ PocketSphinx Speech Recognition: READY")
     print("-" * 60)
     
-    if not initialize_camera():
+    if not initialize_cameras():
         print("FATAL: Could not initialize camera. Exiting.")
         return False
     
+    retention_worker.start()
+    metrics_store.start()
     return True
 
+def parse_args():
+    """Command line overrides for headless runs (CI, build machines, benchmarks)."""
+    parser = argparse.ArgumentParser(description='AEGIS: Active Defense System server')
+    parser.add_argument('--source', action='append', default=None,
+                        help="Frame source for the next camera id (repeatable): webcam index, "
+                             "video file, image directory or 'synthetic[:blur@30-60,...]'")
+    parser.add_argument('--mode', choices=['process', 'thread'], default=None,
+                        help='Run camera pipelines in worker processes or threads')
+    parser.add_argument('--motion-engine', choices=list(MOTION_ENGINES), default=None,
+                        help='Motion engine for shake/reposition detection on every camera')
+    parser.add_argument('--retention-days', type=float, default=None,
+                        help='Delete incidents older than this many days (0 = keep forever)')
+    parser.add_argument('--retention-max-incidents', type=int, default=None,
+                        help='Keep at most this many incidents (0 = no limit)')
+    parser.add_argument('--retention-max-gb', type=float, default=None,
+                        help='Keep glare images and liveness videos under this many GB (0 = no limit)')
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help='Convert a database created without auto_vacuum (one full VACUUM) and exit; '
+                             'stop the server first')
+    parser.add_argument('--port', type=int, default=5000)
+    return parser.parse_args()
+
 if __name__ == '__main__':
+    args = parse_args()
+    if args.enable_incremental_vacuum:
+        if enable_incremental_vacuum(aegis_db):
+            print("[DB] ✓ Enabled incremental vacuum")
+        else:
+            print("[DB] Incremental vacuum already enabled")
+        aegis_db.close()
+        sys.exit(0)
+    if args.source:
+        CAMERA_SOURCES = {
+            camera_id: int(spec) if spec.isdigit() else spec
+            for camera_id, spec in enumerate(args.source)
+        }
+    if args.mode:
+        PIPELINE_MODE = args.mode
+    if args.motion_engine:
+        for camera_id in CAMERA_SOURCES:
+            CAMERA_SENSOR_CONFIG.setdefault(camera_id, {})['motion_engine'] = args.motion_engine
+    if args.retention_days is not None:
+        RETENTION_POLICY.max_age_days = args.retention_days or None
+    if args.retention_max_incidents is not None:
+        RETENTION_POLICY.max_incidents = args.retention_max_incidents or None
+    if args.retention_max_gb is not None:
+        RETENTION_POLICY.max_storage_bytes = int(args.retention_max_gb * 1024 ** 3) or None
+    
     if startup():
         # Start audio logging thread
         audio_thread = threading.Thread(target=audio_logging_thread, daemon=True)
         audio_thread.start()
         print("Audio logging thread started.")
         
-        # Start camera thread
-        camera_thread_obj = threading.Thread(target=camera_thread, daemon=True)
-        camera_thread_obj.start()
-        print("Camera thread started.")
-        
         print("Starting Flask server...")
-        print("Open your browser and go to: http://localhost:5000")
+        print(f"Open your browser and go to: http://localhost:{args.port}")
         print("Press Ctrl+C to stop the server.")
         print("-" * 60)
         
         try:
-            socketio.run(app, host='0.0.0.0', port=5000, debug=False)
+            socketio.run(app, host='0.0.0.0', port=args.port, debug=False)
         except KeyboardInterrupt:
             print("\n\nShutting down...")
-            if cap:
-                cap.release()
-            print("Goodbye!")
\ No newline at end of file
+        finally:
+            if supervisor:
+                supervisor.stop()
+            emit_queue.stop()
+            retention_worker.stop()
+            metrics_store.stop()
+            aegis_db.flush()
+            print("Goodbye!")
@@ -3,7 +3,7 @@ AEGIS Backend Package
 Database and validation modules for tamper detection system.
 """
 
-from .database import aegis_db, save_glare_image, get_incident_description
+from .evidence_storage import save_glare_image
 from .watermark_validator import validate_video
 from . import tamper_detector
 from . import glare_rescue
@@ -16,3 +16,12 @@ __all__ = [
     'tamper_detector',
     'glare_rescue'
 ]
+
+
+def __getattr__(name):
+    # Importing the database module opens data/aegis.db; camera worker processes
+    # import this package too, so only do it when the database is asked for
+    if name in ('aegis_db', 'get_incident_description'):
+        from . import database
+        return getattr(database, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,524 @@
+"""
+AEGIS Camera Pipeline
+Per-camera detection pipeline: owns the capture device and all per-stream state
+(previous frame, liveness reference, reposition alert flags, sensor configuration).
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from . import tamper_detector
+from .detector_scheduler import DetectorScheduler
+from .evidence_storage import save_glare_image
+from .frame_sources import CaptureThread, create_frame_source
+from .tamper_detector import fix_blur_unsharp_mask
+from .watermark_embedder import get_watermark_embedder
+
+# Try to import glare rescue functions, but make them optional
+try:
+    from .glare_rescue import clahe_rescue, get_image_viability_stats
+    GLARE_RESCUE_AVAILABLE = True
+except ImportError as e:
+    print(f"Warning: Glare rescue functions not available: {e}")
+    GLARE_RESCUE_AVAILABLE = False
+    # Dummy functions
+    def clahe_rescue(frame, clahe, **kwargs): return frame
+    def get_image_viability_stats(frame, **kwargs): return False, 0, 0, 0, None, None
+
+# Detection configuration
+BLUR_THRESHOLD = 25.0
+SHAKE_THRESHOLD = 5.0
+REPOSITION_THRESHOLD = 7.0  # Threshold for directional shift magnitude - reduced false positives
+
+# Liveness detection configuration
+LIVENESS_THRESHOLD = 3.0        # LOW threshold: detects freezing/static feed
+BLACKOUT_BRIGHTNESS_THRESHOLD = 25.0  # Mean pixel intensity threshold for blackout (0-255 range)
+LIVENESS_CHECK_INTERVAL = 3.0   # Time (in seconds) between capturing a new reference frame
+LIVENESS_ACTIVATION_TIME = 10.0 # Time (s) after startup before "FROZEN FEED ALERT" becomes active
+
+# Capture thread configuration
+FIRST_FRAME_TIMEOUT = 10.0   # Time (s) to wait for the source's first frame
+CAPTURE_POLL_TIMEOUT = 0.5   # Time (s) between stop/command checks while waiting for a frame
+
+# Sensor enable/disable configuration - all enabled by default
+DEFAULT_SENSOR_CONFIG = {
+    'blur': True,           # Blur detection
+    'shake': True,          # Shake detection
+    'glare': True,          # Glare detection
+    'liveness': True,       # Liveness detection
+    'reposition': True,     # Reposition detection
+    'blur_fix': True,       # Blur correction
+    'glare_rescue': True,   # Glare rescue
+    'audio_alerts': True,   # Audio alerts/logging
+    'glare_rescue_mode': 'CLAHE',
+    'motion_engine': tamper_detector.DEFAULT_MOTION_ENGINE,  # see tamper_detector.MOTION_ENGINES
+    'flow_warm_start': False,  # Seed optical flow with the previous frame's flow
+    'motion_gate': True      # Skip optical flow when the frame difference says nothing moved
+}
+
+
+class CameraPipeline:
+    """
+    Detection pipeline for a single camera source.
+
+    All state that used to live in app.py module globals is held on the
+    instance, so several pipelines can run side by side (one per camera).
+    """
+
+    def __init__(self, camera_id, source=0, sensor_config=None, analysis_max_width=None,
+                 detector_cadence=None, detector_budget_ms=None):
+        """
+        Args:
+            camera_id (int): Logical camera id used by routes and Socket.IO events.
+            source: Frame source spec (webcam index, video path, image directory,
+                'synthetic[:events]', dict or FrameSource; see create_frame_source).
+            sensor_config (dict): Initial sensor configuration (defaults to DEFAULT_SENSOR_CONFIG).
+            analysis_max_width (int): Width cap for the downscaled analysis level
+                (defaults to tamper_detector.ANALYSIS_MAX_WIDTH).
+            detector_cadence (dict): Stage -> run every Nth frame
+                (see detector_scheduler.DEFAULT_DETECTOR_CADENCE).
+            detector_budget_ms (dict): Stage -> per-frame time budget in ms
+                (see detector_scheduler.DEFAULT_DETECTOR_BUDGET_MS).
+        """
+        self.camera_id = camera_id
+        self.source = source
+        self.analysis_max_width = analysis_max_width
+        self.frame_source = None
+
+        self.sensor_config = dict(DEFAULT_SENSOR_CONFIG)
+        if sensor_config:
+            self.sensor_config.update(sensor_config)
+        self.sensor_config_lock = threading.Lock()
+
+        if GLARE_RESCUE_AVAILABLE:
+            self.clahe = cv2.createCLAHE(clipLimit=16.0, tileGridSize=(4, 4))
+        else:
+            self.clahe = None
+
+        self.prev_pyramid = None
+        self.frame_count = 0
+        self.reposition_tracker = tamper_detector.RepositionTracker()
+        self.flow_state = tamper_detector.FlowState()
+        self.scheduler = DetectorScheduler(detector_cadence, detector_budget_ms)
+
+        # Reposition alert state
+        self.reposition_alert_active = False
+        self.reposition_alert_shown = False  # Track if we've already shown the alert for this event
+        self.reposition_alert_frames = 0
+
+        # Liveness state
+        self.liveness_reference_frame = None
+        self.liveness_reference_time = None
+        self.liveness_startup_time = None
+        self.liveness_is_frozen = False
+        self.liveness_status_text = "INITIALIZING"
+
+        # Capture metrics of the last analyzed frame (frame id, dropped frames, capture-to-analysis lag)
+        self.capture_metrics = {}
+
+    def open(self):
+        """Initialize the frame source."""
+        try:
+            frame_source = create_frame_source(self.source)
+        except ValueError as e:
+            print(f"[CAMERA {self.camera_id}] Error: {e}")
+            return False
+
+        if not frame_source.open():
+            print(f"[CAMERA {self.camera_id}] Error: Could not open source {frame_source.name}.")
+            return False
+
+        self.frame_source = frame_source
+        print(f"[CAMERA {self.camera_id}] Source {frame_source.name} initialized successfully.")
+        return True
+
+    def release(self):
+        """Release the frame source."""
+        if self.frame_source is not None:
+            self.frame_source.release()
+            self.frame_source = None
+
+    def read(self):
+        """Read the next frame from the frame source."""
+        if self.frame_source is None:
+            return False, None
+        return self.frame_source.read()
+
+    # ------------------------------------------------------------------------
+    # Configuration (thread-safe)
+    # ------------------------------------------------------------------------
+
+    def get_sensor_config(self):
+        """Return a snapshot of this camera's sensor configuration."""
+        with self.sensor_config_lock:
+            return self.sensor_config.copy()
+
+    def set_sensor_config(self, key, value):
+        """Update one sensor configuration entry. Returns False for unknown keys."""
+        with self.sensor_config_lock:
+            if key not in self.sensor_config:
+                return False
+            self.sensor_config[key] = value
+        return True
+
+    def dismiss_reposition_alert(self):
+        """Reset the reposition alert so the next event alerts again."""
+        self.reposition_alert_shown = False
+
+    # ------------------------------------------------------------------------
+    # Processing
+    # ------------------------------------------------------------------------
+
+    def start(self, first_frame):
+        """Seed the pipeline state from the first captured frame."""
+        first_context = tamper_detector.FrameContext(first_frame, self.analysis_max_width)
+        self.prev_pyramid = first_context.pyramid
+        self.liveness_reference_frame = first_context.gray.copy()
+        self.liveness_reference_time = time.time()
+        self.liveness_startup_time = time.time()  # Grace period tracker
+        self.frame_count = 0
+        self.reposition_tracker.reset()
+        self.flow_state.reset()
+        self.scheduler.reset()
+
+    def _detect_motion(self, context, sensor_enabled):
+        """Shake and reposition from one shared motion computation."""
+        motion_engine = sensor_enabled.get('motion_engine')
+        if motion_engine not in tamper_detector.MOTION_ENGINES:
+            motion_engine = tamper_detector.DEFAULT_MOTION_ENGINE
+        self.flow_state.warm_start = bool(sensor_enabled.get('flow_warm_start', False))
+        gate_threshold = tamper_detector.MOTION_GATE_THRESHOLD if sensor_enabled.get('motion_gate', True) else None
+        flow_context = tamper_detector.create_motion_context(
+            context.pyramid, self.prev_pyramid, motion_engine, flow_state=self.flow_state,
+            gate_threshold=gate_threshold
+        )
+        is_shaken, shake_magnitude = tamper_detector.check_shake(
+            flow_context.gray_frame, flow_context.prev_gray_frame,
+            threshold=SHAKE_THRESHOLD, flow_context=flow_context
+        )
+        is_repositioned, shift_magnitude, shift_x, shift_y = tamper_detector.detect_camera_reposition(
+            flow_context.gray_frame, flow_context.prev_gray_frame,
+            threshold_shift=REPOSITION_THRESHOLD, flow_context=flow_context,
+            tracker=self.reposition_tracker
+        )
+        return is_shaken, shake_magnitude, flow_context.engine, is_repositioned, shift_magnitude, shift_x, shift_y
+
+    def _measure_liveness(self, context, current_time):
+        """Difference from the liveness reference frame and mean brightness."""
+        diff_frame = cv2.absdiff(context.gray, self.liveness_reference_frame)
+        mean_diff = np.mean(diff_frame)
+        mean_brightness = context.mean
+
+        # Update reference frame if check interval has passed
+        if current_time - self.liveness_reference_time >= LIVENESS_CHECK_INTERVAL:
+            self.liveness_reference_frame = context.gray.copy()
+            self.liveness_reference_time = current_time
+        return mean_diff, mean_brightness
+
+    def _detect_blur(self, context):
+        return tamper_detector.check_blur(None, threshold=BLUR_THRESHOLD, frame_context=context)
+
+    def _detect_glare(self, context):
+        # Use your tuned thresholds
+        is_glare, dark_pct, mid_pct, bright_pct, hist_for_plot, _ = get_image_viability_stats(
+            context.frame, dark_thresh=50, bright_thresh=252, frame_context=context
+        )
+        return is_glare, dark_pct, mid_pct, bright_pct, hist_for_plot
+
+    def process_frame(self, frame, current_time=None):
+        """
+        Run all detections and the rescue/watermark chain on one frame.
+
+        Args:
+            frame (numpy.ndarray): BGR frame.
+            current_time (float): Capture time, defaults to time.time().
+
+        Returns:
+            tuple: (detection_data, processed_frame, detections, glare_image_path)
+                - detection_data (dict): JSON-serializable metrics for the dashboard.
+                - processed_frame (numpy.ndarray): Rescued, sharpened and watermarked frame.
+                - detections (list): Detection types that fired on this frame.
+                - glare_image_path (str): Saved glare rescue image, or None.
+        """
+        if self.prev_pyramid is None:
+            self.start(frame)
+        elif self.liveness_reference_frame.shape != frame.shape[:2]:
+            # The source changed resolution: previous-frame state no longer lines up
+            print(f"[CAMERA {self.camera_id}] Frame size changed to {frame.shape[1]}x{frame.shape[0]}; reseeding.")
+            self.start(frame)
+        if current_time is None:
+            current_time = time.time()
+
+        self.frame_count += 1
+
+        # Derived buffers (gray, pyramid, histograms, mean, LAB) are computed lazily, once per frame
+        context = tamper_detector.FrameContext(frame, self.analysis_max_width)
+
+        # Read sensor configuration (thread-safe)
+        sensor_enabled = self.get_sensor_config()
+
+        # --- RUN DETECTIONS ---
+        # Stages run in priority order; a stage that is not due (cadence) or
+        # does not fit in the frame budget reuses its last result
+        self.scheduler.begin_frame(self.frame_count)
+        motion, motion_frame = self.scheduler.run(
+            'motion', lambda: self._detect_motion(context, sensor_enabled)
+        )
+        (mean_diff, mean_brightness), liveness_frame = self.scheduler.run(
+            'liveness', lambda: self._measure_liveness(context, current_time)
+        )
+        (is_blurred, blur_variance), blur_frame = self.scheduler.run(
+            'blur', lambda: self._detect_blur(context)
+        )
+        if GLARE_RESCUE_AVAILABLE and sensor_enabled['glare']:
+            glare, glare_frame = self.scheduler.run('glare', lambda: self._detect_glare(context))
+        else:
+            glare, glare_frame = (False, 0.0, 100.0, 0.0, None), self.frame_count
+        is_glare, dark_pct, mid_pct, bright_pct, hist_for_plot = glare
+        is_shaken, shake_magnitude, motion_engine, is_repositioned, shift_magnitude, shift_x, shift_y = motion
+
+        # --- LIVENESS DETECTION ---
+        # Check if grace period (10s startup) has passed
+        is_liveness_active = (current_time - self.liveness_startup_time) > LIVENESS_ACTIVATION_TIME
+
+        # Determine liveness state - frozen feed and blackout detection
+        is_blackout = mean_brightness < BLACKOUT_BRIGHTNESS_THRESHOLD
+        is_frozen = False
+
+        if is_liveness_active and mean_diff < LIVENESS_THRESHOLD:
+            is_frozen = True
+
+        # Update liveness status text
+        if is_blackout:
+            self.liveness_status_text = "BLACKOUT DETECTED"
+        elif is_frozen:
+            self.liveness_status_text = "FROZEN FEED ALERT"
+        elif not is_liveness_active:
+            time_left = LIVENESS_ACTIVATION_TIME - (current_time - self.liveness_startup_time)
+            self.liveness_status_text = f"INITIALIZING... ({time_left:.1f}s)"
+        else:
+            self.liveness_status_text = "LIVE"
+
+        # Store frozen state
+        self.liveness_is_frozen = is_frozen
+
+        # Respect sensor configuration - disable detections if sensor is disabled
+        if not sensor_enabled['blur']:
+            is_blurred = False
+        if not sensor_enabled['shake']:
+            is_shaken = False
+        if not sensor_enabled['glare']:
+            is_glare = False
+        if not sensor_enabled['liveness']:
+            is_frozen = is_blackout = False
+            self.liveness_status_text = "INITIALIZING"
+        if not sensor_enabled['reposition']:
+            is_repositioned = False
+
+        detections = [
+            detection_type for detection_type, fired in (
+                ('blur', is_blurred),
+                ('shake', is_shaken),
+                ('glare', is_glare),
+                ('reposition', is_repositioned),
+                ('freeze', is_frozen),
+                ('blackout', is_blackout),
+            ) if fired
+        ]
+
+        # Manage repositioning alert state
+        if is_repositioned:
+            self.reposition_alert_frames = 0
+            # Only set alert_active ONCE per repositioning event
+            if not self.reposition_alert_shown:
+                self.reposition_alert_shown = True
+                self.reposition_alert_active = True  # Send alert to frontend ONLY on first detection
+                print(f"🚨 [CAMERA {self.camera_id}] REPOSITION DETECTED - Magnitude: {shift_magnitude:.2f}px, Shift: ({shift_x:.2f}, {shift_y:.2f})")
+            else:
+                # Motion still detected but we've already shown alert, keep it inactive
+                self.reposition_alert_active = False
+        else:
+            self.reposition_alert_frames += 1
+            if self.reposition_alert_frames > 30:  # Clear alert after 30 frames without detection
+                self.reposition_alert_shown = False  # Reset flag when motion fully stops
+            # Always keep alert inactive when motion isn't detected
+            self.reposition_alert_active = False
+
+        detection_data = {
+            'camera_id': self.camera_id,
+            'frame': self.frame_count,
+            # Each section's 'frame' is the frame its result was computed on
+            'blur': {
+                'detected': bool(is_blurred),
+                'variance': float(blur_variance),
+                'frame': blur_frame
+            },
+            'shake': {
+                'detected': bool(is_shaken),
+                'magnitude': float(shake_magnitude),
+                'engine': motion_engine,
+                'frame': motion_frame
+            },
+            'reposition': {
+                'detected': bool(is_repositioned),
+                'frame': motion_frame,
+                'magnitude': float(shift_magnitude),
+                'shift_x': float(shift_x),
+                'shift_y': float(shift_y),
+                'alert_active': bool(self.reposition_alert_active)
+            },
+            'glare': {
+                'detected': bool(is_glare),
+                'dark_pct': float(dark_pct),
+                'mid_pct': float(mid_pct),
+                'bright_pct': float(bright_pct),
+                'histogram': hist_for_plot.tolist() if hist_for_plot is not None else [],
+                'frame': glare_frame
+            },
+            'liveness': {
+                'frozen': bool(is_frozen),
+                'blackout': bool(is_blackout),
+                'status': self.liveness_status_text,
+                'mean_diff': float(mean_diff),
+                'mean_brightness': float(mean_brightness),
+                'is_active': bool(is_liveness_active),
+                'frame': liveness_frame
+            }
+        }
+
+        # --- GLARE RESCUE (Applied FIRST, before blur fixing) ---
+        frame_for_processing = frame  # Start with original frame (every rescue step returns a new array)
+        glare_image_path = None
+
+        if is_glare and sensor_enabled['glare_rescue'] and self.clahe is not None:
+            try:
+                current_mode = sensor_enabled.get('glare_rescue_mode', 'CLAHE')
+                print(f"[GLARE] Applying glare rescue (mode: {current_mode})...")
+
+                if current_mode == 'CLAHE':
+                    # --- CLAHE Rescue + Sharpening + Tame highlights (reuses the frame's LAB and gray) ---
+                    frame_for_processing = clahe_rescue(frame, self.clahe, highlight_thresh=252, frame_context=context)
+                    print(f"[GLARE] CLAHE + Tame rescue applied successfully!")
+
+                elif current_mode == 'MSR':
+                    # --- MSR Rescue (DITCHED) ---
+                    print(f"[GLARE] MSR mode selected, but not applying (as requested).")
+                    frame_for_processing = frame  # Just pass the raw frame
+
+                # Save glare image to storage (database row is added by the server),
+                # once per fresh glare result rather than for every reused one
+                if glare_frame == self.frame_count:
+                    try:
+                        glare_image_path = save_glare_image(frame_for_processing, dark_pct, current_time,  # Use dark_pct
+                                                            self.camera_id)
+                        print(f"[GLARE] ✓ Rescued image saved: {glare_image_path}")
+                    except Exception as e:
+                        print(f"[GLARE] ✗ Error saving glare image: {e}")
+
+            except Exception as e:
+                print(f"[GLARE] Rescue error: {e}")
+                frame_for_processing = frame
+
+        # Create processed frame with blur fixing (applied AFTER glare rescue)
+        if sensor_enabled['blur_fix']:
+            # Always apply unsharp masking, but dynamically adjust strength
+            if blur_variance < 50:
+                dynamic_strength = 8.5  # Very blurry - maximum sharpening
+            elif blur_variance < 100:
+                dynamic_strength = 3 + (100 - blur_variance) / 8  # Scale between 5.0-8.5
+            else:
+                dynamic_strength = max(3, 8.5 - (blur_variance - 100) / 40)  # Scale down
+
+            # Apply unsharp masking with dynamic strength
+            processed_frame = fix_blur_unsharp_mask(frame_for_processing, kernel_size=5, sigma=1.0, strength=dynamic_strength)
+        else:
+            # Blur fix disabled, use glare-rescued frame as-is
+            processed_frame = frame_for_processing
+
+        if processed_frame is frame:
+            # Nothing produced a new frame; the watermark draws in place and `frame` is a capture buffer
+            processed_frame = frame.copy()
+
+        # --- EMBED WATERMARK ON PROCESSED FRAME ---
+        try:
+            watermark_embedder = get_watermark_embedder()
+            processed_frame = watermark_embedder.embed(processed_frame)
+        except Exception as e:
+            print(f"[WATERMARK] Error embedding watermark: {e}")
+
+        # Update previous frame
+        self.prev_pyramid = context.pyramid
+
+        if self.frame_count % 10 == 0:
+            print(f"[CAMERA {self.camera_id}] Frame {self.frame_count}: Blur={blur_variance:.2f}, Shake={shake_magnitude:.2f}")
+
+        return detection_data, processed_frame, detections, glare_image_path
+
+    def run(self, publish, stop_event=None, poll_commands=None):
+        """
+        Capture and process frames until the source ends or stop_event is set.
+
+        Args:
+            publish (callable): Called as publish(frame, processed_frame, detection_data,
+                detections, glare_image_path, timestamp) for every processed frame.
+                `frame` is a capture buffer that is reused once publish returns.
+            stop_event (threading.Event or multiprocessing.Event): Optional stop signal.
+            poll_commands (callable): Optional hook called once per iteration, used by
+                worker processes to apply configuration commands from the server.
+        """
+        print(f"[CAMERA {self.camera_id}] Camera thread starting...")
+
+        if self.frame_source is None:
+            print(f"[CAMERA {self.camera_id}] ERROR: Camera not initialized!")
+            return
+
+        # Capture runs on its own thread; analysis always takes the newest frame
+        capture = CaptureThread(self.frame_source, name=f'capture-{self.camera_id}')
+        capture.start()
+        try:
+            self._run_loop(capture, publish, stop_event, poll_commands)
+        finally:
+            capture.stop()
+
+    def _run_loop(self, capture, publish, stop_event, poll_commands):
+        first = capture.read_latest(timeout=FIRST_FRAME_TIMEOUT)
+        if first is None:
+            print(f"[CAMERA {self.camera_id}] Error: Could not read first frame.")
+            return
+        first_frame = first[1]
+
+        self.start(first_frame)
+
+        print(f"[CAMERA {self.camera_id}] Camera thread initialized successfully. Starting main loop...")
+        print(f"[CAMERA {self.camera_id}] Frame size: {first_frame.shape}")
+
+        while stop_event is None or not stop_event.is_set():
+            if poll_commands is not None:
+                poll_commands()
+
+            captured = capture.read_latest(timeout=CAPTURE_POLL_TIMEOUT)
+            if captured is None:
+                if capture.ended:
+                    print(f"[CAMERA {self.camera_id}] Error: Could not read frame.")
+                    break
+                continue
+
+            frame_id, frame, current_time, capture_time = captured
+            lag_ms = (time.monotonic() - capture_time) * 1000.0
+            detection_data, processed_frame, detections, glare_image_path = self.process_frame(frame, current_time)
+
+            if self.frame_count == 1:
+                print(f"[CAMERA {self.camera_id}] ✓ First frame captured! Stream is live.")
+
+            self.capture_metrics = {
+                'frame_id': frame_id,
+                'captured_frames': capture.captured_count,
+                'dropped_frames': capture.dropped_count,
+                'lag_ms': lag_ms
+            }
+            detection_data['capture'] = dict(self.capture_metrics)
+
+            publish(frame, processed_frame, detection_data, detections, glare_image_path, current_time)
@@ -5,41 +5,285 @@ Handles SQLite persistence for detection incidents, audio logs, glare images, an
 
 import sqlite3
 import json
+import base64
 import threading
 from datetime import datetime, timedelta
 from pathlib import Path
 import os
 
+from .db_connections import ConnectionManager, READ_POOL_SIZE
+from .evidence_storage import STORAGE_DIR, GLARE_IMAGES_DIR, LIVENESS_VIDEOS_DIR, save_glare_image  # noqa: F401
+
 # Database configuration
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'aegis.db')
-STORAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'storage')
-GLARE_IMAGES_DIR = os.path.join(STORAGE_DIR, 'glare_images')
-LIVENESS_VIDEOS_DIR = os.path.join(STORAGE_DIR, 'liveness_videos')
 
 # Incident grouping configuration
 INCIDENT_GROUP_TIMEOUT = 5.0  # seconds - group same type detections within this window
-MAX_INCIDENTS_RETAINED = 5
+INCIDENT_FLUSH_INTERVAL = 1.0  # seconds - write open incidents to SQLite at most this often
+
+# Incident history paging (/api/incidents)
+INCIDENT_PAGE_LIMIT = 1000  # Maximum incidents per page
+INCIDENT_CHUNK_SIZE = 100   # Incidents read and hydrated per query while streaming a page
+RECENT_CACHE_SIZE = 6       # Newest incidents kept in memory: the dashboard's 5 plus one to detect a next page
 
 # Incident type grouping
 PHYSICAL_TAMPER_TYPES = {'blur', 'shake', 'glare', 'reposition'}
 LIVENESS_THREAT_TYPES = {'freeze', 'blackout', 'major_tamper'}
 
-# Thread safety
-db_lock = threading.Lock()
+# Schema migrations: (user_version, statements), applied in order on startup
+SCHEMA_MIGRATIONS = [
+    # 1: nearest-incident probes on (incident_type, timestamp); the type-only index is its prefix
+    (1, [
+        'CREATE INDEX IF NOT EXISTS idx_incidents_type_timestamp ON incidents(incident_type, timestamp)',
+        'DROP INDEX IF EXISTS idx_incidents_type',
+    ]),
+    # 2: history pages filtered by detection type, in (timestamp, id) order
+    (2, [
+        'CREATE INDEX IF NOT EXISTS idx_incidents_detection_timestamp ON incidents(primary_detection, timestamp)',
+    ]),
+    # 3: incidents are grouped per camera; rows written before this have no camera_id
+    (3, [
+        'ALTER TABLE incidents ADD COLUMN camera_id INTEGER',
+    ]),
+]
+
+# Connection tuning: overrides for db_connections.DEFAULT_PRAGMAS,
+# e.g. {'synchronous': 'FULL', 'cache_size': -64000, 'mmap_size': 0}
+DB_PRAGMAS = {}
+
+
+def get_incident_group_type(detection_type):
+    """
+    Determine the incident group type based on detection type.
+    Physical tamper types grouped together, liveness threats grouped together.
+    """
+    if detection_type in PHYSICAL_TAMPER_TYPES:
+        return 'PHYSICAL_TAMPER'
+    elif detection_type in LIVENESS_THREAT_TYPES:
+        return 'LIVENESS_THREAT'
+    else:
+        return 'UNKNOWN'
+
+
+def find_nearest_incident(cursor, timestamp, incident_type=None):
+    """
+    Id of the incident closest in time to timestamp (optionally of one type), or None.
+    
+    Two bounded probes of the (incident_type, timestamp) or (timestamp) index,
+    the last incident at or before timestamp and the first after it, in place
+    of sorting every incident by distance.
+    """
+    type_filter = 'incident_type = ? AND ' if incident_type is not None else ''
+    params = (incident_type, timestamp) if incident_type is not None else (timestamp,)
+    cursor.execute(f'''
+        SELECT id, timestamp FROM incidents
+        WHERE {type_filter}timestamp <= ?
+        ORDER BY timestamp DESC
+        LIMIT 1
+    ''', params)
+    before = cursor.fetchone()
+    cursor.execute(f'''
+        SELECT id, timestamp FROM incidents
+        WHERE {type_filter}timestamp > ?
+        ORDER BY timestamp ASC
+        LIMIT 1
+    ''', params)
+    after = cursor.fetchone()
+    
+    candidates = [row for row in (before, after) if row is not None]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda row: abs(row['timestamp'] - timestamp))['id']
+
+
+def encode_incident_cursor(timestamp, incident_id):
+    """Opaque page cursor for the (timestamp, id) key of the last incident on a page."""
+    return base64.urlsafe_b64encode(json.dumps([timestamp, incident_id]).encode()).decode().rstrip('=')
+
+
+def decode_incident_cursor(cursor):
+    """(timestamp, id) from encode_incident_cursor(); raises ValueError if malformed."""
+    try:
+        timestamp, incident_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return float(timestamp), int(incident_id)
+    except (TypeError, ValueError, UnicodeDecodeError, base64.binascii.Error):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+class IncidentAggregator:
+    """
+    Write-behind grouping of detections into incidents.
+    
+    Open incidents (one per camera and group type) live in memory and get their
+    ids when they are created, so callers can attach audio logs and glare images right
+    away. Changed incidents are written in one transaction by a background
+    thread every INCIDENT_FLUSH_INTERVAL seconds, and immediately when an
+    incident is closed by a detection that starts a new one.
+    """
+    
+    def __init__(self, database, flush_interval=INCIDENT_FLUSH_INTERVAL):
+        self.database = database
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # One flush at a time: a late write must not re-insert pruned rows
+        self._open = {}       # (camera id, group type) -> incident dict (columns of the incidents table)
+        self._dirty = {}      # incident id -> incident dict waiting to be written
+        self._next_id = None
+        self._flush_event = threading.Event()
+        self._thread = None
+        self.flush_count = 0
+    
+    def load(self):
+        """Seed the id counter and the latest incident of each camera and group from the database."""
+        with self.database.connections.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT MAX(seq) FROM (
+                    SELECT seq FROM sqlite_sequence WHERE name = 'incidents'
+                    UNION ALL SELECT MAX(id) FROM incidents
+                )
+            ''')
+            next_id = (cursor.fetchone()[0] or 0) + 1
+            cursor.execute('''
+                SELECT * FROM incidents
+                WHERE id IN (SELECT MAX(id) FROM incidents GROUP BY camera_id, incident_type)
+            ''')
+            rows = cursor.fetchall()
+        with self._lock:
+            self._next_id = next_id
+            self._open = {(row['camera_id'], row['incident_type']): dict(row) for row in rows}
+    
+    def open_ids(self):
+        """Ids of the incidents that new detections can still extend."""
+        with self._lock:
+            return [incident['id'] for incident in self._open.values()]
+    
+    def record(self, detection_type, timestamp, description=None, camera_id=None):
+        """
+        Group a detection into the open incident of its camera and type or start a new one.
+        Returns the incident_id without waiting for the database.
+        """
+        group_type = get_incident_group_type(detection_type)
+        with self._lock:
+            incident = self._open.get((camera_id, group_type))
+            
+            if incident is not None and incident['timestamp'] > timestamp - INCIDENT_GROUP_TIMEOUT:
+                # Extend the open incident
+                incident['count'] += 1
+                incident['timestamp'] = timestamp
+                incident['description'] = description or incident['description']
+            else:
+                if incident is not None and incident['id'] in self._dirty:
+                    self._flush_event.set()  # Previous incident closed: write it out now
+                incident = {
+                    'id': self._next_id,
+                    'camera_id': camera_id,
+                    'incident_type': group_type,
+                    'primary_detection': detection_type,
+                    'timestamp': timestamp,
+                    'count': 1,
+                    'description': description
+                }
+                self._next_id += 1
+                self._open[(camera_id, group_type)] = incident
+            
+            self._dirty[incident['id']] = incident
+            self._start()
+        self.database.data_changed()
+        return incident['id']
+    
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='incident-flush', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"[DB] ✗ Error flushing incidents: {e}")
+    
+    def pending(self):
+        """Copies of the incidents changed since the last flush."""
+        with self._lock:
+            return [dict(incident) for incident in self._dirty.values()]
+    
+    def overlay(self, incidents, limit=None):
+        """
+        Apply pending (unwritten) incident changes to incident rows read from the
+        database, so readers see them without waiting for a flush.
+        Returns the rows newest first, at most limit of them.
+        """
+        pending = self.pending()
+        if not pending:
+            return incidents
+        by_id = {incident['id']: incident for incident in incidents}
+        for incident in pending:
+            by_id[incident['id']] = dict(by_id.get(incident['id'], {'created_at': None}), **incident)
+        merged = sorted(by_id.values(), key=lambda incident: (incident['timestamp'], incident['id']), reverse=True)
+        return merged[:limit] if limit is not None else merged
+    
+    def flush(self):
+        """
+        Write every changed incident in one transaction. Returns the number written.
+        Incidents stay pending (visible to overlay()) until the write commits, so a
+        failed write leaves them for the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return 0
+                rows = [(i['id'], i['camera_id'], i['incident_type'], i['primary_detection'], i['timestamp'], i['count'],
+                         i['description']) for i in self._dirty.values()]
+        
+            with self.database.connections.write() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT INTO incidents (id, camera_id, incident_type, primary_detection, timestamp, count, description)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        timestamp = excluded.timestamp,
+                        count = excluded.count,
+                        description = excluded.description
+                ''', rows)
+        
+            with self._lock:
+                for row in rows:
+                    # An incident extended during the write stays dirty with its newer state
+                    incident = self._dirty.get(row[0])
+                    if incident is not None and row[4:] == (incident['timestamp'], incident['count'],
+                                                            incident['description']):
+                        del self._dirty[row[0]]
+            self.database.data_changed()
+            self.flush_count += 1
+            return len(rows)
 
 
 class AegisDatabase:
     """SQLite database manager for AEGIS system."""
     
-    def __init__(self):
-        """Initialize database connection and create tables if needed."""
-        self.connection = None
+    def __init__(self, db_path=None, pragmas=None, read_pool_size=READ_POOL_SIZE):
+        """Initialize database connections and create tables if needed."""
+        self.db_path = db_path or DB_PATH
+        self.connections = ConnectionManager(self.db_path, pragmas if pragmas is not None else DB_PRAGMAS,
+                                             read_pool_size)
+        self.incidents = IncidentAggregator(self)
+        
+        # The RECENT_CACHE_SIZE newest incidents, tagged with the data version
+        self._data_version = 0
+        self._recent_cache = None
+        self.recent_cache_hits = 0
+        self.recent_cache_misses = 0
+        
         self.initialize_db()
+        self.incidents.load()
     
     def initialize_db(self):
         """Create database tables if they don't exist."""
-        with db_lock:
-            conn = sqlite3.connect(DB_PATH)
+        with self.connections.write() as conn:
             cursor = conn.cursor()
             
             # Incidents table - stores grouped detection incidents
@@ -96,178 +340,107 @@ class AegisDatabase:
             
             # Create indices for performance
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_incidents_timestamp ON incidents(timestamp)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_incidents_type ON incidents(incident_type)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_audio_timestamp ON audio_logs(timestamp)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_audio_incident ON audio_logs(incident_id, timestamp)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_glare_incident ON glare_images(incident_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_liveness_incident ON liveness_validations(incident_id)')
             
-            conn.commit()
-            conn.close()
+            self._migrate(cursor)
     
-    def get_connection(self):
-        """Get thread-local database connection."""
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        return conn
+    def _migrate(self, cursor):
+        """Apply the SCHEMA_MIGRATIONS newer than the database's user_version."""
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+        for target, statements in SCHEMA_MIGRATIONS:
+            if target <= version:
+                continue
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(f'PRAGMA user_version = {int(target)}')
+            print(f"[DB] ✓ Migrated schema to version {target}")
     
     def get_incident_group_type(self, detection_type):
-        """
-        Determine the incident group type based on detection type.
-        Physical tamper types grouped together, liveness threats grouped together.
-        """
-        if detection_type in PHYSICAL_TAMPER_TYPES:
-            return 'PHYSICAL_TAMPER'
-        elif detection_type in LIVENESS_THREAT_TYPES:
-            return 'LIVENESS_THREAT'
-        else:
-            return 'UNKNOWN'
+        """Determine the incident group type based on detection type."""
+        return get_incident_group_type(detection_type)
     
-    def record_detection(self, detection_type, timestamp, description=None):
+    def record_detection(self, detection_type, timestamp, description=None, camera_id=None):
         """
-        Record a detection, grouping with recent incidents of the same type.
-        Returns the incident_id (newly created or existing).
+        Record a detection, grouping with recent incidents of the same type on the same camera.
+        Returns the incident_id (newly created or existing) immediately;
+        the incident row is written behind by the IncidentAggregator.
         """
-        with db_lock:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            group_type = self.get_incident_group_type(detection_type)
-            cutoff_time = timestamp - INCIDENT_GROUP_TIMEOUT
-            
-            # Check if there's a recent incident of the same group type
-            cursor.execute('''
-                SELECT id, timestamp, count FROM incidents
-                WHERE incident_type = ? AND timestamp > ?
-                ORDER BY timestamp DESC
-                LIMIT 1
-            ''', (group_type, cutoff_time))
-            
-            existing_incident = cursor.fetchone()
-            
-            if existing_incident:
-                # Update existing incident
-                incident_id = existing_incident['id']
-                new_count = existing_incident['count'] + 1
-                
-                cursor.execute('''
-                    UPDATE incidents
-                    SET count = ?, timestamp = ?, description = ?
-                    WHERE id = ?
-                ''', (new_count, timestamp, description or existing_incident['description'], incident_id))
-                
-                conn.commit()
-            else:
-                # Create new incident
-                cursor.execute('''
-                    INSERT INTO incidents (incident_type, primary_detection, timestamp, count, description)
-                    VALUES (?, ?, ?, 1, ?)
-                ''', (group_type, detection_type, timestamp, description))
-                
-                conn.commit()
-                incident_id = cursor.lastrowid
-            
-            # Cleanup old incidents (keep only last MAX_INCIDENTS_RETAINED)
-            self._cleanup_old_incidents(conn, cursor)
-            
-            conn.close()
-            return incident_id
+        return self.incidents.record(detection_type, timestamp, description, camera_id)
     
-    def _cleanup_old_incidents(self, conn, cursor):
-        """Remove incidents older than the last MAX_INCIDENTS_RETAINED."""
-        cursor.execute('''
-            SELECT id FROM incidents
-            ORDER BY timestamp DESC
-            LIMIT ? OFFSET ?
-        ''', (1, MAX_INCIDENTS_RETAINED - 1))
-        
-        result = cursor.fetchone()
-        if result:
-            cutoff_id = result['id']
-            
-            # Delete old incidents and cascade delete related data
-            cursor.execute('DELETE FROM audio_logs WHERE incident_id NOT IN (SELECT id FROM incidents)')
-            cursor.execute('DELETE FROM glare_images WHERE incident_id NOT IN (SELECT id FROM incidents)')
-            cursor.execute('DELETE FROM liveness_validations WHERE incident_id NOT IN (SELECT id FROM incidents)')
-            
-            conn.commit()
+    def flush(self):
+        """Write pending incident changes now (e.g. before reading or on shutdown)."""
+        return self.incidents.flush()
+    
+    def data_changed(self):
+        """Invalidate cached reads after a write (or a pending incident change)."""
+        self._data_version += 1
+    
+    def close(self):
+        """Flush pending incidents and close the shared connections."""
+        self.flush()
+        self.connections.close()
     
     def add_audio_log(self, text, timestamp, incident_id=None):
         """
         Add an audio transcript to the audio log.
         Auto-finds closest incident if incident_id not provided.
         """
-        with db_lock:
-            conn = self.get_connection()
+        if incident_id is None:
+            self.flush()  # The closest incident may still be pending in memory
+        
+        with self.connections.write() as conn:
             cursor = conn.cursor()
             
             # If no incident_id, find the closest incident by timestamp
             if incident_id is None:
-                cursor.execute('''
-                    SELECT id FROM incidents
-                    ORDER BY ABS(timestamp - ?) ASC
-                    LIMIT 1
-                ''', (timestamp,))
-                
-                closest_incident = cursor.fetchone()
-                incident_id = closest_incident['id'] if closest_incident else None
+                incident_id = find_nearest_incident(cursor, timestamp)
             
             cursor.execute('''
                 INSERT INTO audio_logs (incident_id, text, timestamp)
                 VALUES (?, ?, ?)
             ''', (incident_id, text, timestamp))
-            
-            conn.commit()
-            conn.close()
+        
+        self.data_changed()
     
     def add_glare_image(self, file_path, glare_percentage, timestamp, incident_id=None):
         """
         Add a glare image record to the database.
         Auto-finds incident if incident_id not provided.
         """
-        with db_lock:
-            conn = self.get_connection()
+        if incident_id is None:
+            self.flush()  # The closest incident may still be pending in memory
+        
+        with self.connections.write() as conn:
             cursor = conn.cursor()
             
             # If no incident_id, find the physical tamper incident
             if incident_id is None:
-                cursor.execute('''
-                    SELECT id FROM incidents
-                    WHERE incident_type = 'PHYSICAL_TAMPER'
-                    ORDER BY ABS(timestamp - ?) ASC
-                    LIMIT 1
-                ''', (timestamp,))
-                
-                closest_incident = cursor.fetchone()
-                incident_id = closest_incident['id'] if closest_incident else None
+                incident_id = find_nearest_incident(cursor, timestamp, 'PHYSICAL_TAMPER')
             
             cursor.execute('''
                 INSERT INTO glare_images (incident_id, file_path, glare_percentage, timestamp)
                 VALUES (?, ?, ?, ?)
             ''', (incident_id, file_path, glare_percentage, timestamp))
-            
-            conn.commit()
-            conn.close()
+        
+        self.data_changed()
     
     def add_liveness_validation(self, file_path, validation_status, frame_results, timestamp, incident_id=None):
         """
         Add a liveness video validation result to the database.
         frame_results should be a dict or JSON string of per-frame validation results.
         """
-        with db_lock:
-            conn = self.get_connection()
+        if incident_id is None:
+            self.flush()  # The closest incident may still be pending in memory
+        
+        with self.connections.write() as conn:
             cursor = conn.cursor()
             
             # If no incident_id, find the liveness threat incident
             if incident_id is None:
-                cursor.execute('''
-                    SELECT id FROM incidents
-                    WHERE incident_type = 'LIVENESS_THREAT'
-                    ORDER BY ABS(timestamp - ?) ASC
-                    LIMIT 1
-                ''', (timestamp,))
-                
-                closest_incident = cursor.fetchone()
-                incident_id = closest_incident['id'] if closest_incident else None
+                incident_id = find_nearest_incident(cursor, timestamp, 'LIVENESS_THREAT')
             
             # Convert frame_results to JSON if it's a dict
             if isinstance(frame_results, dict):
@@ -279,116 +452,153 @@ class AegisDatabase:
                 INSERT INTO liveness_validations (incident_id, file_path, validation_status, frame_results, timestamp)
                 VALUES (?, ?, ?, ?, ?)
             ''', (incident_id, file_path, validation_status, frame_results_json, timestamp))
-            
-            conn.commit()
-            conn.close()
+        
+        self.data_changed()
+    
+    def _hydrate(self, cursor, incidents):
+        """
+        Attach audio logs, glare images and liveness validations to incident rows
+        with one set-based query per child table, whatever the number of incidents.
+        """
+        ids = json.dumps([incident['id'] for incident in incidents])
+        children = {}
+        for table, columns in (('audio_logs', 'incident_id, text, timestamp'),
+                               ('glare_images', '*'),
+                               ('liveness_validations', '*')):
+            cursor.execute(f'''
+                SELECT {columns} FROM {table}
+                WHERE incident_id IN (SELECT value FROM json_each(?))
+                ORDER BY incident_id, timestamp ASC
+            ''', (ids,))
+            by_incident = children[table] = {}
+            for row in cursor.fetchall():
+                by_incident.setdefault(row['incident_id'], []).append(dict(row))
+        
+        result = []
+        for incident in incidents:
+            audio_logs = children['audio_logs'].get(incident['id'], [])
+            result.append({
+                'incident': dict(incident),
+                'audio_logs': [{'text': log['text'], 'timestamp': log['timestamp']} for log in audio_logs],
+                'glare_images': children['glare_images'].get(incident['id'], []),
+                'liveness_validations': children['liveness_validations'].get(incident['id'], [])
+            })
+        return result
     
     def get_recent_incidents(self, limit=5):
-        """Retrieve the last N incidents with all related data."""
-        with db_lock:
-            conn = self.get_connection()
+        """
+        Retrieve the last N incidents with all related data.
+        Up to RECENT_CACHE_SIZE they are served from memory until the next write changes
+        what they would be; the incidents are shared, so callers must not modify them.
+        Larger limits are read through iter_incidents() and never cached.
+        """
+        if limit > RECENT_CACHE_SIZE:
+            return list(self.iter_incidents(limit=limit))
+        
+        version = self._data_version
+        cached = self._recent_cache
+        if cached is not None and cached[0] == version:
+            self.recent_cache_hits += 1
+            return cached[1][:limit]
+        self.recent_cache_misses += 1
+        
+        with self.connections.read() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
                 SELECT * FROM incidents
-                ORDER BY timestamp DESC
+                ORDER BY timestamp DESC, id DESC
                 LIMIT ?
-            ''', (limit,))
-            
-            incidents = cursor.fetchall()
-            result = []
+            ''', (RECENT_CACHE_SIZE,))
             
-            for incident in incidents:
-                # Get audio logs for this incident
-                cursor.execute('''
-                    SELECT text, timestamp FROM audio_logs
-                    WHERE incident_id = ?
-                    ORDER BY timestamp ASC
-                ''', (incident['id'],))
-                
-                audio_logs = cursor.fetchall()
-                
-                # Get glare images for this incident
-                cursor.execute('''
-                    SELECT * FROM glare_images
-                    WHERE incident_id = ?
-                    ORDER BY timestamp ASC
-                ''', (incident['id'],))
-                
-                glare_images = cursor.fetchall()
-                
-                # Get liveness validations for this incident
-                cursor.execute('''
-                    SELECT * FROM liveness_validations
-                    WHERE incident_id = ?
-                    ORDER BY timestamp ASC
-                ''', (incident['id'],))
-                
-                liveness_validations = cursor.fetchall()
+            # Incidents still pending in memory are merged in, never flushed by a reader
+            incidents = self.incidents.overlay([dict(row) for row in cursor.fetchall()], RECENT_CACHE_SIZE)
+            result = self._hydrate(cursor, incidents)
+        
+        self._recent_cache = (version, result)
+        return result[:limit]
+    
+    def iter_incidents(self, since=None, until=None, incident_type=None, detection=None, after=None,
+                       limit=INCIDENT_PAGE_LIMIT, chunk_size=INCIDENT_CHUNK_SIZE):
+        """
+        Yield incidents with all related data, newest first, keyset-paginated on (timestamp, id).
+        
+        Args:
+            since, until (float): Only incidents with since <= timestamp < until.
+            incident_type (str): Only this group type (e.g. 'PHYSICAL_TAMPER').
+            detection (str): Only this primary detection (e.g. 'glare').
+            after (tuple): (timestamp, id) of the last incident already seen; continue below it.
+            limit (int): Maximum number of incidents to yield.
+            chunk_size (int): Incidents per query; a read connection is held only per chunk.
+        """
+        conditions, params = [], []
+        for condition, value in (('timestamp >= ?', since), ('timestamp < ?', until),
+                                 ('incident_type = ?', incident_type), ('primary_detection = ?', detection)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        
+        def matches(incident, key):
+            return ((since is None or incident['timestamp'] >= since)
+                    and (until is None or incident['timestamp'] < until)
+                    and (incident_type is None or incident['incident_type'] == incident_type)
+                    and (detection is None or incident['primary_detection'] == detection)
+                    and (key is None or (incident['timestamp'], incident['id']) < key))
+        
+        key = tuple(after) if after is not None else None
+        remaining = limit
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            where = conditions + (['(timestamp, id) < (?, ?)'] if key is not None else [])
+            with self.connections.read() as conn:
+                cursor = conn.cursor()
+                # Served by idx_incidents_timestamp or the (type|detection, timestamp) indexes,
+                # whose entries end in the rowid: no sort, no OFFSET, only this chunk's rows are read
+                cursor.execute(f'''
+                    SELECT * FROM incidents
+                    {'WHERE ' + ' AND '.join(where) if where else ''}
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ?
+                ''', params + list(key or ()) + [size])
+                rows = {row['id']: dict(row) for row in cursor.fetchall()}
                 
-                result.append({
-                    'incident': dict(incident),
-                    'audio_logs': [dict(log) for log in audio_logs],
-                    'glare_images': [dict(img) for img in glare_images],
-                    'liveness_validations': [dict(val) for val in liveness_validations]
-                })
-            
-            conn.close()
-            return result
+                # Pending incidents inside this chunk's key range replace or join the rows read
+                floor = None
+                if len(rows) == size:
+                    last = min(rows.values(), key=lambda i: (i['timestamp'], i['id']))
+                    floor = (last['timestamp'], last['id'])
+                for incident in self.incidents.pending():
+                    row = rows.pop(incident['id'], {'created_at': None})
+                    if matches(incident, key) and (floor is None or (incident['timestamp'], incident['id']) >= floor):
+                        rows[incident['id']] = dict(row, **incident)
+                incidents = sorted(rows.values(), key=lambda i: (i['timestamp'], i['id']), reverse=True)
+                incidents = incidents[:size if floor is not None else remaining]
+                hydrated = self._hydrate(cursor, incidents) if incidents else []
+            
+            yield from hydrated
+            if floor is None:
+                return  # The database had no more rows in range
+            remaining -= len(incidents)
+            key = (incidents[-1]['timestamp'], incidents[-1]['id']) if incidents else floor
     
     def get_incident_by_id(self, incident_id):
         """Retrieve a specific incident with all related data."""
-        with db_lock:
-            conn = self.get_connection()
+        with self.connections.read() as conn:
             cursor = conn.cursor()
             
             cursor.execute('SELECT * FROM incidents WHERE id = ?', (incident_id,))
-            incident = cursor.fetchone()
+            row = cursor.fetchone()
+            incident = next((i for i in self.incidents.overlay([dict(row)] if row else [])
+                             if i['id'] == incident_id), None)
             
             if not incident:
-                conn.close()
                 return None
             
-            # Get audio logs
-            cursor.execute('''
-                SELECT text, timestamp FROM audio_logs
-                WHERE incident_id = ?
-                ORDER BY timestamp ASC
-            ''', (incident_id,))
-            
-            audio_logs = cursor.fetchall()
-            
-            # Get glare images
-            cursor.execute('''
-                SELECT * FROM glare_images
-                WHERE incident_id = ?
-                ORDER BY timestamp ASC
-            ''', (incident_id,))
-            
-            glare_images = cursor.fetchall()
-            
-            # Get liveness validations
-            cursor.execute('''
-                SELECT * FROM liveness_validations
-                WHERE incident_id = ?
-                ORDER BY timestamp ASC
-            ''', (incident_id,))
-            
-            liveness_validations = cursor.fetchall()
-            
-            conn.close()
-            
-            return {
-                'incident': dict(incident),
-                'audio_logs': [dict(log) for log in audio_logs],
-                'glare_images': [dict(img) for img in glare_images],
-                'liveness_validations': [dict(val) for val in liveness_validations]
-            }
+            return self._hydrate(cursor, [incident])[0]
     
     def get_audio_logs_for_incident(self, incident_id):
         """Retrieve audio logs for a specific incident."""
-        with db_lock:
-            conn = self.get_connection()
+        with self.connections.read() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -398,19 +608,16 @@ class AegisDatabase:
             ''', (incident_id,))
             
             logs = cursor.fetchall()
-            conn.close()
             
             return [dict(log) for log in logs]
     
     def get_glare_image_path(self, image_id):
         """Retrieve the file path for a glare image."""
-        with db_lock:
-            conn = self.get_connection()
+        with self.connections.read() as conn:
             cursor = conn.cursor()
             
             cursor.execute('SELECT file_path FROM glare_images WHERE id = ?', (image_id,))
             result = cursor.fetchone()
-            conn.close()
             
             return result['file_path'] if result else None
 
@@ -419,22 +626,6 @@ class AegisDatabase:
 aegis_db = AegisDatabase()
 
 
-def save_glare_image(frame, glare_percentage, timestamp):
-    """
-    Save a glare-rescued frame as JPEG to storage and return the file path.
-    """
-    import cv2
-    
-    # Create filename with timestamp
-    filename = f"glare_{int(timestamp * 1000)}.jpg"
-    file_path = os.path.join(GLARE_IMAGES_DIR, filename)
-    
-    # Save as JPEG
-    cv2.imwrite(file_path, frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-    
-    return file_path
-
-
 def get_incident_description(detection_type):
     """Generate a description for a detection based on type."""
     descriptions = {
@@ -0,0 +1,140 @@
+"""
+AEGIS Database Connections
+Persistent SQLite connections shared by the AegisDatabase methods.
+
+One writer connection, guarded by a lock, serializes all writes. Reads use
+a pool of read-only connections; in WAL mode they see the last committed
+state and never wait for the writer. Connections live for the whole
+process, so sqlite3's per-connection statement cache reuses the prepared
+statements of repeated queries.
+"""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+# PRAGMAs applied to every connection (auto_vacuum and journal_mode are persistent and set
+# by the writer; auto_vacuum only takes effect on a new file, so it must come first)
+DEFAULT_PRAGMAS = {
+    'auto_vacuum': 'INCREMENTAL',   # Freed pages are returned by PRAGMA incremental_vacuum
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',    # WAL + NORMAL: durable at checkpoints, no fsync per commit
+    'cache_size': -16000,       # Negative = KiB (16 MB page cache per connection)
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,       # ms
+}
+
+PERSISTENT_PRAGMAS = ('auto_vacuum', 'journal_mode')
+
+READ_POOL_SIZE = 4
+STATEMENT_CACHE_SIZE = 256      # Prepared statements kept per connection
+
+
+class ConnectionManager:
+    """Writer connection plus a pool of read-only connections to one database file."""
+
+    def __init__(self, db_path, pragmas=None, read_pool_size=READ_POOL_SIZE):
+        """
+        Args:
+            db_path (str): Database file (created if missing).
+            pragmas (dict): Overrides for DEFAULT_PRAGMAS, e.g. {'synchronous': 'FULL'}.
+            read_pool_size (int): Maximum number of read-only connections.
+        """
+        self.db_path = db_path
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        self.pragmas.update(pragmas or {})
+        self.read_pool_size = max(1, read_pool_size)
+
+        self._write_lock = threading.RLock()
+        self._writer = None
+        self._readers = queue.LifoQueue()
+        self._reader_count = 0
+        self._reader_lock = threading.Lock()
+
+    def _configure(self, conn, read_only=False):
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            if read_only and name in PERSISTENT_PRAGMAS:
+                continue
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    @property
+    def writer(self):
+        """The writer connection (use write() to hold the write lock)."""
+        writer = self._writer
+        if writer is None:
+            # Readers get here too (via _open_reader), so only one thread may create it
+            with self._write_lock:
+                if self._writer is None:
+                    Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+                    conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                           cached_statements=STATEMENT_CACHE_SIZE)
+                    self._writer = self._configure(conn)
+                writer = self._writer
+        return writer
+
+    @contextmanager
+    def write(self):
+        """
+        Hold the writer connection for one transaction.
+        Commits when the block exits normally, rolls back on an exception.
+        """
+        with self._write_lock:
+            conn = self.writer
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def _open_reader(self):
+        self.writer  # Make sure the file exists and is in WAL mode
+        uri = Path(self.db_path).resolve().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        return self._configure(conn, read_only=True)
+
+    @contextmanager
+    def read(self):
+        """Borrow a read-only connection from the pool."""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._reader_lock:
+                create = self._reader_count < self.read_pool_size
+                if create:
+                    self._reader_count += 1
+            if create:
+                try:
+                    conn = self._open_reader()
+                except BaseException:
+                    with self._reader_lock:
+                        self._reader_count -= 1  # Free the slot, or the pool shrinks for good
+                    raise
+            else:
+                conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    def close(self):
+        """Close every connection (the manager reopens them on next use)."""
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._reader_lock:
+            self._reader_count = 0
@@ -0,0 +1,177 @@
+"""
+AEGIS Detection Channels
+Per-client detection_update payloads for dashboards on thin links.
+
+A client that subscribes chooses the channels it shows (detector sections
+and the glare histogram), a histogram encoding, and whether it wants delta
+updates. Deltas carry only the fields that changed since the last payload
+sent to that client, and null for the ones that are gone; the first payload
+is always complete. Clients that
+never subscribe keep receiving the full detection_data broadcast.
+"""
+
+import threading
+
+import numpy as np
+
+# Sections of detection_data a client can subscribe to. 'histogram' is the
+# glare histogram, carried separately from the rest of the glare section.
+DETECTION_CHANNELS = ('blur', 'shake', 'reposition', 'glare', 'liveness', 'histogram', 'capture')
+DEFAULT_CHANNELS = ('blur', 'shake', 'reposition', 'glare', 'liveness', 'histogram')
+
+# 'float': 256 floats as a JSON list (the broadcast format)
+# 'uint16': 256 little-endian uint16 counts as binary (512 bytes)
+# 'buckets26': 26 little-endian uint16 bucket counts as binary (52 bytes)
+HISTOGRAM_FORMATS = ('float', 'uint16', 'buckets26')
+DEFAULT_HISTOGRAM_FORMAT = 'uint16'
+
+FLOAT_DECIMALS = 3  # Rounding of metric values in subscribed payloads
+
+# Same bins as FrameContext.hist26 (~10 gray levels per bucket)
+_BUCKET26 = (np.arange(256) * 26) // 256
+_UINT16_MAX = 65535
+
+
+def encode_histogram(histogram, histogram_format):
+    """
+    Encode a 256-bin histogram.
+
+    Counts above 65535 (large analysis frames) are scaled down
+    proportionally; dashboards only draw relative bar heights.
+    """
+    if histogram_format == 'float' or histogram is None or len(histogram) == 0:
+        return histogram
+    counts = np.asarray(histogram, dtype=np.float64).ravel()
+    if histogram_format == 'buckets26':
+        counts = np.bincount(_BUCKET26[:len(counts)], weights=counts, minlength=26)
+    peak = counts.max()
+    if peak > _UINT16_MAX:
+        counts = counts * (_UINT16_MAX / peak)
+    return np.rint(counts).astype('<u2').tobytes()
+
+
+def diff_payload(previous, current):
+    """
+    Fields of current that differ from previous, one level deep into sections.
+    Sections and fields of previous missing from current are None (sent as null: deleted).
+    """
+    delta = {key: None for key in previous if key not in current}
+    for key, value in current.items():
+        old = previous.get(key)
+        if isinstance(value, dict):
+            old = old if isinstance(old, dict) else {}
+            changed = {field: v for field, v in value.items() if field not in old or old[field] != v}
+            changed.update((field, None) for field in old if field not in value)
+            if changed:
+                delta[key] = changed
+        elif key not in previous or old != value:
+            delta[key] = value
+    return delta
+
+
+class _Subscriber:
+    """Channel selection and last sent payload of one client."""
+
+    def __init__(self, sid, camera_id, channels, histogram_format, delta):
+        self.sid = sid
+        self.camera_id = camera_id
+        self.channels = channels
+        self.histogram_format = histogram_format
+        self.delta = delta
+        self.last_payload = {}  # camera_id -> last payload sent
+
+
+class DetectionChannels:
+    """Fans detection_update out to the broadcast and to subscribed clients."""
+
+    def __init__(self, socketio):
+        self.socketio = socketio
+        self._lock = threading.Lock()
+        self._subscribers = {}  # sid -> _Subscriber
+
+    def subscribe(self, sid, camera_id=None, channels=None, histogram_format=None, delta=True):
+        """
+        Replace a client's subscription.
+
+        Args:
+            sid (str): Socket.IO session id.
+            camera_id (int): Only this camera's updates, or None for every camera.
+            channels (list): Names from DETECTION_CHANNELS (default DEFAULT_CHANNELS).
+            histogram_format (str): One of HISTOGRAM_FORMATS.
+            delta (bool): Send only changed fields after the first payload.
+
+        Returns:
+            bool: False if a channel or the histogram format is unknown.
+        """
+        channels = DEFAULT_CHANNELS if channels is None else channels
+        if isinstance(channels, str):
+            channels = (channels,)
+        histogram_format = histogram_format or DEFAULT_HISTOGRAM_FORMAT
+        if any(channel not in DETECTION_CHANNELS for channel in channels):
+            return False
+        if histogram_format not in HISTOGRAM_FORMATS:
+            return False
+        with self._lock:
+            self._subscribers[sid] = _Subscriber(sid, camera_id, frozenset(channels),
+                                                 histogram_format, bool(delta))
+        return True
+
+    def unsubscribe(self, sid):
+        with self._lock:
+            self._subscribers.pop(sid, None)
+
+    def project(self, detection_data, channels, histogram_format, encoded_histograms=None):
+        """Build the compact payload of detection_data for a set of channels."""
+        payload = {'camera_id': detection_data.get('camera_id'), 'frame': detection_data.get('frame')}
+        for section, values in detection_data.items():
+            if not isinstance(values, dict):
+                continue
+            fields = {}
+            if section in channels:
+                fields = {field: round(v, FLOAT_DECIMALS) if isinstance(v, float) else v
+                          for field, v in values.items() if field != 'histogram'}
+            if section == 'glare' and 'histogram' in channels and 'histogram' in values:
+                if encoded_histograms is None:
+                    encoded_histograms = {}
+                if histogram_format not in encoded_histograms:
+                    encoded_histograms[histogram_format] = encode_histogram(values['histogram'], histogram_format)
+                fields['histogram'] = encoded_histograms[histogram_format]
+                fields['histogram_format'] = histogram_format
+            if fields:
+                payload[section] = fields
+        return payload
+
+    def publish(self, detection_data):
+        """Emit one detection_update (called from the emit sender thread)."""
+        camera_id = detection_data.get('camera_id')
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+
+        # Clients without a subscription get the full payload
+        self.socketio.emit('detection_update', detection_data, namespace='/',
+                           skip_sid=[sub.sid for sub in subscribers] or None)
+
+        encoded_histograms = {}  # Each format is encoded once per update
+        for sub in subscribers:
+            if sub.camera_id is not None and sub.camera_id != camera_id:
+                continue
+            payload = self.project(detection_data, sub.channels, sub.histogram_format, encoded_histograms)
+            previous = sub.last_payload.get(camera_id)
+            sub.last_payload[camera_id] = payload
+            if sub.delta and previous is not None:
+                message = diff_payload(previous, payload)
+                message['camera_id'] = camera_id
+                message['frame'] = payload['frame']
+                message['delta'] = True
+            else:
+                message = dict(payload, delta=False)
+            self.socketio.emit('detection_update', message, namespace='/', to=sub.sid)
+
+    def stats(self):
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        return {
+            'subscribers': len(subscribers),
+            'delta': sum(1 for sub in subscribers if sub.delta),
+            'histogram_formats': sorted({sub.histogram_format for sub in subscribers})
+        }
@@ -0,0 +1,136 @@
+"""
+AEGIS Detector Scheduler
+Decides which detection stages run on each frame of a camera pipeline.
+
+Every stage has a cadence (run every Nth frame) and a per-frame time budget.
+Stages are run in priority order; when higher-priority stages have used up
+the budget of the stages after them, those lower-priority stages are
+deferred and their last result is reused. Each result is tagged with the
+frame it was computed on so callers can report how fresh it is.
+"""
+
+import time
+
+# Stages in priority order (highest first). The first stage is never deferred.
+DETECTOR_PRIORITY = ('motion', 'liveness', 'blur', 'glare')
+
+# Run each stage every Nth frame
+DEFAULT_DETECTOR_CADENCE = {
+    'motion': 1,     # Optical flow (shake + reposition)
+    'liveness': 1,   # Freeze / blackout
+    'blur': 2,       # Laplacian variance
+    'glare': 5,      # Viability histogram
+}
+
+# Per-frame time budget of each stage in milliseconds (sum ~ one frame at 30 FPS)
+DEFAULT_DETECTOR_BUDGET_MS = {
+    'motion': 22.0,
+    'liveness': 2.0,
+    'blur': 4.0,
+    'glare': 5.0,
+}
+
+# A deferred stage is forced to run once its result is this many cadences old
+MAX_DEFER_FACTOR = 4
+
+# Smoothing factor for the per-stage cost estimate
+COST_ALPHA = 0.2
+
+
+class DetectorScheduler:
+    """
+    Per-camera cadence and time budget for the detection stages.
+
+    Usage, once per frame:
+
+        scheduler.begin_frame(frame_id)
+        result, computed_frame = scheduler.run('blur', compute_blur)
+    """
+
+    def __init__(self, cadence=None, budget_ms=None, priority=DETECTOR_PRIORITY,
+                 max_defer_factor=MAX_DEFER_FACTOR, clock=time.perf_counter):
+        """
+        Args:
+            cadence (dict): stage -> run every Nth frame (overrides DEFAULT_DETECTOR_CADENCE).
+            budget_ms (dict): stage -> per-frame budget in ms (overrides DEFAULT_DETECTOR_BUDGET_MS).
+                None for a stage disables budget deferral for it.
+            priority (tuple): Stage names, highest priority first.
+            max_defer_factor (int): Force a stage once its result is this many cadences old.
+            clock (callable): Monotonic clock in seconds (injectable for tests).
+        """
+        self.cadence = dict(DEFAULT_DETECTOR_CADENCE)
+        self.cadence.update(cadence or {})
+        budget = dict(DEFAULT_DETECTOR_BUDGET_MS)
+        budget.update(budget_ms or {})
+        self.priority = tuple(priority)
+        self.max_defer_factor = max_defer_factor
+        self.clock = clock
+
+        # Deadline of each stage, in seconds from the start of the frame: the
+        # budgets of every stage up to and including it
+        self._deadline = {}
+        total = 0.0
+        for stage in self.priority:
+            if budget.get(stage) is None:
+                self._deadline[stage] = None
+                continue
+            total += budget[stage] / 1000.0
+            self._deadline[stage] = total
+
+        self.deferred_count = {stage: 0 for stage in self.priority}
+        self._results = {}
+        self._cost = {}
+        self._frame_id = 0
+        self._frame_start = None
+
+    def reset(self):
+        """Drop all cached results (e.g. after the source restarts)."""
+        self._results.clear()
+        self._cost.clear()
+        self.deferred_count = {stage: 0 for stage in self.priority}
+
+    def begin_frame(self, frame_id):
+        """Start timing a new frame."""
+        self._frame_id = frame_id
+        self._frame_start = self.clock()
+
+    def is_due(self, stage):
+        """True when the stage's cadence calls for a fresh result on this frame."""
+        last = self._results.get(stage)
+        return last is None or self._frame_id - last[1] >= self.cadence.get(stage, 1)
+
+    def run(self, stage, compute):
+        """
+        Run compute() for a stage if it is due and within budget.
+
+        Returns:
+            tuple: (result, computed_frame) - computed_frame is the frame id
+                the result was computed on (older than the current frame when
+                the last result was reused).
+        """
+        last = self._results.get(stage)
+        if last is not None:
+            age = self._frame_id - last[1]
+            cadence = self.cadence.get(stage, 1)
+            if age < cadence:
+                return last
+            forced = age >= cadence * self.max_defer_factor
+            deadline = self._deadline.get(stage)
+            if not forced and deadline is not None and stage != self.priority[0]:
+                elapsed = self.clock() - self._frame_start
+                if elapsed + self._cost.get(stage, 0.0) > deadline:
+                    self.deferred_count[stage] = self.deferred_count.get(stage, 0) + 1
+                    return last
+
+        start = self.clock()
+        result = compute()
+        cost = self.clock() - start
+        previous_cost = self._cost.get(stage)
+        self._cost[stage] = cost if previous_cost is None else previous_cost + COST_ALPHA * (cost - previous_cost)
+
+        self._results[stage] = (result, self._frame_id)
+        return self._results[stage]
+
+    def cost_ms(self):
+        """Smoothed cost of each stage in milliseconds."""
+        return {stage: cost * 1000.0 for stage, cost in self._cost.items()}
@@ -0,0 +1,184 @@
+"""
+AEGIS Emit Queue
+Moves Socket.IO sends off the camera result path.
+
+Callers enqueue events without blocking; a dedicated sender thread emits them
+in order. Events enqueued with a coalesce key (e.g. one detection_update per
+camera) replace the pending event with the same key, so only the newest is
+ever sent. When the queue is full the oldest pending coalescible event is
+dropped; control events enqueued without a key (alert, alert_clear) are
+never dropped, and may take the queue past maxsize.
+
+An event may carry its own send function in place of socketio.emit, for
+payloads that are built per client at send time.
+"""
+
+import threading
+import time
+from collections import deque
+
+EMIT_QUEUE_SIZE = 256       # Pending events before coalescible ones are dropped
+LATENCY_ALPHA = 0.1         # Smoothing factor for the emit latency estimate
+
+
+class EmitQueue:
+    """Bounded FIFO of Socket.IO events drained by one sender thread."""
+
+    def __init__(self, socketio, app=None, maxsize=EMIT_QUEUE_SIZE, name='socketio-emit'):
+        """
+        Args:
+            socketio (flask_socketio.SocketIO): Server used to emit.
+            app (flask.Flask): Application whose context wraps each emit.
+            maxsize (int): Pending events before coalescible ones are dropped.
+            name (str): Sender thread name.
+        """
+        self.socketio = socketio
+        self.app = app
+        self.maxsize = maxsize
+        self.name = name
+
+        self._pending = deque()     # (coalesce_key or None, event, data, send, kwargs, enqueue_time)
+        self._coalesced = {}        # coalesce_key -> newest (event, data, send, kwargs, enqueue_time)
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.enqueued_count = 0
+        self.sent_count = 0
+        self.coalesced_count = 0
+        self.dropped_count = 0
+        self.max_depth = 0
+        self._latency = None        # Smoothed enqueue -> sent time in seconds
+        self._max_latency = 0.0
+        self._send_time = None      # Smoothed time spent inside socketio.emit
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def emit(self, event, data, coalesce_key=None, send=None, **kwargs):
+        """
+        Queue an event without blocking.
+
+        Args:
+            event (str): Socket.IO event name.
+            data: Event payload.
+            coalesce_key: Replace any pending event with the same key (keeping its
+                place in the queue) instead of queueing another one.
+            send (callable): send(data), called on the sender thread instead of socketio.emit.
+            **kwargs: Passed to socketio.emit (e.g. to=sid).
+        """
+        now = time.monotonic()
+        with self._condition:
+            self.enqueued_count += 1
+            if coalesce_key is not None and coalesce_key in self._coalesced:
+                # Keep the first enqueue time: latency is measured from the oldest update it replaces
+                enqueue_time = self._coalesced[coalesce_key][-1]
+                self._coalesced[coalesce_key] = (event, data, send, kwargs, enqueue_time)
+                self.coalesced_count += 1
+                return
+
+            if len(self._pending) >= self.maxsize and not self._drop_coalescible():
+                if coalesce_key is not None:
+                    # Nothing older can go, and control events are never dropped
+                    self.dropped_count += 1
+                    return
+            if coalesce_key is not None:
+                self._coalesced[coalesce_key] = (event, data, send, kwargs, now)
+            self._pending.append((coalesce_key, event, data, send, kwargs, now))
+            self.max_depth = max(self.max_depth, len(self._pending))
+            self._condition.notify()
+
+    def _drop_coalescible(self):
+        """Drop the oldest pending event that has a coalesce key. Caller holds the lock."""
+        for index, entry in enumerate(self._pending):
+            if entry[0] is not None:
+                del self._pending[index]
+                del self._coalesced[entry[0]]
+                self.dropped_count += 1
+                return True
+        return False
+
+    def _next(self):
+        """Pop the next event to send, or None once stopped."""
+        with self._condition:
+            while not self._pending:
+                if self._stop_event.is_set():
+                    return None
+                self._condition.wait(0.5)
+            coalesce_key, *item = self._pending.popleft()
+            if coalesce_key is not None:
+                item = self._coalesced.pop(coalesce_key)
+            return item
+
+    def _run(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            event, data, send, kwargs, enqueue_time = item
+            start = time.monotonic()
+            try:
+                if self.app is not None:
+                    with self.app.app_context():
+                        self._send(event, data, send, kwargs)
+                else:
+                    self._send(event, data, send, kwargs)
+            except Exception as e:
+                print(f"Error emitting {event}: {e}")
+            end = time.monotonic()
+            self._record(end - enqueue_time, end - start)
+
+    def _send(self, event, data, send, kwargs):
+        if send is not None:
+            send(data)
+        else:
+            kwargs.setdefault('namespace', '/')
+            self.socketio.emit(event, data, **kwargs)
+
+    def _record(self, latency, send_time):
+        with self._condition:
+            self.sent_count += 1
+            self._max_latency = max(self._max_latency, latency)
+            if self._latency is None:
+                self._latency, self._send_time = latency, send_time
+            else:
+                self._latency += LATENCY_ALPHA * (latency - self._latency)
+                self._send_time += LATENCY_ALPHA * (send_time - self._send_time)
+
+    @property
+    def depth(self):
+        return len(self._pending)
+
+    def wait_empty(self, timeout=None):
+        """Block until every queued event has been sent (for tests and shutdown)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._pending or (self.sent_count + self.coalesced_count + self.dropped_count) < self.enqueued_count:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def stats(self):
+        with self._condition:
+            return {
+                'depth': len(self._pending),
+                'max_depth': self.max_depth,
+                'enqueued': self.enqueued_count,
+                'sent': self.sent_count,
+                'coalesced': self.coalesced_count,
+                'dropped': self.dropped_count,
+                'latency_ms': round((self._latency or 0.0) * 1000.0, 3),
+                'max_latency_ms': round(self._max_latency * 1000.0, 3),
+                'send_ms': round((self._send_time or 0.0) * 1000.0, 3)
+            }
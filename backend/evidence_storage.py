@@ -0,0 +1,41 @@
+"""
+AEGIS Evidence Storage
+Locations of the evidence files kept under storage/ and the glare image writer.
+
+Kept apart from the database module so camera worker processes can save
+glare images without building their own AegisDatabase.
+"""
+
+import itertools
+import os
+
+import cv2
+
+STORAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'storage')
+GLARE_IMAGES_DIR = os.path.join(STORAGE_DIR, 'glare_images')
+LIVENESS_VIDEOS_DIR = os.path.join(STORAGE_DIR, 'liveness_videos')
+
+
+def save_glare_image(frame, glare_percentage, timestamp, camera_id=None, directory=GLARE_IMAGES_DIR):
+    """
+    Save a glare-rescued frame as JPEG to storage and return the file path.
+    
+    The name carries the camera id and the timestamp in milliseconds. The file
+    is created exclusively, with a numeric suffix on collision, so cameras (or
+    worker processes) saving in the same millisecond never overwrite each other.
+    """
+    ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    if not ok:
+        raise ValueError("Could not encode glare image")
+    os.makedirs(directory, exist_ok=True)
+    
+    camera = f"cam{camera_id}_" if camera_id is not None else ""
+    stem = f"glare_{camera}{int(timestamp * 1000)}"
+    for attempt in itertools.count():
+        file_path = os.path.join(directory, f"{stem}_{attempt}.jpg" if attempt else f"{stem}.jpg")
+        try:
+            with open(file_path, 'xb') as f:
+                f.write(jpeg)
+            return file_path
+        except FileExistsError:
+            continue
@@ -0,0 +1,158 @@
+"""
+AEGIS Frame Push
+Pushes encoded JPEG frames to dashboard clients over Socket.IO as binary
+payloads, in place of HTTP image polling.
+
+Clients subscribe to one camera's 'raw' and/or 'processed' stream. One push
+thread per camera waits for new frame versions and sends the shared cached
+JPEG to each subscriber. Backpressure is per client and stream: a frame is
+only sent once the client has acknowledged the previous one, so a slow
+client skips frames instead of building a queue on the server. The
+acknowledgement itself sends the newest frame if the client does not have
+it yet, so the last frame before a camera goes quiet is never withheld.
+"""
+
+import threading
+import time
+from functools import partial
+
+from .pipeline_supervisor import DEFAULT_JPEG_QUALITY
+
+FRAME_STREAMS = ('raw', 'processed')
+
+PUSH_MAX_FPS = 15.0         # Per-client frame rate cap
+ACK_TIMEOUT = 2.0           # Send newer frames again after this long without an acknowledgement (lost ack)
+PUSH_IDLE_TIMEOUT = 1.0     # Seconds to wait for a new frame before re-checking subscribers
+
+
+class _Subscription:
+    """Streams and flow-control state of one client."""
+
+    def __init__(self, sid, camera_id, streams, max_fps):
+        self.sid = sid
+        self.camera_id = camera_id
+        self.streams = streams
+        self.min_interval = 1.0 / max_fps
+        self.next_send_time = {stream: 0.0 for stream in streams}
+        self.in_flight = {}  # stream -> send time of the unacknowledged frame
+        self.sent_version = {stream: None for stream in streams}
+        self.sent = 0
+        self.dropped = 0    # Frame versions skipped between two sends
+        self.lock = threading.Lock()  # The push thread and ack callbacks both send
+
+
+class FramePusher:
+    """Subscription registry and per-camera push threads."""
+
+    def __init__(self, socketio, get_feed, max_fps=PUSH_MAX_FPS, quality=DEFAULT_JPEG_QUALITY):
+        """
+        Args:
+            socketio (flask_socketio.SocketIO): Server used to emit frames.
+            get_feed (callable): camera_id -> CameraFeed or None.
+            max_fps (float): Per-client frame rate cap.
+            quality (int): JPEG quality of pushed frames.
+        """
+        self.socketio = socketio
+        self.get_feed = get_feed
+        self.max_fps = max_fps
+        self.quality = quality
+        self._lock = threading.Lock()
+        self._subscriptions = {}    # sid -> _Subscription
+        self._threads = {}          # camera_id -> push thread
+
+    def subscribe(self, sid, camera_id, streams=FRAME_STREAMS, max_fps=None):
+        """Subscribe a client to streams of one camera (replaces its previous subscription)."""
+        feed = self.get_feed(camera_id)
+        if feed is None:
+            return False
+        if isinstance(streams, str):
+            streams = (streams,)
+        streams = tuple(stream for stream in streams if stream in FRAME_STREAMS)
+        if not streams:
+            return False
+        max_fps = min(max_fps, self.max_fps) if max_fps and max_fps > 0 else self.max_fps
+
+        with self._lock:
+            self._subscriptions[sid] = _Subscription(sid, camera_id, streams, max_fps)
+            thread = self._threads.get(camera_id)
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._push_loop, args=(camera_id, feed),
+                                          name=f'frame-push-{camera_id}', daemon=True)
+                self._threads[camera_id] = thread
+                thread.start()
+        return True
+
+    def unsubscribe(self, sid):
+        with self._lock:
+            self._subscriptions.pop(sid, None)
+
+    def _subscribers(self, camera_id):
+        with self._lock:
+            return [sub for sub in self._subscriptions.values() if sub.camera_id == camera_id]
+
+    def _acknowledge(self, subscription, stream, feed, *args):
+        with subscription.lock:
+            subscription.in_flight.pop(stream, None)
+        # Frames published while this one was in flight were skipped; send the newest now
+        self._push(subscription, stream, feed.snapshot, feed)
+
+    def _push_loop(self, camera_id, feed):
+        last_version = -1
+        while True:
+            subscribers = self._subscribers(camera_id)
+            if not subscribers:
+                with self._lock:
+                    # Re-check under the lock so a concurrent subscribe() restarts the thread
+                    if not any(sub.camera_id == camera_id for sub in self._subscriptions.values()):
+                        self._threads.pop(camera_id, None)
+                        return
+                continue
+
+            snapshot = feed.wait_for_snapshot(last_version, timeout=PUSH_IDLE_TIMEOUT)
+            if snapshot is None:
+                # Idle: catch up clients that were paced when the newest frame arrived
+                snapshot = feed.snapshot
+            last_version = snapshot.version
+
+            for sub in self._subscribers(camera_id):
+                for stream in sub.streams:
+                    self._push(sub, stream, snapshot, feed)
+
+    def _push(self, sub, stream, snapshot, feed):
+        with sub.lock:
+            now = time.monotonic()
+            sent_version = sub.sent_version[stream]
+            if sent_version is not None and snapshot.version <= sent_version:
+                return  # The client already has this frame
+            if now < sub.next_send_time[stream]:
+                return  # Pacing: this client gets a later version
+            sent_time = sub.in_flight.get(stream)
+            if sent_time is not None and now - sent_time < ACK_TIMEOUT:
+                return  # Backpressure: previous frame not acknowledged yet; the ack sends the newest
+
+            jpeg = snapshot.jpeg(stream, self.quality, feed.jpeg_stats)
+            if jpeg is None:
+                return
+            if sent_version is not None:
+                sub.dropped += snapshot.version - sent_version - 1
+            sub.sent_version[stream] = snapshot.version
+            sub.in_flight[stream] = now
+            sub.next_send_time[stream] = max(sub.next_send_time[stream] + sub.min_interval, now)
+            sub.sent += 1
+            self.socketio.emit('frame', {
+                'camera_id': sub.camera_id,
+                'stream': stream,
+                'version': snapshot.version,
+                'jpeg': jpeg
+            }, to=sub.sid, callback=partial(self._acknowledge, sub, stream, feed))
+
+    def stats(self, camera_id=None):
+        """Subscriber count and sent/dropped frame totals, optionally for one camera."""
+        with self._lock:
+            subscribers = [sub for sub in self._subscriptions.values()
+                           if camera_id is None or sub.camera_id == camera_id]
+        return {
+            'subscribers': len(subscribers),
+            'sent': sum(sub.sent for sub in subscribers),
+            'dropped': sum(sub.dropped for sub in subscribers)
+        }
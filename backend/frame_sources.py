@@ -0,0 +1,506 @@
+"""
+AEGIS Frame Sources
+Pluggable frame providers for the camera pipeline: live webcam, video file,
+directory of images, and a synthetic generator that injects tamper events.
+The non-webcam sources let the full server run headless (CI, build machines)
+and give reproducible input for throughput measurements.
+"""
+
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Webcam capture defaults
+DEFAULT_WIDTH = 640
+DEFAULT_HEIGHT = 480
+DEFAULT_FPS = 30
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff'}
+
+# Effects the synthetic generator can inject
+SYNTHETIC_EFFECTS = {'blur', 'shake', 'glare', 'freeze', 'blackout'}
+
+# Preallocated frame buffers in a CaptureThread ring (at least 3: one being
+# written, the newest frame, and the one being analyzed)
+CAPTURE_RING_SLOTS = 4
+
+
+class FrameSource:
+    """
+    Base class for frame providers.
+
+    Subclasses implement open() and _read(); read() returns (ret, frame) like
+    cv2.VideoCapture.read() and applies optional real-time pacing.
+
+    read() accepts an optional preallocated out buffer. Sources backed by
+    cv2.VideoCapture decode straight into it when its shape and type match;
+    the others ignore it, so callers must check whether frame is out.
+    """
+
+    def __init__(self, fps=None):
+        """
+        Args:
+            fps (float): Pace frames at this rate. None delivers frames as fast as possible.
+        """
+        self.fps = fps
+        self._next_frame_time = None
+
+    @property
+    def name(self):
+        return type(self).__name__
+
+    @property
+    def is_live(self):
+        """
+        True when frames arrive on their own clock (a device or a paced source),
+        so a slow consumer should skip to the newest frame instead of stalling capture.
+        """
+        return bool(self.fps)
+
+    def open(self):
+        """Prepare the source. Returns True on success."""
+        return True
+
+    def read(self, out=None):
+        """Return (ret, frame). ret is False when the source is exhausted."""
+        if self.fps:
+            now = time.monotonic()
+            if self._next_frame_time is None:
+                self._next_frame_time = now
+            elif now < self._next_frame_time:
+                time.sleep(self._next_frame_time - now)
+            # Never bank time: after a slow consumer, resume pacing from now
+            self._next_frame_time = max(self._next_frame_time + 1.0 / self.fps, time.monotonic())
+        return self._read(out)
+
+    def _read(self, out=None):
+        raise NotImplementedError
+
+    def release(self):
+        """Release any underlying resources."""
+        pass
+
+
+class WebcamSource(FrameSource):
+    """Live capture device opened with cv2.VideoCapture(index)."""
+
+    def __init__(self, index=0, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, fps=DEFAULT_FPS):
+        # The driver paces capture itself
+        super().__init__(fps=None)
+        self.index = index
+        self.width = width
+        self.height = height
+        self.capture_fps = fps
+        self.cap = None
+
+    @property
+    def name(self):
+        return f"webcam:{self.index}"
+
+    @property
+    def is_live(self):
+        return True
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.index)
+        if not self.cap.isOpened():
+            return False
+
+        # Set camera resolution
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self.cap.set(cv2.CAP_PROP_FPS, self.capture_fps)
+        return True
+
+    def _read(self, out=None):
+        if self.cap is None:
+            return False, None
+        return self.cap.read(out)
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class VideoFileSource(FrameSource):
+    """Frames from a video file, played once or looped, at native speed or as fast as possible."""
+
+    def __init__(self, path, loop=True, realtime=True):
+        """
+        Args:
+            path (str): Video file path.
+            loop (bool): Restart from the first frame at end of file.
+            realtime (bool): Pace at the file's native FPS; False reads at max speed.
+        """
+        super().__init__(fps=None)
+        self.path = path
+        self.loop = loop
+        self.realtime = realtime
+        self.cap = None
+
+    @property
+    def name(self):
+        return f"file:{os.path.basename(self.path)}"
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            return False
+        if self.realtime:
+            native_fps = self.cap.get(cv2.CAP_PROP_FPS)
+            self.fps = native_fps if native_fps and native_fps > 0 else DEFAULT_FPS
+        return True
+
+    def _read(self, out=None):
+        if self.cap is None:
+            return False, None
+        ret, frame = self.cap.read(out)
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(out)
+        return ret, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class ImageDirectorySource(FrameSource):
+    """Frames from the images in a directory, in filename order."""
+
+    def __init__(self, directory, loop=True, fps=None):
+        super().__init__(fps=fps)
+        self.directory = directory
+        self.loop = loop
+        self.paths = []
+        self.position = 0
+
+    @property
+    def name(self):
+        return f"images:{os.path.basename(os.path.normpath(self.directory))}"
+
+    def open(self):
+        if not os.path.isdir(self.directory):
+            return False
+        self.paths = sorted(
+            os.path.join(self.directory, filename)
+            for filename in os.listdir(self.directory)
+            if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS
+        )
+        self.position = 0
+        return bool(self.paths)
+
+    def _read(self, out=None):
+        while self.paths:
+            if self.position >= len(self.paths):
+                if not self.loop:
+                    return False, None
+                self.position = 0
+            path = self.paths[self.position]
+            self.position += 1
+            frame = cv2.imread(path, cv2.IMREAD_COLOR)
+            if frame is not None:
+                return True, frame
+            print(f"[SOURCE] Skipping unreadable image: {path}")
+        return False, None
+
+
+class SyntheticSource(FrameSource):
+    """
+    Deterministic generated scene with scheduled tamper effects.
+
+    The scene is a smooth random texture with sensor noise and a moving
+    object, so an unmodified stream reads as live. Effects are scheduled as
+    (effect, start_frame, end_frame) tuples with end_frame exclusive:
+
+        'blur'     - heavy Gaussian blur
+        'shake'    - random per-frame translation of the whole view
+        'glare'    - crushed exposure with a saturated light source
+        'freeze'   - repeats the last frame exactly
+        'blackout' - near-black frames
+    """
+
+    def __init__(self, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, events=None,
+                 num_frames=None, fps=None, seed=0, shake_pixels=12):
+        """
+        Args:
+            width, height (int): Frame size.
+            events (list): (effect, start_frame, end_frame) tuples.
+            num_frames (int): Stop after this many frames. None runs forever.
+            fps (float): Pace frames at this rate. None delivers as fast as possible.
+            seed (int): Random seed; the same seed yields the same stream.
+            shake_pixels (int): Maximum translation applied by 'shake'.
+        """
+        super().__init__(fps=fps)
+        self.width = width
+        self.height = height
+        self.events = list(events or [])
+        self.num_frames = num_frames
+        self.seed = seed
+        self.shake_pixels = shake_pixels
+
+        for effect, _, _ in self.events:
+            if effect not in SYNTHETIC_EFFECTS:
+                raise ValueError(f"Unknown synthetic effect '{effect}'")
+
+        self.frame_index = 0
+        self._rng = None
+        self._scene = None
+        self._last_frame = None
+
+    @property
+    def name(self):
+        return "synthetic"
+
+    def open(self):
+        self._rng = np.random.default_rng(self.seed)
+        pad = self.shake_pixels
+        # Smooth texture gives optical flow and the Laplacian something to measure
+        noise = self._rng.integers(0, 256, (self.height // 8 + 2, self.width // 8 + 2, 3), dtype=np.uint8)
+        scene = cv2.resize(noise, (self.width + 2 * pad, self.height + 2 * pad), interpolation=cv2.INTER_CUBIC)
+        edges = self._rng.integers(0, 256, scene.shape, dtype=np.uint8)
+        self._scene = cv2.addWeighted(scene, 0.8, cv2.GaussianBlur(edges, (3, 3), 0), 0.2, 0)
+        self.frame_index = 0
+        self._last_frame = None
+        return True
+
+    def active_effects(self, frame_index):
+        """Set of effects scheduled for a frame index."""
+        return {effect for effect, start, end in self.events if start <= frame_index < end}
+
+    def _read(self, out=None):
+        if self._scene is None:
+            return False, None
+        if self.num_frames is not None and self.frame_index >= self.num_frames:
+            return False, None
+
+        effects = self.active_effects(self.frame_index)
+        self.frame_index += 1
+
+        if 'freeze' in effects and self._last_frame is not None:
+            return True, self._last_frame.copy()
+
+        pad = self.shake_pixels
+        dx = dy = 0
+        if 'shake' in effects:
+            dx, dy = self._rng.integers(-pad, pad + 1, 2)
+        frame = self._scene[pad + dy:pad + dy + self.height, pad + dx:pad + dx + self.width].copy()
+
+        # Moving object so a normal stream is never static
+        t = self.frame_index
+        x = int((self.width - 60) * (0.5 + 0.5 * np.sin(t * 0.05)))
+        y = int((self.height - 60) * (0.5 + 0.5 * np.cos(t * 0.03)))
+        cv2.rectangle(frame, (x, y), (x + 60, y + 60), (40, 180, 220), -1)
+
+        # Sensor noise
+        noise = self._rng.normal(0, 4, frame.shape).astype(np.int16)
+        frame = np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+        if 'blur' in effects:
+            frame = cv2.GaussianBlur(frame, (0, 0), 8)
+        if 'glare' in effects:
+            frame = (frame // 6).astype(np.uint8)
+            center = (self.width // 2, self.height // 3)
+            radius = max(self.width, self.height) // 5
+            cv2.circle(frame, center, radius, (255, 255, 255), -1)
+        if 'blackout' in effects:
+            frame = (frame // 20).astype(np.uint8)
+
+        self._last_frame = frame
+        return True, frame
+
+    def release(self):
+        self._scene = None
+
+
+class CaptureThread:
+    """
+    Reads a FrameSource on its own thread into a ring of preallocated buffers.
+
+    Every captured frame gets a monotonic frame id and its capture timestamps.
+    read_latest() always hands the analysis loop the newest frame; frames it
+    never picked up are counted as dropped. For sources that are not live
+    (files or generators read at full speed) capture waits for the reader
+    instead, so no frame is dropped and runs stay reproducible.
+
+    A frame returned by read_latest() stays valid until the next call: its
+    slot is never written while it is being analyzed.
+    """
+
+    def __init__(self, frame_source, slots=CAPTURE_RING_SLOTS, drop_frames=None, name='capture'):
+        """
+        Args:
+            frame_source (FrameSource): An opened source.
+            slots (int): Ring size (minimum 3).
+            drop_frames (bool): Keep capturing while the reader is busy and skip to
+                the newest frame. Defaults to frame_source.is_live.
+            name (str): Thread name.
+        """
+        self.frame_source = frame_source
+        self.slots = max(3, slots)
+        self.drop_frames = frame_source.is_live if drop_frames is None else drop_frames
+        self.name = name
+
+        self._buffers = None
+        self._frame_ids = [0] * self.slots
+        self._timestamps = [0.0] * self.slots
+        self._capture_times = [0.0] * self.slots
+        self._latest_slot = None
+        self._reading_slot = None
+        self._last_delivered_id = 0
+
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.ended = False
+        self.captured_count = 0
+        self.dropped_count = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _free_slot(self):
+        for offset in range(1, self.slots + 1):
+            slot = ((self._latest_slot or 0) + offset) % self.slots
+            if slot != self._latest_slot and slot != self._reading_slot:
+                return slot
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            with self._condition:
+                if not self.drop_frames:
+                    # Lossless hand-off: wait until the reader has taken the newest frame
+                    while (self.captured_count > self._last_delivered_id
+                           and not self._stop_event.is_set()):
+                        self._condition.wait(0.1)
+                slot = self._free_slot() if self._buffers is not None else None
+                buffer = self._buffers[slot] if slot is not None else None
+
+            # The slot is neither the newest frame nor being analyzed, so decode into it outside the lock
+            ret, frame = self.frame_source.read(buffer)
+            capture_time = time.monotonic()
+            timestamp = time.time()
+            if not ret:
+                break
+
+            if frame is not buffer:
+                # The source returned its own array (not a VideoCapture, first frame, or a size change)
+                with self._condition:
+                    if self._buffers is None or self._buffers[0].shape != frame.shape:
+                        # (Re)allocate; a reader keeps its reference to the old buffer
+                        self._buffers = [np.empty_like(frame) for _ in range(self.slots)]
+                        self._latest_slot = None
+                        slot = self._free_slot()
+                    buffer = self._buffers[slot]
+                np.copyto(buffer, frame)
+
+            with self._condition:
+                self.captured_count += 1
+                self._frame_ids[slot] = self.captured_count
+                self._timestamps[slot] = timestamp
+                self._capture_times[slot] = capture_time
+                self._latest_slot = slot
+                self._condition.notify_all()
+
+        with self._condition:
+            self.ended = True
+            self._condition.notify_all()
+
+    def read_latest(self, timeout=None):
+        """
+        Wait for a frame newer than the last one returned.
+
+        Returns:
+            tuple: (frame_id, frame, timestamp, capture_time), or None on timeout
+                or when the source has ended. timestamp is wall-clock time.time();
+                capture_time is time.monotonic() for measuring lag.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self.captured_count > self._last_delivered_id or self.ended or self._stop_event.is_set(),
+                timeout
+            )
+            if self.captured_count <= self._last_delivered_id:
+                return None
+
+            slot = self._latest_slot
+            frame_id = self._frame_ids[slot]
+            self.dropped_count += frame_id - self._last_delivered_id - 1
+            self._last_delivered_id = frame_id
+            self._reading_slot = slot
+            self._condition.notify_all()
+            return frame_id, self._buffers[slot], self._timestamps[slot], self._capture_times[slot]
+
+
+def parse_synthetic_events(text):
+    """
+    Parse an event schedule like 'blur@30-60,glare@90-120'.
+
+    Returns:
+        list: (effect, start_frame, end_frame) tuples.
+    """
+    events = []
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        effect, _, frame_range = item.partition('@')
+        start, _, end = frame_range.partition('-')
+        events.append((effect.strip(), int(start), int(end)))
+    return events
+
+
+def create_frame_source(spec):
+    """
+    Build a FrameSource from a configuration value.
+
+    Accepted specs:
+        int                          - webcam device index
+        'synthetic' / 'synthetic:blur@30-60,glare@90-120'
+        path to a video file         - looped, native speed
+        path to a directory          - images in filename order, looped
+        dict with 'type' in {'webcam', 'file', 'images', 'synthetic'} and
+        the matching constructor arguments, e.g.
+        {'type': 'file', 'path': 'clip.mp4', 'loop': False, 'realtime': False}
+        an existing FrameSource      - returned unchanged
+
+    Specs are plain data so they can be passed to worker processes.
+    """
+    if isinstance(spec, FrameSource):
+        return spec
+    if isinstance(spec, int):
+        return WebcamSource(spec)
+    if isinstance(spec, dict):
+        options = dict(spec)
+        source_type = options.pop('type', None)
+        if source_type == 'webcam':
+            return WebcamSource(**options)
+        if source_type == 'file':
+            return VideoFileSource(**options)
+        if source_type == 'images':
+            return ImageDirectorySource(**options)
+        if source_type == 'synthetic':
+            if isinstance(options.get('events'), str):
+                options['events'] = parse_synthetic_events(options['events'])
+            return SyntheticSource(**options)
+        raise ValueError(f"Unknown frame source type '{source_type}'")
+    if isinstance(spec, str):
+        if spec == 'synthetic' or spec.startswith('synthetic:'):
+            return SyntheticSource(events=parse_synthetic_events(spec.partition(':')[2]))
+        if spec.isdigit():
+            return WebcamSource(int(spec))
+        if os.path.isdir(spec):
+            return ImageDirectorySource(spec)
+        return VideoFileSource(spec)
+    raise ValueError(f"Unsupported frame source spec: {spec!r}")
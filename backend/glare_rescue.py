@@ -10,10 +10,40 @@ def apply_unsharp_mask(frame, amount=1.0, kernel_size=(5, 5), sigma=1.0):
     sharpened = cv2.addWeighted(frame, 1.0 + amount, blurred, -amount, 0)
     return sharpened
 
-def get_image_viability_stats(frame, dark_thresh=40, bright_thresh=250):
-    """Analyzes a frame using the "Loss of Detail" metric."""
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
+def clahe_rescue(frame, clahe, highlight_thresh=252, frame_context=None):
+    """
+    CLAHE glare rescue: equalize L in LAB space, sharpen, then tame the
+    blown-out highlights of the original frame to a neutral gray.
+    Pass `frame_context` to reuse its LAB conversion and grayscale image.
+    """
+    lab_frame = frame_context.lab if frame_context is not None else cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
+    l, a, b = cv2.split(lab_frame)
+    l_clahe = clahe.apply(l)
+    enhanced_lab_frame = cv2.merge((l_clahe, a, b))
+    clahe_rescued_frame = cv2.cvtColor(enhanced_lab_frame, cv2.COLOR_LAB2BGR)
+
+    processed_frame = apply_unsharp_mask(clahe_rescued_frame, amount=1.0)
+
+    gray = frame_context.gray if frame_context is not None else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    ret, mask = cv2.threshold(gray, highlight_thresh, 255, cv2.THRESH_BINARY)
+    processed_frame[mask > 0] = (150, 150, 150)
+    return processed_frame
+
+def get_image_viability_stats(frame, dark_thresh=40, bright_thresh=250, gray=None, frame_context=None):
+    """
+    Analyzes a frame using the "Loss of Detail" metric.
+    Pass `gray` to reuse an existing grayscale image, or `frame_context` to
+    reuse its shared histogram. Downscale `gray` by subsampling, not
+    smoothing: a blurred image loses small highlights and reads a lower
+    bright_pct.
+    """
+    if frame_context is not None:
+        gray = frame_context.hist_gray
+        hist = frame_context.hist256
+    else:
+        if gray is None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
     total_pixels = gray.shape[0] * gray.shape[1]
     
     dark_pixels = np.sum(hist[0:dark_thresh])
@@ -0,0 +1,356 @@
+"""
+AEGIS Metrics Store
+Per-frame detector metrics kept as a compact time series.
+
+record() copies the per-frame metric values out of detection_data into an
+in-memory buffer; nothing else happens on the camera result path. A
+background thread writes each completed second as one row of packed float32
+samples, rolls it up into 1 s, 1 min and 1 h min/max/mean rows, and prunes
+each table past its retention. History reads pick the finest resolution
+that answers the requested range in at most MAX_HISTORY_POINTS points.
+
+Blob layout: a sample is (offset within the second, *METRIC_NAMES) and a
+rollup min/max/mean blob is one float32 per METRIC_NAMES entry, in order.
+New metrics must be appended to METRIC_SOURCES, never inserted.
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from .database import DB_PATH
+from .db_connections import ConnectionManager
+
+METRICS_DB_PATH = os.path.join(os.path.dirname(DB_PATH), 'metrics.db')
+
+# Metric name -> (detection_data section, key)
+METRIC_SOURCES = (
+    ('blur_variance', ('blur', 'variance')),
+    ('shake_magnitude', ('shake', 'magnitude')),
+    ('shift_magnitude', ('reposition', 'magnitude')),
+    ('dark_pct', ('glare', 'dark_pct')),
+    ('mid_pct', ('glare', 'mid_pct')),
+    ('bright_pct', ('glare', 'bright_pct')),
+    ('mean_diff', ('liveness', 'mean_diff')),
+    ('mean_brightness', ('liveness', 'mean_brightness')),
+)
+METRIC_NAMES = tuple(name for name, _ in METRIC_SOURCES)
+
+ROLLUP_RESOLUTIONS = (1, 60, 3600)  # Seconds per rollup bucket
+RESOLUTION_NAMES = {'raw': 0, '1s': 1, '1m': 60, '1h': 3600}
+
+# Seconds of history kept per resolution (0 = raw samples); None keeps forever
+METRICS_RETENTION = {0: 86400, 1: 7 * 86400, 60: 90 * 86400, 3600: None}
+
+METRICS_FLUSH_INTERVAL = 1.0    # Seconds between writes of completed seconds
+METRICS_PRUNE_INTERVAL = 60.0   # Seconds between retention deletes
+MAX_HISTORY_POINTS = 1000       # Automatic resolution keeps a history response under this many points;
+                                # raw responses are cut off there
+
+
+def _combine(counts, mins, maxs, means):
+    """Merge rollup rows (arrays of shape (rows, metrics)) into one (count, min, max, mean)."""
+    total = int(counts.sum())
+    mean = (means * counts[:, None]).sum(axis=0) / total
+    return total, mins.min(axis=0), maxs.max(axis=0), mean.astype(np.float32)
+
+
+def _unpack(blobs, width):
+    return np.frombuffer(b''.join(blobs), dtype=np.float32).reshape(-1, width)
+
+
+class MetricsStore:
+    """Buffered per-frame metric ingest with background rollups to SQLite."""
+
+    def __init__(self, db_path=METRICS_DB_PATH, flush_interval=METRICS_FLUSH_INTERVAL,
+                 retention=None, clock=time.time):
+        """
+        Args:
+            db_path (str): Metrics database file (separate from the incident database).
+            flush_interval (float): Seconds between background writes.
+            retention (dict): Overrides for METRICS_RETENTION.
+            clock (callable): Wall clock in seconds (injectable for tests).
+        """
+        self.connections = ConnectionManager(db_path)
+        self.flush_interval = flush_interval
+        self.retention = dict(METRICS_RETENTION)
+        self.retention.update(retention or {})
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._pending = []          # (camera_id, timestamp, *metric values) per frame
+        self._held = []             # Samples of each camera's newest (still filling) second
+        self._written = {}          # camera_id -> last second written
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._last_prune = 0.0
+
+        self.recorded = 0
+        self.written_seconds = 0
+        self.flush_ms = 0.0
+
+        self.initialize_db()
+
+    def initialize_db(self):
+        with self.connections.write() as conn:
+            # One row per camera-second: count samples of (offset, *METRIC_NAMES) float32.
+            # A rowid table: WITHOUT ROWID b-trees store kilobyte rows about 4x less densely
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS metrics_samples (
+                    camera_id INTEGER NOT NULL,
+                    second INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    samples BLOB NOT NULL,
+                    PRIMARY KEY (camera_id, second)
+                )
+            ''')
+            # Min/max/mean of every metric per bucket of `resolution` seconds
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS metrics_rollups (
+                    camera_id INTEGER NOT NULL,
+                    resolution INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    min BLOB NOT NULL,
+                    max BLOB NOT NULL,
+                    mean BLOB NOT NULL,
+                    PRIMARY KEY (camera_id, resolution, bucket)
+                ) WITHOUT ROWID
+            ''')
+
+    # ------------------------------------------------------------------ ingest
+
+    def record(self, camera_id, detection_data, timestamp):
+        """Buffer one frame's metrics. Called on the camera result path, so it only copies floats."""
+        try:
+            row = (camera_id, timestamp) + tuple(detection_data[section][key]
+                                                 for _, (section, key) in METRIC_SOURCES)
+        except (KeyError, TypeError):
+            return
+        with self._lock:
+            self._pending.append(row)
+            self.recorded += 1
+
+    # ------------------------------------------------------------------ background
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='metrics-store', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop the background thread and write everything buffered, including partial seconds."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush(final=True)
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+                if self.clock() - self._last_prune >= METRICS_PRUNE_INTERVAL:
+                    self.prune()
+            except Exception as e:
+                print(f"[METRICS] ✗ Error: {e}")
+
+    def flush(self, final=False):
+        """
+        Write buffered samples of completed seconds and update their rollups.
+        The newest second of each camera is held back until a later sample
+        shows it is complete, it is over a second old, or final is set.
+        Returns the seconds written. If the write fails the samples are queued
+        again for the next flush.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            rows = self._held + self._pending
+            self._pending = []
+            self._held = []
+        if not rows:
+            return 0
+
+        data = np.array(rows, dtype=np.float64)
+        stale = np.floor(self.clock()) - 1  # A camera that stopped sending still gets its last second written
+        held = []
+        written = 0
+        last_written = dict(self._written)
+        try:
+            with self.connections.write() as conn:
+                for camera_id in np.unique(data[:, 0]):
+                    camera = data[data[:, 0] == camera_id]
+                    camera = camera[np.argsort(camera[:, 1], kind='stable')]
+                    seconds = np.floor(camera[:, 1]).astype(np.int64)
+                    if not final:
+                        complete = (seconds < seconds[-1]) | (seconds < stale)
+                        held.extend(map(tuple, camera[~complete]))
+                        camera, seconds = camera[complete], seconds[complete]
+                    if len(camera):
+                        written += self._write_seconds(conn, int(camera_id), seconds, camera)
+        except Exception:
+            self._written = last_written  # Rolled back: nothing new is on disk
+            with self._lock:
+                self._pending = rows + self._pending
+            raise
+        with self._lock:
+            self._held.extend(held)
+        self.written_seconds += written
+        self.flush_ms = (time.perf_counter() - start) * 1000.0
+        return written
+
+    def _write_seconds(self, conn, camera_id, seconds, camera):
+        samples = np.empty((len(camera), len(METRIC_NAMES) + 1), dtype=np.float32)
+        samples[:, 0] = camera[:, 1] - seconds
+        samples[:, 1:] = camera[:, 2:]
+        unique, starts = np.unique(seconds, return_index=True)
+        groups = np.split(samples, starts[1:])
+
+        # Samples arriving for a second already on disk (late results) are merged into it
+        last = self._written.get(camera_id)
+        if last is not None and unique[0] <= last:
+            late = {int(s) for s in unique if s <= last}
+            for row in conn.execute(
+                    f'SELECT second, samples FROM metrics_samples WHERE camera_id = ? '
+                    f'AND second IN ({",".join("?" * len(late))})', [camera_id] + sorted(late)):
+                i = int(np.searchsorted(unique, row['second']))
+                groups[i] = np.vstack([_unpack([row['samples']], samples.shape[1]), groups[i]])
+        self._written[camera_id] = max(int(unique[-1]), last if last is not None else int(unique[-1]))
+
+        conn.executemany('INSERT OR REPLACE INTO metrics_samples VALUES (?, ?, ?, ?)',
+                         [(camera_id, int(s), len(g), g.tobytes()) for s, g in zip(unique, groups)])
+        conn.executemany('INSERT OR REPLACE INTO metrics_rollups VALUES (?, 1, ?, ?, ?, ?, ?)',
+                         [(camera_id, int(s), len(g), g[:, 1:].min(axis=0).tobytes(),
+                           g[:, 1:].max(axis=0).tobytes(), g[:, 1:].mean(axis=0).tobytes())
+                          for s, g in zip(unique, groups)])
+
+        # Re-derive each touched minute from its seconds, then each touched hour from its minutes
+        buckets = unique
+        for finer, coarser in zip(ROLLUP_RESOLUTIONS, ROLLUP_RESOLUTIONS[1:]):
+            buckets = np.unique(buckets // coarser * coarser)
+            conn.executemany('INSERT OR REPLACE INTO metrics_rollups VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             [(camera_id, coarser, int(b)) + self._rollup(conn, camera_id, finer, b, b + coarser)
+                              for b in buckets])
+        return len(unique)
+
+    def _rollup(self, conn, camera_id, resolution, start, end):
+        rows = conn.execute('''
+            SELECT count, min, max, mean FROM metrics_rollups
+            WHERE camera_id = ? AND resolution = ? AND bucket >= ? AND bucket < ?
+        ''', (camera_id, resolution, int(start), int(end))).fetchall()
+        width = len(METRIC_NAMES)
+        count, mins, maxs, means = _combine(np.array([row['count'] for row in rows], dtype=np.float64),
+                                            *(_unpack([row[c] for row in rows], width) for c in ('min', 'max', 'mean')))
+        return count, mins.tobytes(), maxs.tobytes(), means.tobytes()
+
+    def prune(self):
+        """Delete samples and rollups older than their retention, per camera by primary key range."""
+        now = self.clock()
+        self._last_prune = now
+        with self.connections.write() as conn:
+            cameras = [row[0] for row in conn.execute('SELECT DISTINCT camera_id FROM metrics_rollups')]
+            for camera_id in cameras:
+                for resolution, keep in self.retention.items():
+                    if keep is None:
+                        continue
+                    if resolution == 0:
+                        conn.execute('DELETE FROM metrics_samples WHERE camera_id = ? AND second < ?',
+                                     (camera_id, int(now - keep)))
+                    else:
+                        conn.execute('DELETE FROM metrics_rollups WHERE camera_id = ? AND resolution = ? '
+                                     'AND bucket < ?', (camera_id, resolution, int(now - keep)))
+        with self.connections.write() as conn:
+            conn.executescript('PRAGMA incremental_vacuum;')
+
+    # ------------------------------------------------------------------ history
+
+    def choose_resolution(self, since, until):
+        """Finest rollup resolution that is retained for `since` and fits the range in MAX_HISTORY_POINTS."""
+        now = self.clock()
+        for resolution in ROLLUP_RESOLUTIONS:
+            keep = self.retention.get(resolution)
+            if (until - since) / resolution <= MAX_HISTORY_POINTS and (keep is None or since >= now - keep):
+                return resolution
+        return ROLLUP_RESOLUTIONS[-1]
+
+    def history(self, camera_id, since, until, resolution=None, metrics=None):
+        """
+        Metric history of one camera for since <= t < until.
+
+        Args:
+            resolution (str): 'raw', '1s', '1m' or '1h'; None picks one with choose_resolution().
+            metrics (list): Metric names (default: all of METRIC_NAMES).
+
+        Returns:
+            dict: Column-oriented series: timestamps, count and, per metric, min/max/mean
+                  (or 'values' for raw samples). Raw samples stop after the first
+                  MAX_HISTORY_POINTS, with 'truncated' set; request the rest from the
+                  last timestamp on. Raises ValueError for unknown names.
+        """
+        metrics = list(metrics or METRIC_NAMES)
+        unknown = [name for name in metrics if name not in METRIC_NAMES]
+        if unknown:
+            raise ValueError(f"Unknown metric(s): {', '.join(unknown)}")
+        if resolution is None:
+            seconds = self.choose_resolution(since, until)
+        elif resolution in RESOLUTION_NAMES:
+            seconds = RESOLUTION_NAMES[resolution]
+        else:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        columns = [METRIC_NAMES.index(name) for name in metrics]
+        width = len(METRIC_NAMES)
+
+        with self.connections.read() as conn:
+            if seconds == 0:
+                rows, total, truncated = [], 0, False
+                for row in conn.execute('''
+                    SELECT second, count, samples FROM metrics_samples
+                    WHERE camera_id = ? AND second >= ? AND second < ?
+                    ORDER BY second
+                ''', (camera_id, int(np.floor(since)), until)):
+                    # Only the first second can hold samples before since
+                    if rows and total - rows[0]['count'] >= MAX_HISTORY_POINTS:
+                        truncated = True
+                        break
+                    rows.append(row)
+                    total += row['count']
+                samples = _unpack([row['samples'] for row in rows], width + 1)
+                seconds_of = np.repeat([row['second'] for row in rows], [row['count'] for row in rows])
+                timestamps = seconds_of + samples[:, 0].astype(np.float64)
+                keep = np.flatnonzero((timestamps >= since) & (timestamps < until))
+                truncated = truncated or len(keep) > MAX_HISTORY_POINTS
+                keep = keep[:MAX_HISTORY_POINTS]
+                return {
+                    'camera_id': camera_id,
+                    'resolution': 'raw',
+                    'timestamps': np.round(timestamps[keep], 3).tolist(),
+                    'truncated': truncated,
+                    'series': {name: {'values': samples[keep, 1 + c].tolist()}
+                               for name, c in zip(metrics, columns)}
+                }
+
+            rows = conn.execute('''
+                SELECT bucket, count, min, max, mean FROM metrics_rollups
+                WHERE camera_id = ? AND resolution = ? AND bucket >= ? AND bucket < ?
+                ORDER BY bucket
+            ''', (camera_id, seconds, int(since // seconds * seconds), until)).fetchall()
+        stats = {c: _unpack([row[c] for row in rows], width) for c in ('min', 'max', 'mean')}
+        return {
+            'camera_id': camera_id,
+            'resolution': next(name for name, value in RESOLUTION_NAMES.items() if value == seconds),
+            'timestamps': [row['bucket'] for row in rows],
+            'count': [row['count'] for row in rows],
+            'series': {name: {stat: stats[stat][:, c].tolist() for stat in ('min', 'max', 'mean')}
+                       for name, c in zip(metrics, columns)}
+        }
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending) + len(self._held)
+        return {
+            'recorded': self.recorded,
+            'pending': pending,
+            'written_seconds': self.written_seconds,
+            'flush_ms': round(self.flush_ms, 2)
+        }
@@ -0,0 +1,532 @@
+"""
+AEGIS Pipeline Supervisor
+Runs one CameraPipeline per camera source, either as threads inside the server
+process or as separate worker processes so optical flow can use every core.
+Frames come back from worker processes through shared memory; only the small
+detection payload travels over the result queue.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from .camera_pipeline import CameraPipeline, DEFAULT_SENSOR_CONFIG
+
+# Number of frame slots per camera in the shared memory ring
+SHARED_FRAME_SLOTS = 4
+
+# JPEG quality served to the dashboard
+DEFAULT_JPEG_QUALITY = 80
+
+# How long the result drain thread blocks on the queue before re-checking for shutdown
+RESULT_POLL_TIMEOUT = 0.5
+
+# How long start() waits for every worker process to open its camera and send its first frame
+WORKER_START_TIMEOUT = 15.0
+
+
+class JpegCacheStats:
+    """Hit/miss counters of a feed's encode-once JPEG cache."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def to_dict(self):
+        with self.lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0.0}
+
+
+class FrameSnapshot:
+    """
+    Immutable, versioned pair of raw and processed frames.
+
+    Published by swapping the feed's reference, so readers take the current
+    snapshot without a lock or a copy and can encode it at leisure; the
+    arrays are read-only and never modified after publication.
+
+    JPEG encodings are cached on the snapshot per (stream, quality): the first
+    request for a version encodes it, every other viewer gets the same bytes.
+    """
+
+    __slots__ = ('version', 'frame', 'processed_frame', 'timestamp', '_jpeg', '_encode_lock')
+
+    def __init__(self, version, frame, processed_frame, timestamp=None):
+        frame.flags.writeable = False
+        processed_frame.flags.writeable = False
+        self.version = version
+        self.frame = frame                      # Raw frame without text
+        self.processed_frame = processed_frame  # Frame with glare rescue + blur fix + watermark
+        self.timestamp = timestamp
+        self._jpeg = {}
+        self._encode_lock = threading.Lock()
+
+    def jpeg(self, stream='raw', quality=DEFAULT_JPEG_QUALITY, stats=None):
+        """
+        JPEG bytes of the 'raw' or 'processed' frame, encoded at most once per quality.
+
+        Returns:
+            bytes: Encoded image, or None if encoding failed.
+        """
+        key = (stream, quality)
+        data = self._jpeg.get(key)
+        hit = data is not None
+        if not hit:
+            with self._encode_lock:
+                data = self._jpeg.get(key)
+                hit = data is not None
+                if not hit:
+                    frame = self.processed_frame if stream == 'processed' else self.frame
+                    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                    data = buffer.tobytes() if ret else None
+                    self._jpeg[key] = data
+        if stats is not None:
+            stats.record(hit)
+        return data
+
+
+class CameraFeed:
+    """Latest output of one camera as seen by the Flask server."""
+
+    def __init__(self, camera_id, source, sensor_config=None):
+        self.camera_id = camera_id
+        self.source = source
+        self.sensor_config = dict(DEFAULT_SENSOR_CONFIG)
+        if sensor_config:
+            self.sensor_config.update(sensor_config)
+
+        # Initialize with blank black images (640x480) so they display while loading
+        blank = np.zeros((480, 640, 3), dtype=np.uint8)
+        self.snapshot = FrameSnapshot(0, blank, blank)
+        self.snapshot_condition = threading.Condition()  # Notified on every new version
+        self.jpeg_stats = JpegCacheStats()
+        self.detection_data_cache = None
+        self.results_received = 0  # Results handled by the server (drives emit cadence)
+        self.is_running = False
+
+    @property
+    def current_frame(self):
+        return self.snapshot.frame
+
+    @property
+    def processed_frame(self):
+        return self.snapshot.processed_frame
+
+    def publish(self, frame, processed_frame, detection_data, timestamp=None):
+        """
+        Publish the newest frames and detection data for readers.
+
+        The feed takes ownership of both arrays (they become read-only); the
+        caller must pass arrays it will not reuse.
+        """
+        # A single reference assignment is atomic, so readers never see a half-published pair
+        snapshot = FrameSnapshot(self.snapshot.version + 1, frame, processed_frame, timestamp)
+        with self.snapshot_condition:
+            self.snapshot = snapshot
+            self.detection_data_cache = detection_data
+            self.snapshot_condition.notify_all()
+
+    def wait_for_snapshot(self, after_version, timeout=None):
+        """
+        Block until a snapshot newer than after_version is published.
+
+        Returns:
+            FrameSnapshot: The newest snapshot, or None on timeout.
+        """
+        with self.snapshot_condition:
+            if self.snapshot_condition.wait_for(lambda: self.snapshot.version > after_version, timeout):
+                return self.snapshot
+        return None
+
+    def get_jpeg(self, stream='raw', quality=DEFAULT_JPEG_QUALITY):
+        """Return (version, jpeg_bytes) of the current snapshot, encoding it only on first request."""
+        snapshot = self.snapshot
+        return snapshot.version, snapshot.jpeg(stream, quality, self.jpeg_stats)
+
+
+class SharedFrameRing:
+    """
+    Fixed ring of raw/processed frame slots in shared memory.
+
+    Each slot carries a sequence number written after the pixels, so a reader
+    can detect that the writer lapped it while it was copying.
+    """
+
+    def __init__(self, shape, slots=SHARED_FRAME_SLOTS, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        frame_nbytes = int(np.prod(self.shape))
+        header_nbytes = 8 * slots
+        size = header_nbytes + 2 * slots * frame_nbytes
+
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+
+        self.seq = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.frames = np.ndarray((slots, 2) + self.shape, dtype=np.uint8,
+                                 buffer=self.shm.buf, offset=header_nbytes)
+        if self.owner:
+            self.seq[:] = -1
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, seq, frame, processed_frame):
+        """Write a frame pair into its slot. Returns the slot index."""
+        slot = seq % self.slots
+        self.seq[slot] = -1
+        self.frames[slot, 0] = frame
+        self.frames[slot, 1] = processed_frame
+        self.seq[slot] = seq
+        return slot
+
+    def read(self, slot, seq):
+        """Copy a frame pair out of its slot, or return None if it was overwritten."""
+        if self.seq[slot] != seq:
+            return None
+        frame = self.frames[slot, 0].copy()
+        processed_frame = self.frames[slot, 1].copy()
+        if self.seq[slot] != seq:
+            return None
+        return frame, processed_frame
+
+    def close(self):
+        # Drop the numpy views before closing the mapping
+        self.seq = None
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _pipeline_worker_main(camera_id, source, sensor_config, pipeline_options, result_queue, command_queue,
+                          stop_event):
+    """Entry point for a camera worker process."""
+    pipeline = CameraPipeline(camera_id, source, sensor_config, **pipeline_options)
+    if not pipeline.open():
+        result_queue.put(('error', camera_id, f'Could not open source {source!r}'))
+        return
+
+    ring = None
+    seq = 0
+
+    def poll_commands():
+        while True:
+            try:
+                command = command_queue.get_nowait()
+            except queue.Empty:
+                return
+            name = command[0]
+            if name == 'set_sensor_config':
+                pipeline.set_sensor_config(command[1], command[2])
+            elif name == 'dismiss_reposition_alert':
+                pipeline.dismiss_reposition_alert()
+
+    def publish(frame, processed_frame, detection_data, detections, glare_image_path, timestamp):
+        nonlocal ring, seq
+        if ring is None or ring.shape != frame.shape:
+            # Frame geometry (re)negotiated with the server: hand over a new ring
+            if ring is not None:
+                ring.close()
+            ring = SharedFrameRing(frame.shape)
+            result_queue.put(('ready', camera_id, ring.name, frame.shape, ring.slots))
+        seq += 1
+        slot = ring.write(seq, frame, processed_frame)
+        result_queue.put(('result', camera_id, slot, seq, detection_data, detections,
+                          glare_image_path, timestamp))
+
+    try:
+        pipeline.run(publish, stop_event=stop_event, poll_commands=poll_commands)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.release()
+        if ring is not None:
+            ring.close()
+        result_queue.put(('stopped', camera_id))
+
+
+class PipelineSupervisor:
+    """
+    Starts and supervises one CameraPipeline per configured camera.
+
+    Modes:
+        'thread'  - pipelines run as daemon threads in this process.
+        'process' - pipelines run in worker processes; frames are returned via
+                    shared memory and applied to CameraFeed objects by a drain thread.
+    """
+
+    def __init__(self, camera_sources, on_result=None, mode='process', sensor_configs=None,
+                 pipeline_options=None):
+        """
+        Args:
+            camera_sources (dict): camera_id -> frame source spec (see
+                frame_sources.create_frame_source; must be plain data in process mode).
+            on_result (callable): Called in the server process as
+                on_result(feed, detection_data, detections, glare_image_path, timestamp).
+            mode (str): 'process' or 'thread'.
+            sensor_configs (dict): Optional camera_id -> sensor_config overrides
+                (e.g. {1: {'motion_engine': 'phase'}}).
+            pipeline_options (dict): Extra CameraPipeline keyword arguments for every camera
+                (analysis_max_width, detector_cadence, detector_budget_ms); plain data,
+                since they are sent to worker processes.
+        """
+        if mode not in ('process', 'thread'):
+            raise ValueError(f"Unknown pipeline mode '{mode}'")
+
+        self.mode = mode
+        self.on_result = on_result
+        self.pipeline_options = dict(pipeline_options or {})
+        sensor_configs = sensor_configs or {}
+        self.feeds = {
+            camera_id: CameraFeed(camera_id, source, sensor_configs.get(camera_id))
+            for camera_id, source in camera_sources.items()
+        }
+
+        self._pipelines = {}        # thread mode: camera_id -> CameraPipeline
+        self._threads = []
+        self._processes = {}        # process mode: camera_id -> Process
+        self._command_queues = {}
+        self._rings = {}
+        self._awaiting_ready = set()  # process mode: cameras that have not sent 'ready' or failed yet
+        self._ready_cameras = set()
+        self._ready_condition = threading.Condition()
+        self._ctx = multiprocessing.get_context('spawn')
+        self._stop_event = None
+        self._result_queue = None
+
+    # ------------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------------
+
+    def start(self):
+        """
+        Open every camera and start its pipeline. Returns False if none started.
+        In process mode a camera counts once its worker has sent its first frame.
+        """
+        if self.mode == 'thread':
+            return self._start_threads()
+        return self._start_processes()
+
+    def _start_threads(self):
+        self._stop_event = threading.Event()
+        for camera_id, feed in self.feeds.items():
+            pipeline = CameraPipeline(camera_id, feed.source, feed.sensor_config, **self.pipeline_options)
+            if not pipeline.open():
+                continue
+            self._pipelines[camera_id] = pipeline
+
+            def publish(frame, processed_frame, detection_data, detections, glare_image_path, timestamp,
+                        feed=feed):
+                # `frame` is a reused capture buffer: the one copy per frame; processed_frame is new each frame
+                feed.publish(frame.copy(), processed_frame, detection_data, timestamp)
+                self._dispatch(feed, detection_data, detections, glare_image_path, timestamp)
+
+            thread = threading.Thread(target=self._run_thread, args=(pipeline, feed, publish),
+                                      name=f'camera-{camera_id}', daemon=True)
+            thread.start()
+            feed.is_running = True
+            self._threads.append(thread)
+
+        return bool(self._pipelines)
+
+    def _run_thread(self, pipeline, feed, publish):
+        try:
+            pipeline.run(publish, stop_event=self._stop_event)
+        finally:
+            feed.is_running = False
+
+    def _start_processes(self):
+        self._stop_event = self._ctx.Event()
+        self._result_queue = self._ctx.Queue()
+
+        for camera_id, feed in self.feeds.items():
+            command_queue = self._ctx.Queue()
+            process = self._ctx.Process(
+                target=_pipeline_worker_main,
+                args=(camera_id, feed.source, dict(feed.sensor_config), self.pipeline_options,
+                      self._result_queue, command_queue, self._stop_event),
+                name=f'aegis-camera-{camera_id}',
+                daemon=True
+            )
+            process.start()
+            feed.is_running = True
+            self._processes[camera_id] = process
+            self._command_queues[camera_id] = command_queue
+
+        with self._ready_condition:
+            self._awaiting_ready = set(self._processes)
+        drain_thread = threading.Thread(target=self._drain_results, name='pipeline-results', daemon=True)
+        drain_thread.start()
+        self._threads.append(drain_thread)
+        return self._wait_until_ready(WORKER_START_TIMEOUT)
+
+    def _wait_until_ready(self, timeout):
+        """Wait until every worker has sent 'ready' or failed. Returns True if any sent 'ready'."""
+        with self._ready_condition:
+            self._ready_condition.wait_for(lambda: not self._awaiting_ready, timeout)
+            for camera_id in sorted(self._awaiting_ready):
+                print(f"[SUPERVISOR] Camera {camera_id} sent no frame within {timeout:.0f}s; still waiting.")
+            return bool(self._ready_cameras)
+
+    def _resolve_start(self, camera_id, ready):
+        with self._ready_condition:
+            if ready:
+                self._ready_cameras.add(camera_id)
+            self._awaiting_ready.discard(camera_id)
+            self._ready_condition.notify_all()
+
+    def stop(self, timeout=2.0):
+        """Signal every pipeline to stop and release shared resources."""
+        if self._stop_event is not None:
+            self._stop_event.set()
+        for process in self._processes.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        for thread in self._threads:
+            thread.join(timeout)
+        for pipeline in self._pipelines.values():
+            pipeline.release()
+        for ring in self._rings.values():
+            ring.close()
+        self._rings.clear()
+
+    def _drain_results(self):
+        """Apply worker results to the camera feeds (process mode)."""
+        next_check = time.monotonic() + RESULT_POLL_TIMEOUT
+        while not self._stop_event.is_set():
+            try:
+                message = self._result_queue.get(timeout=RESULT_POLL_TIMEOUT)
+            except queue.Empty:
+                message = None
+            # Busy cameras keep the queue from running empty, so dead workers are also checked on a timer
+            if message is None or time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + RESULT_POLL_TIMEOUT
+            if message is None:
+                continue
+            # One bad message must not kill the only drain thread and freeze every camera
+            try:
+                self._handle_message(message)
+            except Exception as e:
+                print(f"[SUPERVISOR] Error handling {message[0]!r} message for camera {message[1]}: {e}")
+
+    def _check_workers(self):
+        """Mark the feeds of worker processes that died without reporting (crash, kill) as stopped."""
+        for camera_id, process in self._processes.items():
+            feed = self.feeds[camera_id]
+            if not feed.is_running or process.is_alive():
+                continue
+            print(f"[SUPERVISOR] Camera {camera_id} worker exited unexpectedly (exit code {process.exitcode}).")
+            feed.is_running = False
+            ring = self._rings.pop(camera_id, None)
+            if ring is not None:
+                ring.close()
+                try:
+                    ring.shm.unlink()  # The owner is gone and can no longer unlink it
+                except FileNotFoundError:
+                    pass
+            self._resolve_start(camera_id, ready=False)
+
+    def _handle_message(self, message):
+        kind, camera_id = message[0], message[1]
+        feed = self.feeds.get(camera_id)
+        if feed is None:
+            return
+
+        if kind == 'ready':
+            _, _, shm_name, shape, slots = message
+            old_ring = self._rings.pop(camera_id, None)
+            if old_ring is not None:
+                old_ring.close()
+            try:
+                self._rings[camera_id] = SharedFrameRing(shape, slots, name=shm_name)
+            except FileNotFoundError:
+                # The worker already exited (or moved to a newer ring) and unlinked this one
+                print(f"[SUPERVISOR] Camera {camera_id} frame ring {shm_name} is gone; skipping.")
+            self._resolve_start(camera_id, ready=True)
+        elif kind == 'result':
+            _, _, slot, seq, detection_data, detections, glare_image_path, timestamp = message
+            ring = self._rings.get(camera_id)
+            frames = ring.read(slot, seq) if ring is not None else None
+            if frames is None:
+                # Writer lapped us (or the ring is gone); the next result carries a newer frame
+                feed.detection_data_cache = detection_data
+            else:
+                feed.publish(frames[0], frames[1], detection_data, timestamp)
+            self._dispatch(feed, detection_data, detections, glare_image_path, timestamp)
+        elif kind == 'error':
+            print(f"[SUPERVISOR] Camera {camera_id} failed: {message[2]}")
+            feed.is_running = False
+            self._resolve_start(camera_id, ready=False)
+        elif kind == 'stopped':
+            print(f"[SUPERVISOR] Camera {camera_id} pipeline stopped.")
+            feed.is_running = False
+            self._resolve_start(camera_id, ready=False)
+
+    def _dispatch(self, feed, detection_data, detections, glare_image_path, timestamp):
+        if self.on_result is None:
+            return
+        try:
+            self.on_result(feed, detection_data, detections, glare_image_path, timestamp)
+        except Exception as e:
+            print(f"[SUPERVISOR] Error handling result for camera {feed.camera_id}: {e}")
+
+    # ------------------------------------------------------------------------
+    # Accessors and commands
+    # ------------------------------------------------------------------------
+
+    def camera_ids(self):
+        return list(self.feeds.keys())
+
+    def get_feed(self, camera_id):
+        return self.feeds.get(camera_id)
+
+    def get_sensor_config(self, camera_id):
+        feed = self.feeds.get(camera_id)
+        return dict(feed.sensor_config) if feed is not None else None
+
+    def set_sensor_config(self, camera_id, key, value):
+        """Update a sensor setting on one camera. Returns False for unknown camera or key."""
+        feed = self.feeds.get(camera_id)
+        if feed is None or key not in feed.sensor_config:
+            return False
+        feed.sensor_config[key] = value
+
+        if camera_id in self._pipelines:
+            self._pipelines[camera_id].set_sensor_config(key, value)
+        elif camera_id in self._command_queues:
+            self._command_queues[camera_id].put(('set_sensor_config', key, value))
+        return True
+
+    def dismiss_reposition_alert(self, camera_id):
+        if camera_id in self._pipelines:
+            self._pipelines[camera_id].dismiss_reposition_alert()
+        elif camera_id in self._command_queues:
+            self._command_queues[camera_id].put(('dismiss_reposition_alert',))
+
+    def wait(self, poll_interval=1.0):
+        """Block until every pipeline has stopped (used by headless runs)."""
+        while any(feed.is_running for feed in self.feeds.values()):
+            time.sleep(poll_interval)
@@ -0,0 +1,287 @@
+"""
+AEGIS Retention
+Background pruning of old incidents and their evidence files.
+
+A RetentionPolicy bounds the incident history by age, by row count and by
+the bytes of the evidence files under storage/ that rows reference (files
+no row references are neither counted nor deleted). The RetentionWorker
+enforces it off the detection path: it deletes the oldest incidents in small batches found by
+the timestamp index, deletes their audio logs, glare images and liveness
+validations in the same transaction, removes the glare JPEGs and liveness
+videos from disk, and returns freed pages with an incremental vacuum.
+
+Incremental vacuum needs auto_vacuum = INCREMENTAL, which new databases get
+from DEFAULT_PRAGMAS. A database created before that is converted once,
+offline, with `python app.py --enable-incremental-vacuum` (a full VACUUM
+rewrites the file and holds the write lock throughout, so the worker never
+does it).
+"""
+
+import json
+import os
+import threading
+import time
+
+from .evidence_storage import STORAGE_DIR
+
+RETENTION_MAX_AGE_DAYS = 30             # Keep this many days of evidence
+RETENTION_MAX_INCIDENTS = 100000        # ... and at most this many incidents
+RETENTION_MAX_STORAGE_BYTES = 5 * 1024 ** 3   # ... and at most this much evidence under storage/
+
+RETENTION_INTERVAL = 60.0       # Seconds between retention passes
+RETENTION_BATCH_SIZE = 200      # Incidents deleted per transaction
+VACUUM_PAGES_PER_PASS = 2048    # Free pages returned to the OS per incremental vacuum
+
+
+class RetentionPolicy:
+    """Limits on the incident history; None disables a limit."""
+
+    def __init__(self, max_age_days=RETENTION_MAX_AGE_DAYS, max_incidents=RETENTION_MAX_INCIDENTS,
+                 max_storage_bytes=RETENTION_MAX_STORAGE_BYTES):
+        self.max_age_days = max_age_days
+        self.max_incidents = max_incidents
+        self.max_storage_bytes = max_storage_bytes
+
+    def to_dict(self):
+        return {
+            'max_age_days': self.max_age_days,
+            'max_incidents': self.max_incidents,
+            'max_storage_bytes': self.max_storage_bytes
+        }
+
+
+def enable_incremental_vacuum(database):
+    """
+    Convert a database created without auto_vacuum with one full VACUUM.
+    Returns True if the file was converted, False if it already was.
+    """
+    with database.connections.write() as conn:
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            return False
+        conn.commit()
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+    return True
+
+
+class RetentionWorker:
+    """Enforces a RetentionPolicy on an AegisDatabase from a background thread."""
+
+    def __init__(self, database, policy=None, storage_dir=STORAGE_DIR, interval=RETENTION_INTERVAL,
+                 batch_size=RETENTION_BATCH_SIZE, clock=time.time):
+        """
+        Args:
+            database (AegisDatabase): Database to prune.
+            policy (RetentionPolicy): Limits (defaults to RetentionPolicy()).
+            storage_dir (str): Evidence directory; only files inside it are deleted.
+            interval (float): Seconds between passes.
+            batch_size (int): Incidents deleted per transaction.
+            clock (callable): Wall clock in seconds (injectable for tests).
+        """
+        self.database = database
+        self.policy = policy or RetentionPolicy()
+        self.storage_dir = os.path.realpath(storage_dir)
+        self.interval = interval
+        self.batch_size = batch_size
+        self.clock = clock
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.deleted_incidents = 0
+        self.deleted_files = 0
+        self.freed_bytes = 0
+        self.last_pass_ms = 0.0
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='retention', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        with self.database.connections.read() as conn:
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                print("[RETENTION] ⚠ Incremental vacuum is off: pruned pages stay in the file until "
+                      "`python app.py --enable-incremental-vacuum` converts it")
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[RETENTION] ✗ Error: {e}")
+            self._stop_event.wait(self.interval)
+
+    def run_once(self):
+        """One retention pass. Returns the number of incidents deleted."""
+        start = time.perf_counter()
+        deleted = 0
+        self.database.flush()  # Pending incident changes must not re-insert pruned rows
+
+        # Age: everything older than the cutoff, found by the timestamp index
+        if self.policy.max_age_days is not None:
+            cutoff = self.clock() - self.policy.max_age_days * 86400.0
+            deleted += self._delete_before(cutoff)
+            self._delete_unlinked_before(cutoff)
+
+        # Rows: everything older than the Nth newest incident
+        if self.policy.max_incidents is not None:
+            with self.database.connections.read() as conn:
+                row = conn.execute('''
+                    SELECT timestamp FROM incidents
+                    ORDER BY timestamp DESC
+                    LIMIT 1 OFFSET ?
+                ''', (self.policy.max_incidents,)).fetchone()
+            if row is not None:
+                deleted += self._delete_before(row['timestamp'], inclusive=True)
+
+        # Bytes: oldest incidents with evidence files first until their files fit
+        if self.policy.max_storage_bytes is not None:
+            excess = self.evidence_bytes() - self.policy.max_storage_bytes
+            while excess > 0 and not self._stop_event.is_set():
+                batch, freed = self._delete_batch(None, max_bytes=excess)
+                deleted += batch
+                if not freed:
+                    print(f"[RETENTION] ⚠ Evidence is {excess} bytes over budget with nothing left to prune")
+                    break
+                excess -= freed
+
+        if deleted:
+            self._incremental_vacuum()
+            self.database.data_changed()
+            print(f"[RETENTION] ✓ Pruned {deleted} incident(s)")
+        self.deleted_incidents += deleted
+        self.last_pass_ms = (time.perf_counter() - start) * 1000.0
+        return deleted
+
+    def _delete_before(self, cutoff, inclusive=False):
+        deleted = 0
+        while not self._stop_event.is_set():
+            batch, _ = self._delete_batch(cutoff, inclusive)
+            deleted += batch
+            if batch < self.batch_size:
+                break
+        return deleted
+
+    def _delete_batch(self, cutoff, inclusive=False, max_bytes=None):
+        """
+        Delete up to batch_size of the oldest incidents (older than cutoff if given),
+        their child rows and their files. With max_bytes, only incidents that have
+        evidence files are candidates, stopping once max_bytes of files are covered.
+        Returns (incidents deleted, bytes freed).
+        """
+        operator = '<=' if inclusive else '<'
+        filters = f'AND timestamp {operator} ?' if cutoff is not None else ''
+        if max_bytes is not None:
+            filters += '''
+                AND id IN (SELECT incident_id FROM glare_images
+                           UNION SELECT incident_id FROM liveness_validations)'''
+        # The open incidents are still being extended in memory; never delete them
+        open_ids = json.dumps(self.database.incidents.open_ids())
+        params = (open_ids, cutoff, self.batch_size) if cutoff is not None else (open_ids, self.batch_size)
+
+        with self.database.connections.write() as conn:
+            ids = [row['id'] for row in conn.execute(f'''
+                SELECT id FROM incidents
+                WHERE id NOT IN (SELECT value FROM json_each(?)) {filters}
+                ORDER BY timestamp ASC
+                LIMIT ?
+            ''', params)]
+            if not ids:
+                return 0, 0
+            paths = {incident_id: [] for incident_id in ids}
+            for row in conn.execute('''
+                SELECT incident_id, file_path FROM glare_images WHERE incident_id IN (SELECT value FROM json_each(?1))
+                UNION ALL
+                SELECT incident_id, file_path FROM liveness_validations WHERE incident_id IN (SELECT value FROM json_each(?1))
+            ''', (json.dumps(ids),)):
+                paths[row['incident_id']].append(row['file_path'])
+            if max_bytes is not None:
+                ids = self._cover_bytes(ids, paths, max_bytes)
+            ids_json = json.dumps(ids)
+            for table in ('audio_logs', 'glare_images', 'liveness_validations'):
+                conn.execute(f'DELETE FROM {table} WHERE incident_id IN (SELECT value FROM json_each(?))',
+                             (ids_json,))
+            conn.execute('DELETE FROM incidents WHERE id IN (SELECT value FROM json_each(?))', (ids_json,))
+
+        # Files go only after the rows are gone, so no row ever points at a missing file
+        return len(ids), self._remove_files([path for incident_id in ids for path in paths[incident_id]])
+
+    def _cover_bytes(self, ids, paths, max_bytes):
+        """
+        The shortest prefix of ids (oldest first) whose files add up to max_bytes,
+        counting each file under storage_dir once, like evidence_bytes().
+        """
+        total = 0
+        seen = set()
+        for n, incident_id in enumerate(ids, 1):
+            for real_path in map(self._evidence_path, paths[incident_id]):
+                if real_path is None or real_path in seen:
+                    continue
+                seen.add(real_path)
+                try:
+                    total += os.path.getsize(real_path)
+                except OSError:
+                    pass
+            if total >= max_bytes:
+                return ids[:n]
+        return ids
+
+    def _evidence_path(self, path):
+        """Real path of an evidence file, or None if it is outside storage_dir."""
+        real_path = os.path.realpath(path)
+        return real_path if real_path.startswith(self.storage_dir + os.sep) else None
+
+    def evidence_bytes(self):
+        """Total size of the distinct files under storage_dir that glare or liveness rows reference."""
+        with self.database.connections.read() as conn:
+            paths = {row['file_path'] for row in conn.execute('''
+                SELECT file_path FROM glare_images
+                UNION SELECT file_path FROM liveness_validations
+            ''')}
+        total = 0
+        for real_path in set(map(self._evidence_path, paths)) - {None}:
+            try:
+                total += os.path.getsize(real_path)
+            except OSError:
+                pass
+        return total
+
+    def _delete_unlinked_before(self, cutoff):
+        """Audio logs and liveness validations recorded without an incident, older than cutoff."""
+        with self.database.connections.write() as conn:
+            conn.execute('DELETE FROM audio_logs WHERE incident_id IS NULL AND timestamp < ?', (cutoff,))
+            paths = [row['file_path'] for row in conn.execute(
+                'SELECT file_path FROM liveness_validations WHERE incident_id IS NULL AND timestamp < ?', (cutoff,))]
+            conn.execute('DELETE FROM liveness_validations WHERE incident_id IS NULL AND timestamp < ?', (cutoff,))
+        self._remove_files(paths)
+
+    def _remove_files(self, paths):
+        freed = 0
+        for path in paths:
+            real_path = self._evidence_path(path)
+            if real_path is None:
+                continue  # Never delete anything outside storage/
+            try:
+                size = os.path.getsize(real_path)
+                os.remove(real_path)
+            except OSError:
+                continue
+            freed += size
+            self.deleted_files += 1
+        self.freed_bytes += freed
+        return freed
+
+    def _incremental_vacuum(self):
+        with self.database.connections.write() as conn:
+            # execute() stops after the first page it frees; executescript() steps the pragma to completion
+            conn.executescript(f'PRAGMA incremental_vacuum({VACUUM_PAGES_PER_PASS});')
+
+    def stats(self):
+        return dict(self.policy.to_dict(),
+                    deleted_incidents=self.deleted_incidents,
+                    deleted_files=self.deleted_files,
+                    freed_bytes=self.freed_bytes,
+                    last_pass_ms=round(self.last_pass_ms, 2))
@@ -1,61 +1,498 @@
 import cv2
 import numpy as np
 
-def check_blur(gray_frame, threshold=50.0):
+# Analysis resolution: the flow detectors run on the pyramid level
+# whose width is at most this many pixels (640x480 input runs at full resolution)
+ANALYSIS_MAX_WIDTH = 640
+MAX_PYRAMID_LEVELS = 4
+
+# Global motion engines for check_shake / detect_camera_reposition, selectable
+# per camera through sensor_config['motion_engine']:
+#   'farneback'     - dense Farneback optical flow (per-pixel motion)
+#   'dis_ultrafast' - dense DIS optical flow, ULTRAFAST preset
+#   'dis_fast'      - dense DIS optical flow, FAST preset
+#   'phase'         - global translation from cv2.phaseCorrelate (much cheaper)
+MOTION_ENGINES = ('farneback', 'dis_ultrafast', 'dis_fast', 'phase')
+DIS_PRESETS = {
+    'dis_ultrafast': cv2.DISOPTICAL_FLOW_PRESET_ULTRAFAST,
+    'dis_fast': cv2.DISOPTICAL_FLOW_PRESET_FAST,
+}
+DEFAULT_MOTION_ENGINE = 'farneback'
+PHASE_CORRELATION_MAX_WIDTH = 320  # Phase correlation runs on the pyramid level at most this wide
+PHASE_MIN_RESPONSE = 0.05          # Below this peak response the shift is noise (flat/black frames)
+
+# Motion gate: when the mean absolute frame difference (gray levels) on the
+# pyramid level at most MOTION_GATE_MAX_WIDTH wide is below the threshold,
+# the scene is static and the motion engine is skipped. Sensor/compression
+# noise measures ~0.5-1.0; sub-pixel camera motion already exceeds 2.0.
+MOTION_GATE_MAX_WIDTH = 160
+MOTION_GATE_THRESHOLD = 1.5
+
+# Pyramid level each detector consumes:
+#   'full'     - level 0 (Laplacian variance depends on resolution)
+#   'analysis' - the level chosen for ANALYSIS_MAX_WIDTH
+DETECTOR_LEVELS = {
+    'blur': 'full',
+    'shake': 'analysis',
+    'reposition': 'analysis',
+}
+
+# Histograms are taken on every HIST_STRIDE-th pixel of every HIST_STRIDE-th
+# row. Plain subsampling keeps small specular highlights at full intensity;
+# a pyrDown level blurs them below the bright threshold.
+HIST_STRIDE = 2
+
+
+class FramePyramid:
+    """
+    Gaussian pyramid of one grayscale frame, built once per frame.
+
+    Levels are produced lazily with cv2.pyrDown, so detectors that only need
+    the coarse levels never pay for the ones they skip. Level n has scale
+    1 / 2**n relative to the full-resolution frame.
+    """
+
+    def __init__(self, gray_frame, analysis_max_width=None):
+        if analysis_max_width is None:
+            analysis_max_width = ANALYSIS_MAX_WIDTH
+        self._levels = [gray_frame]
+
+        width = gray_frame.shape[1]
+        level = 0
+        while width > analysis_max_width and level < MAX_PYRAMID_LEVELS - 1:
+            width = (width + 1) // 2
+            level += 1
+        self.analysis_level = level
+
+    def level(self, n):
+        """Image at pyramid level n (0 = full resolution)."""
+        while len(self._levels) <= n:
+            self._levels.append(cv2.pyrDown(self._levels[-1]))
+        return self._levels[n]
+
+    @staticmethod
+    def scale(n):
+        """Linear scale of level n relative to the full-resolution frame."""
+        return 1.0 / (1 << n)
+
+    def level_for(self, detector):
+        """Pyramid level index declared for a detector in DETECTOR_LEVELS."""
+        kind = DETECTOR_LEVELS.get(detector, 'full')
+        if kind == 'analysis':
+            return self.analysis_level
+        return 0
+
+    def for_detector(self, detector):
+        """Return (image, scale) for the level a detector consumes."""
+        n = self.level_for(detector)
+        return self.level(n), self.scale(n)
+
+    def level_for_width(self, max_width):
+        """Finest pyramid level whose width is at most max_width."""
+        width = self._levels[0].shape[1]
+        n = 0
+        while width > max_width and n < MAX_PYRAMID_LEVELS - 1:
+            width = (width + 1) // 2
+            n += 1
+        return n
+
+
+# Maps each of the 256 gray levels to its 26-bucket histogram bin (matches calcHist with 26 bins)
+_HIST26_BINS = (np.arange(256) * 26) // 256
+
+
+class FrameContext:
+    """
+    Buffers derived from one BGR frame, each computed lazily and at most once.
+
+    Detectors and rescue functions that accept a frame_context read the
+    grayscale image, pyramid, histograms, mean brightness and LAB conversion
+    from here instead of converting the frame again.
+
+    Histograms are taken on a HIST_STRIDE subsample of the full-resolution
+    gray frame, not on a pyramid level; hist_total is its pixel count.
+    """
+
+    def __init__(self, frame, analysis_max_width=None, gray=None):
+        self.frame = frame
+        self.analysis_max_width = analysis_max_width
+        self._gray = gray
+        self._pyramid = None
+        self._hist_gray = None
+        self._hist256 = None
+        self._hist26 = None
+        self._mean = None
+        self._lab = None
+
+    @property
+    def gray(self):
+        """Full-resolution grayscale frame."""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def pyramid(self):
+        """FramePyramid of the grayscale frame."""
+        if self._pyramid is None:
+            self._pyramid = FramePyramid(self.gray, self.analysis_max_width)
+        return self._pyramid
+
+    @property
+    def hist_gray(self):
+        """Strided subsample of the grayscale frame the histograms are computed on."""
+        if self._hist_gray is None:
+            self._hist_gray = self.gray[::HIST_STRIDE, ::HIST_STRIDE]
+        return self._hist_gray
+
+    @property
+    def hist_total(self):
+        """Pixel count behind the histograms."""
+        return self.hist_gray.size
+
+    @property
+    def hist256(self):
+        """256-bin grayscale histogram (256x1 float32, as cv2.calcHist returns)."""
+        if self._hist256 is None:
+            self._hist256 = cv2.calcHist([self.hist_gray], [0], None, [256], [0, 256])
+        return self._hist256
+
+    @property
+    def hist26(self):
+        """26-bucket histogram (~10 intensities per bucket), summed from hist256."""
+        if self._hist26 is None:
+            self._hist26 = np.bincount(_HIST26_BINS, weights=self.hist256.ravel(), minlength=26).astype(np.float32)
+        return self._hist26
+
+    @property
+    def mean(self):
+        """Mean brightness of the full-resolution grayscale frame."""
+        if self._mean is None:
+            self._mean = float(cv2.mean(self.gray)[0])
+        return self._mean
+
+    @property
+    def lab(self):
+        """Frame converted to LAB."""
+        if self._lab is None:
+            self._lab = cv2.cvtColor(self.frame, cv2.COLOR_BGR2LAB)
+        return self._lab
+
+
+def check_blur(gray_frame, threshold=50.0, frame_context=None):
     """
     Checks if a grayscale frame is blurry using the Laplacian variance method.
     
     Args:
         gray_frame (numpy.ndarray): The input grayscale image.
         threshold (float): Variance threshold. Below this is blurry.
+        frame_context (FrameContext): Optional; supplies the blur pyramid level
+            (gray_frame may then be None).
 
     Returns:
         bool: True if the image is blurry, False otherwise.
     """
+    if frame_context is not None:
+        gray_frame, _ = frame_context.pyramid.for_detector('blur')
     variance = cv2.Laplacian(gray_frame, cv2.CV_64F).var()
     return variance < threshold, variance
 
-def check_shake(gray_frame, prev_gray_frame, threshold=5.0):
+class FlowState:
+    """
+    Optical flow state carried from one frame pair to the next, per camera.
+
+    Holds two preallocated flow buffers used alternately: each frame's flow is
+    computed into one buffer, seeded from the other (the previous frame's flow)
+    when warm start is enabled. Camera motion is temporally coherent, so the
+    previous field is a good initial estimate for both Farneback
+    (OPTFLOW_USE_INITIAL_FLOW) and DIS. A context's flow stays valid until
+    the next-but-one frame overwrites its buffer.
+
+    Also keeps one cv2.DISOpticalFlow instance per preset so it is not
+    recreated every frame.
+    """
+
+    def __init__(self, warm_start=True):
+        self.warm_start = warm_start
+        self._buffers = None
+        self._current = 0
+        self._valid = False
+        self._dis = {}
+
+    def reset(self):
+        """Forget the previous flow (next frame starts cold)."""
+        self._valid = False
+
+    def next_buffer(self, shape):
+        """
+        Return (buffer, warm) for the next flow computation.
+
+        When warm is True the buffer already holds the previous frame's flow.
+        """
+        shape = (shape[0], shape[1], 2)
+        if self._buffers is None or self._buffers[0].shape != shape:
+            self._buffers = [np.zeros(shape, np.float32), np.zeros(shape, np.float32)]
+            self._valid = False
+
+        previous = self._buffers[self._current]
+        self._current ^= 1
+        buffer = self._buffers[self._current]
+
+        warm = self.warm_start and self._valid
+        if warm:
+            np.copyto(buffer, previous)
+        self._valid = True
+        return buffer, warm
+
+    def dis(self, engine):
+        """Cached cv2.DISOpticalFlow for a DIS engine name."""
+        instance = self._dis.get(engine)
+        if instance is None:
+            instance = cv2.DISOpticalFlow.create(DIS_PRESETS[engine])
+            self._dis[engine] = instance
+        return instance
+
+
+class FlowContext:
+    """
+    Dense optical flow for one (previous, current) frame pair.
+
+    The flow field ('farneback' or a DIS engine) and its magnitude are
+    computed lazily, once, and shared by every detector that receives this
+    context (check_shake and detect_camera_reposition both run on the same
+    pair each frame). With a FlowState the flow is written into its
+    persistent buffers and warm-started from the previous frame.
+
+    The pair may be a downscaled pyramid level; `scale` records its size
+    relative to the full-resolution frame so detectors can report motion in
+    full-resolution pixels and keep their thresholds unchanged.
+    """
+
+    def __init__(self, gray_frame, prev_gray_frame, scale=1.0, engine='farneback', flow_state=None):
+        if engine != 'farneback' and engine not in DIS_PRESETS:
+            raise ValueError(f"Unknown optical flow engine '{engine}'")
+        self.gray_frame = gray_frame
+        self.prev_gray_frame = prev_gray_frame
+        self.scale = scale
+        self.engine = engine
+        self.flow_state = flow_state
+        self.warm_started = False
+        self._flow = None
+        self._magnitude = None
+
+    @classmethod
+    def from_pyramids(cls, pyramid, prev_pyramid, detector='shake', engine='farneback', flow_state=None):
+        """Build a context on the pyramid level the flow detectors consume."""
+        n = pyramid.level_for(detector)
+        return cls(pyramid.level(n), prev_pyramid.level(n), FramePyramid.scale(n), engine, flow_state)
+
+    @property
+    def flow(self):
+        """HxWx2 float32 flow field (dx, dy)."""
+        if self._flow is None:
+            flow = None
+            if self.flow_state is not None:
+                flow, self.warm_started = self.flow_state.next_buffer(self.gray_frame.shape)
+
+            if self.engine == 'farneback':
+                self._flow = cv2.calcOpticalFlowFarneback(
+                    self.prev_gray_frame,
+                    self.gray_frame,
+                    flow,
+                    0.5,  # pyr_scale
+                    3,    # levels
+                    15,   # winsize
+                    3,    # iterations
+                    5,    # poly_n
+                    1.2,  # poly_sigma
+                    cv2.OPTFLOW_USE_INITIAL_FLOW if self.warm_started else 0  # flags
+                )
+            else:
+                if self.flow_state is not None:
+                    dis = self.flow_state.dis(self.engine)
+                    if not self.warm_started:
+                        flow.fill(0)  # DIS treats a provided flow as the initial estimate
+                else:
+                    dis = cv2.DISOpticalFlow.create(DIS_PRESETS[self.engine])
+                self._flow = dis.calc(self.prev_gray_frame, self.gray_frame, flow)
+        return self._flow
+
+    @property
+    def magnitude(self):
+        """HxW float32 magnitude (speed) of the motion vectors."""
+        if self._magnitude is None:
+            flow = self.flow
+            self._magnitude = cv2.magnitude(flow[..., 0], flow[..., 1])
+        return self._magnitude
+
+    def mean_motion(self):
+        """Average per-pixel motion magnitude, in full-resolution pixels."""
+        return float(self.magnitude.mean()) / self.scale
+
+    def global_shift(self):
+        """(shift_magnitude, shift_x, shift_y) in full-resolution pixels."""
+        return estimate_global_shift(self)
+
+
+# Hanning windows for phase correlation, keyed by (width, height)
+_hanning_windows = {}
+
+
+class PhaseCorrelationContext:
+    """
+    Global translation for one frame pair via cv2.phaseCorrelate ('phase' engine).
+
+    Shake and reposition only need the camera's global translation, not a
+    dense per-pixel field. Phase correlation on a Hanning-windowed, downscaled
+    frame gives that translation at a small fraction of the Farneback cost.
+    It exposes the same mean_motion()/global_shift() contract as FlowContext;
+    mean_motion() is the magnitude of the global shift.
+    """
+
+    engine = 'phase'
+
+    def __init__(self, gray_frame, prev_gray_frame, scale=1.0):
+        self.gray_frame = gray_frame
+        self.prev_gray_frame = prev_gray_frame
+        self.scale = scale
+        self._shift = None
+        self.response = 0.0
+
+    @classmethod
+    def from_pyramids(cls, pyramid, prev_pyramid, max_width=None):
+        """Build a context on the pyramid level at most max_width pixels wide."""
+        n = pyramid.level_for_width(max_width or PHASE_CORRELATION_MAX_WIDTH)
+        return cls(pyramid.level(n), prev_pyramid.level(n), FramePyramid.scale(n))
+
+    def _compute(self):
+        h, w = self.gray_frame.shape[:2]
+        window = _hanning_windows.get((w, h))
+        if window is None:
+            window = cv2.createHanningWindow((w, h), cv2.CV_32F)
+            _hanning_windows[(w, h)] = window
+
+        (dx, dy), response = cv2.phaseCorrelate(
+            self.prev_gray_frame.astype(np.float32),
+            self.gray_frame.astype(np.float32),
+            window
+        )
+        self.response = float(response)
+        if self.response < PHASE_MIN_RESPONSE:
+            dx = dy = 0.0
+        # Rescale to full-resolution pixels
+        self._shift = (dx / self.scale, dy / self.scale)
+
+    def mean_motion(self):
+        """Magnitude of the global shift, in full-resolution pixels."""
+        if self._shift is None:
+            self._compute()
+        return float(np.hypot(*self._shift))
+
+    def global_shift(self):
+        """(shift_magnitude, shift_x, shift_y) in full-resolution pixels."""
+        if self._shift is None:
+            self._compute()
+        shift_x, shift_y = self._shift
+        shift_magnitude = float(np.hypot(shift_x, shift_y))
+
+        # Apply noise filtering: ignore very small movements
+        if shift_magnitude < 0.2:
+            return 0.0, 0.0, 0.0
+        return shift_magnitude, shift_x, shift_y
+
+
+class StaticMotionContext:
+    """
+    Motion context for a frame pair the motion gate found static.
+
+    Reports zero motion without running any motion engine. Detectors still
+    receive it, so the reposition tracker records the still frame and its
+    history stays continuous.
+    """
+
+    engine = 'static'
+
+    def __init__(self, gray_frame, prev_gray_frame, scale=1.0, energy=0.0):
+        self.gray_frame = gray_frame
+        self.prev_gray_frame = prev_gray_frame
+        self.scale = scale
+        self.energy = energy
+
+    def mean_motion(self):
+        return 0.0
+
+    def global_shift(self):
+        return 0.0, 0.0, 0.0
+
+
+def frame_difference_energy(pyramid, prev_pyramid, max_width=None):
+    """
+    Mean absolute difference between two frames on a small pyramid level.
+
+    Returns:
+        tuple: (energy, level) - energy in gray levels, and the level used.
+    """
+    n = pyramid.level_for_width(max_width or MOTION_GATE_MAX_WIDTH)
+    return float(cv2.absdiff(pyramid.level(n), prev_pyramid.level(n)).mean()), n
+
+
+def create_motion_context(pyramid, prev_pyramid, engine=None, flow_state=None, gate_threshold=None):
     """
-    Checks for camera shake using Dense Optical Flow.
+    Build the motion context for a frame pair with the selected engine.
+
+    Args:
+        pyramid (FramePyramid): Current frame.
+        prev_pyramid (FramePyramid): Previous frame.
+        engine (str): One of MOTION_ENGINES (defaults to DEFAULT_MOTION_ENGINE).
+        flow_state (FlowState): Per-camera buffers and warm start for the
+            optical flow engines (ignored by 'phase').
+        gate_threshold (float): Skip the engine and return a StaticMotionContext
+            when the frame difference energy is below this (None disables the gate).
+
+    Returns:
+        FlowContext, PhaseCorrelationContext or StaticMotionContext
+    """
+    engine = engine or DEFAULT_MOTION_ENGINE
+    if gate_threshold is not None:
+        energy, n = frame_difference_energy(pyramid, prev_pyramid)
+        if energy < gate_threshold:
+            if flow_state is not None:
+                flow_state.reset()
+            return StaticMotionContext(pyramid.level(n), prev_pyramid.level(n), FramePyramid.scale(n), energy)
+    if engine == 'phase':
+        if flow_state is not None:
+            flow_state.reset()  # The stored flow is stale once frames are skipped
+        return PhaseCorrelationContext.from_pyramids(pyramid, prev_pyramid)
+    if engine == 'farneback' or engine in DIS_PRESETS:
+        return FlowContext.from_pyramids(pyramid, prev_pyramid, engine=engine, flow_state=flow_state)
+    raise ValueError(f"Unknown motion engine '{engine}'")
+
+
+def check_shake(gray_frame, prev_gray_frame, threshold=5.0, flow_context=None):
+    """
+    Checks for camera shake using Dense Optical Flow (or phase correlation).
     
     Args:
         gray_frame (numpy.ndarray): The current grayscale frame.
         prev_gray_frame (numpy.ndarray): The previous grayscale frame.
         threshold (float): Average motion magnitude. Above this is shake.
+        flow_context (FlowContext or PhaseCorrelationContext): Optional shared
+            motion context for this frame pair (selects the engine).
 
     Returns:
         bool: True if shake is detected, False otherwise.
         float: The average motion magnitude.
     """
-    # Pre-allocate flow array
-    flow = np.zeros((gray_frame.shape[0], gray_frame.shape[1], 2), dtype=np.float32)
-    
-    # Calculate dense optical flow
-    flow = cv2.calcOpticalFlowFarneback(
-        prev_gray_frame, 
-        gray_frame, 
-        flow, 
-        0.5,  # pyr_scale
-        3,    # levels
-        15,   # winsize
-        3,    # iterations
-        5,    # poly_n
-        1.2,  # poly_sigma
-        0     # flags
-    )
+    if flow_context is None:
+        flow_context = FlowContext(gray_frame, prev_gray_frame)
     
-    # Calculate the magnitude (speed) of motion vectors
-    magnitude, _ = cv2.cartToPolar(flow[..., 0], flow[..., 1])
-    
-    # Convert to NumPy array and get the average magnitude across the entire frame
-    magnitude_np = cv2.cvtColor(magnitude.astype(np.uint8), cv2.COLOR_GRAY2BGR) if len(magnitude.shape) == 2 else magnitude
-    avg_magnitude = float(magnitude.mean())
+    # Average magnitude across the entire frame, in full-resolution pixels
+    avg_magnitude = flow_context.mean_motion()
     
     # If avg magnitude is high, it means the whole camera is moving (shake)
     return avg_magnitude > threshold, avg_magnitude
 
-def check_glare(frame, threshold_pct=10.0):
+def check_glare(frame, threshold_pct=10.0, frame_context=None):
     """
     Analyzes a frame to detect glare.
     
@@ -64,6 +501,8 @@ def check_glare(frame, threshold_pct=10.0):
     Args:
         frame (numpy.ndarray): The BGR video frame from OpenCV.
         threshold_pct (float): The percentage of white pixels that triggers glare detection.
+        frame_context (FrameContext): Optional; reuses its shared histograms
+            (histogram counts are then on the context's histogram level).
 
     Returns:
         tuple: (is_glare, percentage, histogram)
@@ -71,6 +510,11 @@ def check_glare(frame, threshold_pct=10.0):
             - percentage (float): The actual percentage of white pixels.
             - histogram (numpy.ndarray): Histogram data for visualization.
     """
+    if frame_context is not None:
+        percentage = float(frame_context.hist256[250:].sum()) / frame_context.hist_total * 100
+        is_glare = percentage > threshold_pct
+        return is_glare, percentage, frame_context.hist26.tolist()
+
     # Convert to grayscale for analysis
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
     
@@ -115,37 +559,242 @@ def fix_blur_unsharp_mask(frame, kernel_size=5, sigma=1.0, strength=1.5):
     
     # Unsharp mask formula: output = original + (original - blurred) * strength
     # This amplifies the high-frequency details (edges)
+    # (addWeighted saturates uint8 output to [0, 255], so no separate clip/convert copy is needed)
     sharpened = cv2.addWeighted(frame, 1.0 + strength, blurred, -strength, 0)
     
-    # Clip values to valid range [0, 255] and convert to uint8
-    sharpened = np.clip(sharpened, 0, 255).astype(np.uint8)
-    
     return sharpened
 
-# Track shift magnitude history for repositioning detection
-_shift_history = []
-_direction_history = []  # Track direction vectors for consistency
 _MAX_HISTORY = 15  # Track last 15 frames for better temporal analysis
+_FAST_WINDOW = 3    # Frames inspected by the fast-reposition criterion
+_SLOW_WINDOW = 6    # Frames inspected by the slow-reposition criterion
 
-def _exponential_moving_average(value, history, alpha=0.3):
-    """Apply exponential moving average to smooth noisy measurements."""
-    if not history:
-        return value
-    return alpha * value + (1 - alpha) * history[-1]
 
-def detect_camera_reposition(gray_frame, prev_gray_frame, threshold_shift=10.0):
+class RepositionTracker:
+    """
+    Temporal repositioning state for one camera.
+
+    Smoothed shift magnitudes and unit direction vectors are kept in fixed-size
+    NumPy ring buffers; the fast and slow criteria are evaluated with vector
+    operations over preallocated windows, so update() does no per-frame list
+    building. Give every camera pipeline its own instance.
+    """
+
+    def __init__(self, history=_MAX_HISTORY, alpha=0.25):
+        """
+        Args:
+            history (int): Ring buffer length (frames).
+            alpha (float): Exponential moving average weight of the newest shift.
+        """
+        if history < _SLOW_WINDOW:
+            raise ValueError(f"history must be at least {_SLOW_WINDOW} frames")
+        self.history = history
+        self.alpha = alpha
+
+        self._shifts = np.zeros(history, dtype=np.float64)          # smoothed shift magnitudes
+        self._directions = np.zeros((history, 2), dtype=np.float64)  # unit vectors, (0, 0) if no direction
+        self._has_direction = np.zeros(history, dtype=bool)
+
+        # Window indices for every head position, so the last N entries are one np.take away
+        positions = np.arange(history)[:, None]
+        self._fast_index = (positions + np.arange(-_FAST_WINDOW, 0)) % history
+        self._slow_index = (positions + np.arange(-_SLOW_WINDOW, 0)) % history
+
+        # Preallocated window buffers
+        self._fast_shifts = np.zeros(_FAST_WINDOW, dtype=np.float64)
+        self._slow_shifts = np.zeros(_SLOW_WINDOW, dtype=np.float64)
+        self._slow_directions = np.zeros((_SLOW_WINDOW, 2), dtype=np.float64)
+        self._slow_has_direction = np.zeros(_SLOW_WINDOW, dtype=bool)
+        self._slow_mask = np.zeros(_SLOW_WINDOW, dtype=bool)
+
+        self.reset()
+
+    def reset(self):
+        """Forget all history (e.g. after the camera source changes)."""
+        self._head = 0    # next write position
+        self._count = 0   # valid entries (<= history)
+        self._shifts.fill(0.0)
+        self._directions.fill(0.0)
+        self._has_direction.fill(False)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def last_smoothed_shift(self):
+        """Most recent smoothed shift magnitude (0.0 before the first update)."""
+        if self._count == 0:
+            return 0.0
+        return float(self._shifts[(self._head - 1) % self.history])
+
+    def update(self, shift_magnitude, shift_x, shift_y, threshold_shift=10.0):
+        """
+        Add one frame's global shift and evaluate the repositioning criteria.
+
+        Repositioning is detected when:
+        1. Fast: the smoothed shift exceeds 1.8x threshold in 2 of the last 3 frames.
+        2. Slow: 4 of the last 6 frames exceed 0.6x threshold and at least 3 of
+           those have a direction, with direction consistency above 0.5.
+
+        Args:
+            shift_magnitude (float): Global shift magnitude in pixels.
+            shift_x, shift_y (float): Global shift components in pixels.
+            threshold_shift (float): Threshold for shift magnitude detection.
+
+        Returns:
+            bool: True if sustained repositioning is detected.
+        """
+        # Exponential moving average against the previous smoothed value
+        if self._count:
+            smoothed_shift = self.alpha * shift_magnitude + (1 - self.alpha) * self.last_smoothed_shift
+        else:
+            smoothed_shift = shift_magnitude
+
+        head = self._head
+        self._shifts[head] = smoothed_shift
+        if shift_magnitude > 0.5:
+            self._directions[head, 0] = shift_x / shift_magnitude
+            self._directions[head, 1] = shift_y / shift_magnitude
+            self._has_direction[head] = True
+        else:
+            self._directions[head] = 0.0
+            self._has_direction[head] = False
+
+        self._head = (head + 1) % self.history
+        self._count = min(self._count + 1, self.history)
+
+        if self._count < 2:
+            return False
+
+        # CRITERION 1: FAST REPOSITIONING (Sudden large movement)
+        # Requires sustained high shift over 2+ frames (not just one spike)
+        fast_window = min(self._count, _FAST_WINDOW)
+        np.take(self._shifts, self._fast_index[self._head], out=self._fast_shifts)
+        fast_shifts = self._fast_shifts[_FAST_WINDOW - fast_window:]
+        if np.count_nonzero(fast_shifts > threshold_shift * 1.8) >= 2:
+            return True
+
+        # CRITERION 2: SLOW/SUSTAINED REPOSITIONING (Gradual movement)
+        if self._count < _SLOW_WINDOW:
+            return False
+
+        slow_index = self._slow_index[self._head]
+        np.take(self._shifts, slow_index, out=self._slow_shifts)
+        np.greater(self._slow_shifts, threshold_shift * 0.6, out=self._slow_mask)
+        if np.count_nonzero(self._slow_mask) < 4:
+            return False
+
+        # Only consider directions where shift was significant
+        np.take(self._has_direction, slow_index, out=self._slow_has_direction)
+        np.logical_and(self._slow_mask, self._slow_has_direction, out=self._slow_mask)
+        significant = np.count_nonzero(self._slow_mask)
+        if significant < 3:
+            return False
+
+        np.take(self._directions, slow_index, axis=0, out=self._slow_directions)
+        avg_dir_x = float(self._slow_directions[self._slow_mask, 0].sum()) / significant
+        avg_dir_y = float(self._slow_directions[self._slow_mask, 1].sum()) / significant
+        avg_direction_mag = (avg_dir_x ** 2 + avg_dir_y ** 2) ** 0.5
+        if avg_direction_mag <= 0:
+            return False
+
+        # Mean dot product of each direction with the mean direction; this reduces
+        # to |mean|^2 / |mean| (angles within ~60 degrees when above 0.5)
+        direction_consistency = avg_direction_mag ** 2 / (avg_direction_mag + 1e-6)
+        return direction_consistency > 0.5
+
+
+# Shared tracker used when detect_camera_reposition is called without one
+_default_tracker = RepositionTracker()
+
+
+# Global shift estimator used by detect_camera_reposition:
+#   'fast'  - one masked pass over a strided subsample grid, median via np.partition
+#   'exact' - one masked pass over the full flow field, np.median
+SHIFT_ESTIMATOR = 'fast'
+SHIFT_SUBSAMPLE_STRIDE = 4  # Every 4th flow vector in x and y (1/16 of the field)
+
+
+def _partition_median(values):
+    """Median via np.partition (averages the two middle values for even counts)."""
+    n = values.size
+    k = n // 2
+    if n % 2:
+        return float(np.partition(values, k)[k])
+    part = np.partition(values, (k - 1, k))
+    return 0.5 * (float(part[k - 1]) + float(part[k]))
+
+
+def estimate_global_shift(flow_context, method=None, stride=None):
+    """
+    Estimate the global (camera) translation from a dense flow field.
+
+    The shift is the per-axis median of the flow vectors that move more than
+    the 0.1 px noise floor (robust against moving objects). The flow field is
+    smooth at the scale of the Farneback window, so the 'fast' method takes
+    the median of a strided subsample grid and agrees with the exact median
+    to within a small fraction of a pixel.
+
+    Args:
+        flow_context (FlowContext): Flow for the frame pair.
+        method (str): 'fast' or 'exact' (defaults to SHIFT_ESTIMATOR).
+        stride (int): Subsample stride for 'fast' (defaults to SHIFT_SUBSAMPLE_STRIDE).
+
+    Returns:
+        tuple: (shift_magnitude, shift_x, shift_y) in full-resolution pixels,
+            zeroed below the 0.2 px noise floor.
+    """
+    if method is None:
+        method = SHIFT_ESTIMATOR
+    if method not in ('fast', 'exact'):
+        raise ValueError(f"Unknown shift estimator '{method}'")
+
+    flow = flow_context.flow
+    magnitude = flow_context.magnitude
+    scale = flow_context.scale
+
+    if method == 'fast':
+        step = stride or SHIFT_SUBSAMPLE_STRIDE
+        flow = flow[::step, ::step]
+        magnitude = magnitude[::step, ::step]
+
+    # Single masked pass: ignore noise (very small movements)
+    noise_floor = 0.1 * scale  # 0.1 full-resolution pixels at this pyramid level
+    valid = magnitude > noise_floor
+    valid_flow = flow[valid]  # Nx2 (dx, dy)
+
+    if valid_flow.shape[0] == 0:
+        shift_x, shift_y, shift_magnitude = 0.0, 0.0, 0.0
+    else:
+        # Use median for robustness against outliers (rescaled to full-resolution pixels)
+        if method == 'fast':
+            shift_x = _partition_median(valid_flow[:, 0]) / scale
+            shift_y = _partition_median(valid_flow[:, 1]) / scale
+        else:
+            shift_x = float(np.median(valid_flow[:, 0])) / scale
+            shift_y = float(np.median(valid_flow[:, 1])) / scale
+        shift_magnitude = np.sqrt(shift_x**2 + shift_y**2)
+
+    # Apply noise filtering: ignore very small movements
+    if shift_magnitude < 0.2:
+        shift_magnitude = 0.0
+        shift_x = 0.0
+        shift_y = 0.0
+
+    return shift_magnitude, shift_x, shift_y
+
+def detect_camera_reposition(gray_frame, prev_gray_frame, threshold_shift=10.0, flow_context=None, tracker=None):
     """
     Detects camera repositioning by analyzing sustained directional motion.
-    Improved accuracy with better direction consistency and noise filtering.
-    
-    Repositioning is detected when:
-    1. For fast movement: High shift magnitude (>2x threshold) sustained for 2+ frames
-    2. For slow movement: Consistent directional movement over 5+ frames
+    Thin wrapper: estimates the global shift for this frame pair and feeds it
+    to a RepositionTracker (see RepositionTracker.update for the criteria).
     
     Args:
         gray_frame (numpy.ndarray): Current grayscale frame.
         prev_gray_frame (numpy.ndarray): Previous grayscale frame.
         threshold_shift (float): Threshold for shift magnitude detection. Default 10.0.
+        flow_context (FlowContext or PhaseCorrelationContext): Optional shared
+            motion context for this frame pair (selects the engine).
+        tracker (RepositionTracker): Per-camera history. Defaults to a module-level tracker.
     
     Returns:
         tuple: (is_repositioned, shift_magnitude, shift_x, shift_y)
@@ -154,103 +803,12 @@ def detect_camera_reposition(gray_frame, prev_gray_frame, threshold_shift=10.0):
             - shift_x (float): Average horizontal motion.
             - shift_y (float): Average vertical motion.
     """
-    global _shift_history, _direction_history
-    
-    h, w = gray_frame.shape
-    
-    # Calculate dense optical flow
-    flow = np.zeros((h, w, 2), dtype=np.float32)
-    flow = cv2.calcOpticalFlowFarneback(
-        prev_gray_frame, gray_frame, flow,
-        0.5, 3, 15, 3, 5, 1.2, 0
-    )
-    
-    # Calculate magnitude of motion vectors
-    magnitude = np.sqrt(flow[..., 0]**2 + flow[..., 1]**2)
-    
-    # Use full frame but filter outliers for more accurate detection
-    valid_magnitude = magnitude[magnitude > 0.1]  # Ignore noise (very small movements)
-    
-    if len(valid_magnitude) == 0:
-        shift_x, shift_y, shift_magnitude = 0.0, 0.0, 0.0
-    else:
-        # Calculate shift using median of top 25% of flows (more robust than mean)
-        valid_flow_x = flow[..., 0][magnitude > 0.1]
-        valid_flow_y = flow[..., 1][magnitude > 0.1]
-        
-        # Use median for robustness against outliers
-        shift_x = float(np.median(valid_flow_x)) if len(valid_flow_x) > 0 else 0.0
-        shift_y = float(np.median(valid_flow_y)) if len(valid_flow_y) > 0 else 0.0
-        shift_magnitude = np.sqrt(shift_x**2 + shift_y**2)
-    
-    # Apply noise filtering: ignore very small movements
-    if shift_magnitude < 0.2:
-        shift_magnitude = 0.0
-        shift_x = 0.0
-        shift_y = 0.0
-    
-    # Track shift history with smoothing
-    smoothed_shift = _exponential_moving_average(shift_magnitude, _shift_history, alpha=0.25)
-    _shift_history.append(smoothed_shift)
-    if len(_shift_history) > _MAX_HISTORY:
-        _shift_history.pop(0)
+    if flow_context is None:
+        flow_context = FlowContext(gray_frame, prev_gray_frame)
+    if tracker is None:
+        tracker = _default_tracker
     
-    # Track direction vectors (normalized)
-    if shift_magnitude > 0.5:
-        direction = (shift_x / shift_magnitude, shift_y / shift_magnitude)
-    else:
-        direction = (0.0, 0.0)
-    _direction_history.append(direction)
-    if len(_direction_history) > _MAX_HISTORY:
-        _direction_history.pop(0)
-    
-    # Repositioning detection with improved dual criteria:
-    is_repositioned = False
-    
-    if len(_shift_history) >= 2:
-        # CRITERION 1: FAST REPOSITIONING (Sudden large movement)
-        # Requires sustained high shift over 2+ frames (not just one spike)
-        fast_reposition_threshold = threshold_shift * 1.8  # Slightly lower for sensitivity
-        fast_reposition_count = sum(1 for s in _shift_history[-3:] if s > fast_reposition_threshold)
-        
-        if fast_reposition_count >= 2:
-            is_repositioned = True
-        
-        # CRITERION 2: SLOW/SUSTAINED REPOSITIONING (Gradual movement)
-        if len(_shift_history) >= 6:
-            # Detect sustained movement over 6 frames with direction consistency
-            recent_shifts = _shift_history[-6:]
-            recent_directions = _direction_history[-6:]
-            
-            # Count frames with significant shift (>50% of threshold)
-            shift_count = sum(1 for s in recent_shifts if s > threshold_shift * 0.6)
-            
-            # Calculate direction consistency using dot product
-            if shift_count >= 4:
-                # Only consider directions where shift was significant
-                significant_directions = [
-                    recent_directions[i] for i in range(len(recent_directions))
-                    if recent_shifts[i] > threshold_shift * 0.6 and recent_directions[i] != (0.0, 0.0)
-                ]
-                
-                if len(significant_directions) >= 3:
-                    # Calculate average direction
-                    avg_dir_x = np.mean([d[0] for d in significant_directions])
-                    avg_dir_y = np.mean([d[1] for d in significant_directions])
-                    avg_direction_mag = np.sqrt(avg_dir_x**2 + avg_dir_y**2)
-                    
-                    # Direction consistency: how aligned are the individual directions?
-                    # Calculate average dot product with the mean direction
-                    if avg_direction_mag > 0:
-                        dot_products = [
-                            (d[0] * avg_dir_x + d[1] * avg_dir_y) / (avg_direction_mag + 1e-6)
-                            for d in significant_directions
-                        ]
-                        direction_consistency = float(np.mean(dot_products))
-                        
-                        # Slow repositioning: sustained consistent movement
-                        # Direction consistency > 0.5 means angles are within ~60 degrees
-                        if direction_consistency > 0.5:
-                            is_repositioned = True
+    shift_magnitude, shift_x, shift_y = flow_context.global_shift()
+    is_repositioned = tracker.update(shift_magnitude, shift_x, shift_y, threshold_shift)
     
-    return is_repositioned, shift_magnitude, shift_x, shift_y
\ No newline at end of file
+    return is_repositioned, shift_magnitude, shift_x, shift_y
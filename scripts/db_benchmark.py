@@ -0,0 +1,139 @@
+"""
+Benchmark for concurrent AegisDatabase readers and writers.
+
+A writer thread records detections and glare images (as the camera thread
+does during a glare event) while reader threads poll get_recent_incidents()
+(as dashboard tabs do). Compares the persistent WAL connection manager
+against the old behaviour of a fresh connection per call under one global
+lock: first the writer alone at full speed, then readers against a writer
+paced at camera rate.
+
+Examples:
+    python scripts/db_benchmark.py
+    python scripts/db_benchmark.py --readers 8 --seconds 5 --write-fps 60 --synchronous FULL
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.database import AegisDatabase  # noqa: E402
+
+
+class PerCallConnections:
+    """The previous behaviour: new connection per call, one lock for reads and writes."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode = DELETE')
+        return conn
+
+    @contextmanager
+    def write(self):
+        with self.lock:
+            conn = self._connect()
+            try:
+                yield conn
+                conn.commit()
+            finally:
+                conn.close()
+
+    @contextmanager
+    def read(self):
+        with self.lock:
+            conn = self._connect()
+            try:
+                yield conn
+            finally:
+                conn.close()
+
+    def close(self):
+        pass
+
+
+def run(db, readers, seconds, write_fps=0):
+    """Return (writes/s, reads/s, p99 read latency ms, worst read latency ms)."""
+    stop = threading.Event()
+    writes = [0]
+    read_times = []
+    lock = threading.Lock()
+
+    def writer():
+        t = 1000.0
+        next_write = time.perf_counter()
+        while not stop.is_set():
+            if write_fps:
+                next_write += 1.0 / write_fps
+                time.sleep(max(0.0, next_write - time.perf_counter()))
+            t += 1.0 / 30.0
+            incident_id = db.record_detection('glare', t, 'Glare or bright light detected')
+            db.add_glare_image(f'glare_{int(t * 1000)}.jpg', 40.0, t, incident_id)
+            writes[0] += 1
+
+    def reader():
+        while not stop.is_set():
+            start = time.perf_counter()
+            db.get_recent_incidents(limit=5)
+            elapsed = time.perf_counter() - start
+            with lock:
+                read_times.append(elapsed)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    db.flush()
+    read_ms = np.array(read_times or [0.0]) * 1000.0
+    return writes[0] / seconds, len(read_times) / seconds, np.percentile(read_ms, 99), read_ms.max()
+
+
+def open_databases(tmp, synchronous):
+    legacy = AegisDatabase(os.path.join(tmp, 'legacy.db'))
+    legacy.connections.close()
+    legacy.connections = PerCallConnections(legacy.db_path)
+    pooled = AegisDatabase(os.path.join(tmp, 'wal.db'), pragmas={'synchronous': synchronous})
+    return [('per-call + global lock', legacy),
+            (f'WAL writer + {pooled.connections.read_pool_size} readers', pooled)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AegisDatabase concurrency benchmark')
+    parser.add_argument('--readers', type=int, default=4, help='Concurrent reader threads')
+    parser.add_argument('--seconds', type=float, default=3.0, help='Duration of each run')
+    parser.add_argument('--write-fps', type=float, default=30.0, help='Writer rate while readers run (0 = unpaced)')
+    parser.add_argument('--synchronous', default='NORMAL', help='synchronous pragma of the WAL run')
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print("DATABASE CONCURRENCY BENCHMARK")
+    print("=" * 78)
+    print(f"{'Connections':<30}{'readers':>8}{'writes/s':>10}{'reads/s':>10}{'p99 read ms':>12}{'max read ms':>12}")
+    for readers, write_fps in ((0, 0), (args.readers, args.write_fps)):
+        with tempfile.TemporaryDirectory() as tmp:
+            for label, db in open_databases(tmp, args.synchronous):
+                writes, reads, p99, worst = run(db, readers, args.seconds, write_fps)
+                print(f"{label:<30}{readers:>8}{writes:>10.0f}{reads:>10.0f}{p99:>12.2f}{worst:>12.2f}")
+                db.connections.close()
+        print("-" * 78)
+    print(f"Writer {'unpaced' if not args.write_fps else f'paced at {args.write_fps:.0f}/s'} in the reader run")
+
+
+if __name__ == "__main__":
+    main()
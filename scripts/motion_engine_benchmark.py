@@ -0,0 +1,126 @@
+"""
+Benchmark for the shake/reposition motion engines in tamper_detector.
+
+Runs every engine (Farneback, DIS ULTRAFAST/FAST, phase correlation), cold
+and warm-started, on the same clips at the analysis pyramid level, and
+reports per-frame latency and how often the shake and reposition decisions
+agree with the cold Farneback reference.
+
+Examples:
+    python scripts/motion_engine_benchmark.py
+    python scripts/motion_engine_benchmark.py --source assets/samples/watermarked_output.mp4 --frames 140
+    python scripts/motion_engine_benchmark.py --source synthetic:shake@20-50 --source synthetic:blur@10-40
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import tamper_detector  # noqa: E402
+from backend.camera_pipeline import SHAKE_THRESHOLD, REPOSITION_THRESHOLD  # noqa: E402
+from backend.frame_sources import create_frame_source, VideoFileSource  # noqa: E402
+
+DEFAULT_SOURCES = ['synthetic:shake@20-50,shake@90-110']
+
+# (label, engine, warm_start); the first entry is the reference
+VARIANTS = [
+    ('farneback', 'farneback', False),
+    ('farneback warm', 'farneback', True),
+    ('dis_ultrafast', 'dis_ultrafast', False),
+    ('dis_ultrafast warm', 'dis_ultrafast', True),
+    ('dis_fast', 'dis_fast', False),
+    ('dis_fast warm', 'dis_fast', True),
+    ('phase', 'phase', False),
+]
+
+
+def load_pyramids(spec, count, width):
+    source = create_frame_source(int(spec) if spec.isdigit() else spec)
+    if isinstance(source, VideoFileSource):
+        source.realtime = False
+    elif hasattr(source, 'width'):
+        source.width, source.height = width, width * 3 // 4
+    if not source.open():
+        raise SystemExit(f"Could not open source {source.name}")
+    pyramids = []
+    for _ in range(count + 1):
+        ret, frame = source.read()
+        if not ret:
+            break
+        pyramid = tamper_detector.FramePyramid(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        pyramid.for_detector('shake')  # build the analysis level outside the timed loop
+        pyramids.append(pyramid)
+    source.release()
+    return pyramids
+
+
+def run_variant(pyramids, engine, warm_start):
+    """Return (ms per frame, shake decisions, shake magnitudes, reposition decisions)."""
+    flow_state = tamper_detector.FlowState(warm_start=warm_start)
+    tracker = tamper_detector.RepositionTracker()
+    shakes, magnitudes, repositions = [], [], []
+    elapsed = 0.0
+    for prev_pyramid, pyramid in zip(pyramids, pyramids[1:]):
+        start = time.perf_counter()
+        context = tamper_detector.create_motion_context(pyramid, prev_pyramid, engine, flow_state=flow_state)
+        is_shaken, magnitude = tamper_detector.check_shake(
+            context.gray_frame, context.prev_gray_frame, threshold=SHAKE_THRESHOLD, flow_context=context
+        )
+        is_repositioned = tamper_detector.detect_camera_reposition(
+            context.gray_frame, context.prev_gray_frame, threshold_shift=REPOSITION_THRESHOLD,
+            flow_context=context, tracker=tracker
+        )[0]
+        elapsed += time.perf_counter() - start
+        shakes.append(is_shaken)
+        magnitudes.append(magnitude)
+        repositions.append(is_repositioned)
+    return elapsed * 1000.0 / max(len(shakes), 1), shakes, np.array(magnitudes), repositions
+
+
+def agreement(a, b):
+    return np.mean([x == y for x, y in zip(a, b)]) * 100.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Motion engine benchmark')
+    parser.add_argument('--source', action='append', default=None, help='Frame source spec (repeatable)')
+    parser.add_argument('--frames', type=int, default=120, help='Frame pairs per clip')
+    parser.add_argument('--width', type=int, default=640, help='Synthetic frame width')
+    args = parser.parse_args()
+
+    print("=" * 84)
+    print("MOTION ENGINE BENCHMARK")
+    print("=" * 84)
+    for spec in args.source or DEFAULT_SOURCES:
+        pyramids = load_pyramids(spec, args.frames, args.width)
+        if len(pyramids) < 2:
+            print(f"{spec}: need at least two frames, skipped")
+            continue
+
+        analysis, _ = pyramids[0].for_detector('shake')
+        print(f"Clip: {spec}   Frame pairs: {len(pyramids) - 1}   "
+              f"Analysis level: {analysis.shape[1]}x{analysis.shape[0]}")
+        print(f"{'Engine':<20}{'ms/frame':>10}{'speedup':>10}{'shake agree':>14}"
+              f"{'reposition agree':>18}{'mean |dmag| px':>16}")
+
+        reference = None
+        for label, engine, warm_start in VARIANTS:
+            ms, shakes, magnitudes, repositions = run_variant(pyramids, engine, warm_start)
+            if reference is None:
+                reference = (ms, shakes, magnitudes, repositions)
+            ref_ms, ref_shakes, ref_magnitudes, ref_repositions = reference
+            print(f"{label:<20}{ms:>10.2f}{ref_ms / ms:>10.1f}{agreement(shakes, ref_shakes):>13.1f}%"
+                  f"{agreement(repositions, ref_repositions):>17.1f}%"
+                  f"{np.abs(magnitudes - ref_magnitudes).mean():>16.3f}")
+        print("-" * 84)
+    print(f"Default engine: '{tamper_detector.DEFAULT_MOTION_ENGINE}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark for the nearest-incident lookup used by add_audio_log,
+add_glare_image and add_liveness_validation.
+
+Fills a temporary database with incidents, then times the old
+ORDER BY ABS(timestamp - ?) scan against find_nearest_incident()'s two
+index probes, and checks both pick an incident at the same distance.
+
+Examples:
+    python scripts/nearest_incident_benchmark.py
+    python scripts/nearest_incident_benchmark.py --incidents 100000 --lookups 500
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.database import AegisDatabase, find_nearest_incident  # noqa: E402
+
+INCIDENT_TYPES = ('PHYSICAL_TAMPER', 'LIVENESS_THREAT')
+
+
+def scan_nearest(cursor, timestamp, incident_type=None):
+    """The previous query: sort every (matching) incident by distance."""
+    if incident_type is None:
+        cursor.execute('SELECT id FROM incidents ORDER BY ABS(timestamp - ?) ASC LIMIT 1', (timestamp,))
+    else:
+        cursor.execute('SELECT id FROM incidents WHERE incident_type = ? ORDER BY ABS(timestamp - ?) ASC LIMIT 1',
+                       (incident_type, timestamp))
+    row = cursor.fetchone()
+    return row['id'] if row else None
+
+
+def fill(db, count, seed=0):
+    rng = np.random.default_rng(seed)
+    timestamps = 1.7e9 + np.sort(rng.uniform(0, count * 60.0, count))  # ~one incident a minute
+    types = rng.choice(INCIDENT_TYPES, count, p=(0.8, 0.2))
+    with db.connections.write() as conn:
+        conn.executemany(
+            'INSERT INTO incidents (incident_type, primary_detection, timestamp, count, description) '
+            'VALUES (?, ?, ?, 1, NULL)',
+            ((str(t), 'glare' if t == 'PHYSICAL_TAMPER' else 'freeze', float(ts)) for t, ts in zip(types, timestamps)))
+    return timestamps
+
+
+def time_lookups(cursor, lookup, queries, incident_type):
+    start = time.perf_counter()
+    ids = [lookup(cursor, t, incident_type) for t in queries]
+    return (time.perf_counter() - start) * 1000.0 / len(queries), ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Nearest-incident lookup benchmark')
+    parser.add_argument('--incidents', type=int, default=1_000_000, help='Incidents in the table')
+    parser.add_argument('--lookups', type=int, default=200, help='Probe lookups per variant')
+    parser.add_argument('--scan-lookups', type=int, default=10, help='Full-scan lookups per variant (slow)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = AegisDatabase(os.path.join(tmp, 'aegis.db'))
+        print(f"Filling {args.incidents:,} incidents...")
+        timestamps = fill(db, args.incidents)
+        rng = np.random.default_rng(1)
+        queries = rng.uniform(timestamps[0] - 60, timestamps[-1] + 60, args.lookups).tolist()
+
+        print("=" * 78)
+        print("NEAREST INCIDENT BENCHMARK")
+        print("=" * 78)
+        print(f"{'Filter':<18}{'scan ms':>12}{'probes ms':>12}{'speedup':>10}{'same distance':>16}")
+        with db.connections.read() as conn:
+            cursor = conn.cursor()
+            by_id = {}
+            for incident_type in (None,) + INCIDENT_TYPES:
+                scan_ms, scan_ids = time_lookups(cursor, scan_nearest, queries[:args.scan_lookups], incident_type)
+                probe_ms, probe_ids = time_lookups(cursor, find_nearest_incident, queries, incident_type)
+                for incident_id in scan_ids + probe_ids[:args.scan_lookups]:
+                    if incident_id not in by_id:
+                        by_id[incident_id] = cursor.execute('SELECT timestamp FROM incidents WHERE id = ?',
+                                                            (incident_id,)).fetchone()[0]
+                same = np.mean([abs(by_id[a] - t) == abs(by_id[b] - t)
+                                for a, b, t in zip(scan_ids, probe_ids, queries)]) * 100.0
+                label = incident_type or 'any type'
+                print(f"{label:<18}{scan_ms:>12.2f}{probe_ms:>12.4f}{scan_ms / probe_ms:>10.0f}{same:>15.1f}%")
+
+            print("-" * 78)
+            plan = cursor.execute(
+                'EXPLAIN QUERY PLAN SELECT id, timestamp FROM incidents WHERE incident_type = ? AND timestamp <= ? '
+                'ORDER BY timestamp DESC LIMIT 1', ('PHYSICAL_TAMPER', queries[0])).fetchall()
+            print("Probe plan: " + "; ".join(row[-1] for row in plan))
+        db.close()
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
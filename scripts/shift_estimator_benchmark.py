@@ -0,0 +1,107 @@
+"""
+Benchmark for the global shift estimators in tamper_detector.
+
+Computes the dense flow once per frame pair, then times the exact median
+against the fast strided/np.partition estimator and reports how closely the
+fast shifts and reposition decisions agree with the exact ones.
+
+Examples:
+    python scripts/shift_estimator_benchmark.py
+    python scripts/shift_estimator_benchmark.py --source assets/samples/watermarked_output.mp4 --frames 140
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import tamper_detector  # noqa: E402
+from backend.frame_sources import create_frame_source, VideoFileSource  # noqa: E402
+
+DEFAULT_SOURCE = 'synthetic:shake@20-50,shake@90-110'
+REPOSITION_THRESHOLD = 7.0
+
+
+def load_gray_frames(spec, count, width):
+    source = create_frame_source(int(spec) if spec.isdigit() else spec)
+    if isinstance(source, VideoFileSource):
+        source.realtime = False
+    if hasattr(source, 'width') and not isinstance(source, VideoFileSource):
+        source.width, source.height = width, width * 3 // 4
+    if not source.open():
+        raise SystemExit(f"Could not open source {source.name}")
+    frames = []
+    for _ in range(count + 1):
+        ret, frame = source.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    source.release()
+    return frames
+
+
+def time_estimator(contexts, repeats, **kwargs):
+    """Return (mean ms per call, list of (magnitude, x, y))."""
+    results = [tamper_detector.estimate_global_shift(c, **kwargs) for c in contexts]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for context in contexts:
+            tamper_detector.estimate_global_shift(context, **kwargs)
+    elapsed = (time.perf_counter() - start) * 1000.0 / (repeats * len(contexts))
+    return elapsed, results
+
+
+def decisions(results):
+    tracker = tamper_detector.RepositionTracker()
+    return [tracker.update(m, x, y, REPOSITION_THRESHOLD) for m, x, y in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Global shift estimator benchmark')
+    parser.add_argument('--source', default=DEFAULT_SOURCE, help='Frame source spec')
+    parser.add_argument('--frames', type=int, default=120, help='Frame pairs to evaluate')
+    parser.add_argument('--width', type=int, default=640, help='Synthetic frame width')
+    parser.add_argument('--repeats', type=int, default=3, help='Timing repeats per pair')
+    args = parser.parse_args()
+
+    frames = load_gray_frames(args.source, args.frames, args.width)
+    if len(frames) < 2:
+        raise SystemExit("Need at least two frames")
+
+    print("Computing flow fields...")
+    contexts = []
+    for prev_gray, gray in zip(frames, frames[1:]):
+        context = tamper_detector.FlowContext(gray, prev_gray)
+        context.magnitude  # force flow + magnitude so only the estimator is timed
+        contexts.append(context)
+
+    exact_ms, exact = time_estimator(contexts, args.repeats, method='exact')
+    exact_xy = np.array([(x, y) for _, x, y in exact])
+    exact_decisions = decisions(exact)
+
+    print("=" * 72)
+    print("GLOBAL SHIFT ESTIMATOR BENCHMARK")
+    print("=" * 72)
+    print(f"Frame size: {frames[0].shape[1]}x{frames[0].shape[0]}   Pairs: {len(contexts)}")
+    print(f"{'Estimator':<18}{'ms/frame':>10}{'speedup':>10}{'mean |err| px':>16}{'max |err| px':>14}{'decisions':>12}")
+    print(f"{'exact (np.median)':<18}{exact_ms:>10.3f}{1.0:>10.1f}{0.0:>16.4f}{0.0:>14.4f}{'100.0%':>12}")
+
+    for stride in (1, 2, 4, 8):
+        fast_ms, fast = time_estimator(contexts, args.repeats, method='fast', stride=stride)
+        fast_xy = np.array([(x, y) for _, x, y in fast])
+        error = np.abs(fast_xy - exact_xy)
+        agreement = np.mean([a == b for a, b in zip(decisions(fast), exact_decisions)]) * 100.0
+        label = f"fast stride={stride}"
+        print(f"{label:<18}{fast_ms:>10.3f}{exact_ms / fast_ms:>10.1f}{error.mean():>16.4f}"
+              f"{error.max():>14.4f}{agreement:>11.1f}%")
+    print("=" * 72)
+    print(f"Default: method='{tamper_detector.SHIFT_ESTIMATOR}', stride={tamper_detector.SHIFT_SUBSAMPLE_STRIDE}")
+
+
+if __name__ == "__main__":
+    main()
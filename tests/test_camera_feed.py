@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""Test versioned, immutable frame snapshots published by CameraFeed"""
+
+import threading
+import time
+
+import numpy as np
+from backend.pipeline_supervisor import CameraFeed
+
+
+def frame(value):
+    return np.full((48, 64, 3), value, np.uint8)
+
+
+def test_publish_swaps_immutable_snapshots():
+    feed = CameraFeed(0, 'synthetic')
+    assert feed.snapshot.version == 0
+
+    raw, processed = frame(10), frame(20)
+    feed.publish(raw, processed, {'camera_id': 0}, timestamp=1.0)
+    snapshot = feed.snapshot
+    assert snapshot.version == 1 and snapshot.timestamp == 1.0
+    assert snapshot.frame is raw and snapshot.processed_frame is processed, "Publishing must not copy"
+    assert not raw.flags.writeable and not processed.flags.writeable
+
+    feed.publish(frame(30), frame(40), {'camera_id': 0})
+    # A reader holding the old snapshot keeps a consistent pair
+    assert int(snapshot.frame[0, 0, 0]) == 10 and int(snapshot.processed_frame[0, 0, 0]) == 20
+    assert feed.snapshot.version == 2 and int(feed.current_frame[0, 0, 0]) == 30
+
+
+def test_jpeg_encoded_once_per_version():
+    feed = CameraFeed(0, 'synthetic')
+    feed.publish(frame(10), frame(20), {})
+    version, raw = feed.get_jpeg('raw', 80)
+    assert raw[:2] == b'\xff\xd8', "Expected JPEG bytes"
+    for _ in range(9):
+        assert feed.get_jpeg('raw', 80) == (version, raw)
+        feed.get_jpeg('processed', 80)
+    assert feed.get_jpeg('raw', 50)[1] is not raw, "Each quality level is cached separately"
+
+    stats = feed.jpeg_stats.to_dict()
+    assert stats['misses'] == 3 and stats['hits'] == 17
+    assert abs(stats['hit_ratio'] - 17 / 20) < 1e-9
+
+    feed.publish(frame(30), frame(40), {})
+    new_version, new_raw = feed.get_jpeg('raw', 80)
+    assert new_version == version + 1 and new_raw != raw, "A new version is encoded again"
+
+
+def test_wait_for_snapshot_blocks_until_new_version():
+    feed = CameraFeed(0, 'synthetic')
+    assert feed.wait_for_snapshot(0, timeout=0.05) is None, "No new version yet"
+
+    publisher = threading.Timer(0.05, feed.publish, (frame(1), frame(2), {}))
+    publisher.start()
+    start = time.monotonic()
+    snapshot = feed.wait_for_snapshot(0, timeout=2.0)
+    publisher.join()
+    assert snapshot is not None and snapshot.version == 1
+    assert time.monotonic() - start < 1.0, "Waiter should wake on publish, not on timeout"
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("CAMERA FEED TEST")
+    print("=" * 60)
+    test_publish_swaps_immutable_snapshots()
+    print("  ✓ Frames are published as immutable versioned snapshots")
+    test_jpeg_encoded_once_per_version()
+    print("  ✓ JPEG encoded once per version, stream and quality")
+    test_wait_for_snapshot_blocks_until_new_version()
+    print("  ✓ Readers block until a new version is published")
+    print("=" * 60)
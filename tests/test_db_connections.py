@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""Test the SQLite writer connection and read-only WAL pool"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+from backend.db_connections import ConnectionManager
+
+
+def test_pragmas_and_read_only_pool(tmp_path):
+    connections = ConnectionManager(str(tmp_path / 'a.db'), pragmas={'synchronous': 'FULL', 'cache_size': -2000},
+                                    read_pool_size=2)
+    with connections.write() as conn:
+        conn.execute('CREATE TABLE t (x INTEGER)')
+        conn.execute('INSERT INTO t VALUES (1)')
+    with connections.read() as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 2   # FULL
+        assert conn.execute('PRAGMA cache_size').fetchone()[0] == -2000
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute('INSERT INTO t VALUES (2)')
+        first = conn
+    with connections.read() as conn:
+        assert conn is first, "Read connections are reused"
+    connections.close()
+
+
+def test_readers_do_not_wait_for_writer(tmp_path):
+    connections = ConnectionManager(str(tmp_path / 'a.db'))
+    with connections.write() as conn:
+        conn.execute('CREATE TABLE t (x INTEGER)')
+        conn.execute('INSERT INTO t VALUES (1)')
+
+    writing, release = threading.Event(), threading.Event()
+
+    def slow_write():
+        with connections.write() as conn:
+            conn.execute('INSERT INTO t VALUES (2)')
+            writing.set()
+            release.wait(5.0)
+
+    thread = threading.Thread(target=slow_write)
+    thread.start()
+    assert writing.wait(5.0)
+    with connections.read() as conn:
+        # Sees the last committed state while the write transaction is open
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 1
+    release.set()
+    thread.join()
+    with connections.read() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 2
+
+    with pytest.raises(ValueError):
+        with connections.write() as conn:
+            conn.execute('INSERT INTO t VALUES (3)')
+            raise ValueError
+    with connections.read() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 2, "Failed writes roll back"
+    connections.close()
+
+
+def test_writer_created_once_under_concurrency(tmp_path):
+    connections = ConnectionManager(str(tmp_path / 'a.db'), read_pool_size=8)
+    configure = connections._configure
+
+    def slow_configure(conn, read_only=False):
+        time.sleep(0.05)    # Widen the window between connect and assignment
+        return configure(conn, read_only)
+
+    connections._configure = slow_configure
+    start = threading.Barrier(8)
+    writers = []
+
+    def first_use(i):
+        start.wait()
+        if i % 2:
+            writers.append(connections.writer)
+        else:
+            with connections.read() as conn:   # Opening a reader creates the writer too
+                conn.execute('SELECT 1')
+            writers.append(connections.writer)
+
+    threads = [threading.Thread(target=first_use, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(writers) == 8 and all(writer is writers[0] for writer in writers), "Exactly one writer"
+    connections.close()
+
+
+
+def test_failed_reader_open_frees_its_slot(tmp_path):
+    connections = ConnectionManager(str(tmp_path / 'a.db'), read_pool_size=1)
+    open_reader = connections._open_reader
+
+    def failing_open_reader():
+        raise sqlite3.OperationalError('unable to open database file')
+
+    connections._open_reader = failing_open_reader
+    with pytest.raises(sqlite3.OperationalError):
+        with connections.read():
+            pass
+    assert connections._reader_count == 0
+    connections._open_reader = open_reader
+    with connections.read() as conn:    # Would wait forever on the empty pool if the slot leaked
+        assert conn.execute('SELECT 1').fetchone()[0] == 1
+    connections.close()
+
+
+if __name__ == '__main__':
+    import tempfile
+    from pathlib import Path
+    print("=" * 60)
+    print("DATABASE CONNECTIONS TEST")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        test_pragmas_and_read_only_pool(Path(tmp))
+        print("  ✓ Pragmas applied, read connections are read-only and reused")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_readers_do_not_wait_for_writer(Path(tmp))
+        print("  ✓ Readers never wait for an open write transaction")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_writer_created_once_under_concurrency(Path(tmp))
+        print("  ✓ Concurrent first use creates a single writer")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_failed_reader_open_frees_its_slot(Path(tmp))
+        print("  ✓ A reader that fails to open frees its pool slot")
+    print("=" * 60)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""Test compact detection_update payloads: histogram encodings, deltas and channel subscriptions"""
+
+import numpy as np
+from backend.detection_channels import DetectionChannels, diff_payload, encode_histogram
+
+
+class FakeSocketIO:
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data, namespace=None, to=None, skip_sid=None):
+        self.emitted.append((to, skip_sid, data))
+
+    def to(self, sid):
+        return [data for to, _, data in self.emitted if to == sid]
+
+
+def detection_data(frame, variance=120.0, glare=False):
+    histogram = np.zeros((256, 1), np.float32)
+    histogram[10] = 50000.0
+    histogram[200] = 26800.0
+    return {
+        'camera_id': 0,
+        'frame': frame,
+        'blur': {'detected': False, 'variance': variance, 'frame': frame},
+        'glare': {'detected': glare, 'dark_pct': 65.1, 'mid_pct': 34.9, 'bright_pct': 0.0,
+                  'histogram': histogram.ravel().tolist(), 'frame': 1},
+        'liveness': {'frozen': False, 'status': 'ACTIVE', 'frame': frame},
+    }
+
+
+def test_histogram_encodings():
+    histogram = np.arange(256, dtype=np.float32) * 1000.0   # Peak above uint16 range
+    counts = np.frombuffer(encode_histogram(histogram, 'uint16'), '<u2')
+    assert counts.shape == (256,) and counts.max() == 65535
+    assert abs(counts[128] / 65535 - 128 / 255) < 1e-3, "Relative heights are kept"
+
+    buckets = np.frombuffer(encode_histogram(np.ones(256), 'buckets26'), '<u2')
+    assert buckets.shape == (26,) and buckets.sum() == 256
+    assert len(encode_histogram(histogram, 'buckets26')) == 52
+
+
+def test_delta_carries_only_changed_fields():
+    previous = {'frame': 1, 'blur': {'detected': False, 'variance': 10.0}}
+    current = {'frame': 2, 'blur': {'detected': False, 'variance': 12.5}}
+    assert diff_payload(previous, current) == {'frame': 2, 'blur': {'variance': 12.5}}
+    assert diff_payload(current, current) == {}
+
+    removed = {'frame': 3, 'blur': {'variance': 12.5}}
+    assert diff_payload(current, removed) == {'frame': 3, 'blur': {'detected': None}}, "Deleted fields are null"
+    assert diff_payload(removed, {'frame': 4}) == {'frame': 4, 'blur': None}, "Deleted sections are null"
+
+
+def test_subscribed_clients_get_compact_deltas():
+    socketio = FakeSocketIO()
+    channels = DetectionChannels(socketio)
+    assert channels.subscribe('thin', camera_id=0, channels=['blur', 'liveness'], histogram_format='uint16')
+    assert channels.subscribe('glare', camera_id=0, channels=['glare', 'histogram'], histogram_format='buckets26')
+    assert not channels.subscribe('bad', channels=['unknown'])
+
+    channels.publish(detection_data(1))
+    channels.publish(detection_data(2, variance=130.0))
+
+    broadcast = [(skip, data) for to, skip, data in socketio.emitted if to is None]
+    assert sorted(broadcast[0][0]) == ['glare', 'thin'], "Subscribers are skipped by the full broadcast"
+
+    first, second = socketio.to('thin')
+    assert first['delta'] is False and 'glare' not in first, "Unsubscribed channels are never sent"
+    assert second == {'camera_id': 0, 'frame': 2, 'delta': True,
+                      'blur': {'variance': 130.0, 'frame': 2}, 'liveness': {'frame': 2}}
+
+    first, second = socketio.to('glare')
+    assert len(first['glare']['histogram']) == 52 and first['glare']['histogram_format'] == 'buckets26'
+    assert 'glare' not in second, "An unchanged glare section (and histogram) is not resent"
+
+    channels.unsubscribe('thin')
+    assert channels.stats()['subscribers'] == 1
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("DETECTION CHANNELS TEST")
+    print("=" * 60)
+    test_histogram_encodings()
+    print("  ✓ uint16 and 26-bucket histogram encodings")
+    test_delta_carries_only_changed_fields()
+    print("  ✓ Deltas carry only changed fields, and null for deleted ones")
+    test_subscribed_clients_get_compact_deltas()
+    print("  ✓ Subscribed clients get their channels as deltas")
+    print("=" * 60)
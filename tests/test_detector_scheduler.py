@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""Test detector cadence, budget deferral and freshness tags"""
+
+from backend.detector_scheduler import DetectorScheduler
+
+
+class FakeClock:
+    """Clock advanced by the stages themselves."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def stage(clock, cost_ms, value):
+    def compute():
+        clock.now += cost_ms / 1000.0
+        return value
+    return compute
+
+
+def test_cadence_reuses_last_result():
+    clock = FakeClock()
+    scheduler = DetectorScheduler(cadence={'blur': 2, 'glare': 5}, clock=clock)
+    computed = {'blur': [], 'glare': []}
+    for frame_id in range(1, 11):
+        scheduler.begin_frame(frame_id)
+        for name in computed:
+            _, computed_frame = scheduler.run(name, stage(clock, 0.1, frame_id))
+            computed[name].append(computed_frame)
+    assert computed['blur'] == [1, 1, 3, 3, 5, 5, 7, 7, 9, 9]
+    assert computed['glare'] == [1] * 5 + [6] * 5
+
+
+def test_over_budget_defers_lower_priority():
+    clock = FakeClock()
+    scheduler = DetectorScheduler(budget_ms={'motion': 20.0, 'blur': 4.0}, clock=clock)
+    results = []
+    for frame_id in range(1, 13):
+        scheduler.begin_frame(frame_id)
+        scheduler.run('motion', stage(clock, 80.0, 'flow'))  # motion overruns every frame
+        results.append(scheduler.run('blur', stage(clock, 1.0, frame_id)))
+    # First result is always computed, then blur is deferred until it is too stale
+    assert results[0] == (1, 1)
+    assert results[2] == (1, 1) and results[4] == (1, 1), "Due blur should be deferred while over budget"
+    assert scheduler.deferred_count['blur'] > 0
+    assert results[-1][1] > 1, "A deferred stage must still run once its result gets too old"
+
+
+def test_within_budget_runs_on_cadence():
+    clock = FakeClock()
+    scheduler = DetectorScheduler(cadence={'blur': 1}, clock=clock)
+    for frame_id in range(1, 6):
+        scheduler.begin_frame(frame_id)
+        scheduler.run('motion', stage(clock, 5.0, None))
+        assert scheduler.run('blur', stage(clock, 1.0, frame_id)) == (frame_id, frame_id)
+    assert scheduler.deferred_count['blur'] == 0
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("DETECTOR SCHEDULER TEST")
+    print("=" * 60)
+    test_cadence_reuses_last_result()
+    print("  ✓ Cadence reuses the last result")
+    test_over_budget_defers_lower_priority()
+    print("  ✓ Over-budget frames defer lower-priority stages")
+    test_within_budget_runs_on_cadence()
+    print("  ✓ Within budget every due stage runs")
+    print("=" * 60)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""Test the bounded, coalescing Socket.IO emit queue"""
+
+import threading
+import time
+
+from backend.emit_queue import EmitQueue
+
+
+class BlockingSocketIO:
+    """Records emits; blocks each send until released, like a slow network."""
+
+    def __init__(self):
+        self.emitted = []
+        self.release = threading.Event()
+
+    def emit(self, event, data, **kwargs):
+        self.release.wait(2.0)
+        self.emitted.append((event, data))
+
+
+def test_detection_updates_coalesce_to_newest():
+    socketio = BlockingSocketIO()
+    queue = EmitQueue(socketio)
+    queue.start()
+    queue.emit('alert', {'n': 0})               # Occupies the sender while the rest queue up
+    for n in range(1, 11):
+        queue.emit('detection_update', {'camera_id': 0, 'n': n}, coalesce_key=('detection_update', 0))
+        queue.emit('detection_update', {'camera_id': 1, 'n': n}, coalesce_key=('detection_update', 1))
+    queue.emit('alert_clear', {'n': 11})
+    assert queue.depth <= 4, "Each camera must have at most one pending detection_update"
+
+    socketio.release.set()
+    assert queue.wait_empty(2.0)
+    queue.stop()
+    updates = [data for event, data in socketio.emitted if event == 'detection_update']
+    assert sorted((u['camera_id'], u['n']) for u in updates) == [(0, 10), (1, 10)]
+    assert socketio.emitted[-1][0] == 'alert_clear', "Non-coalesced events keep their order"
+    stats = queue.stats()
+    assert stats['coalesced'] == 18 and stats['dropped'] == 0
+    assert stats['sent'] == 4 and stats['latency_ms'] >= 0.0
+
+
+def test_full_queue_drops_updates_never_alerts():
+    socketio = BlockingSocketIO()
+    queue = EmitQueue(socketio, maxsize=3)
+    for camera_id in range(3):                  # Never blocks, even before the sender runs
+        queue.emit('detection_update', {'camera_id': camera_id}, coalesce_key=('detection_update', camera_id))
+    queue.emit('alert', {'n': 0})               # Full: the oldest update makes room
+    queue.emit('alert_clear', {'n': 1})
+    queue.emit('alert', {'n': 2})
+    assert queue.depth == 3 and queue.dropped_count == 3
+    queue.emit('alert_clear', {'n': 3})         # No update left to drop: control events still queue
+    queue.emit('detection_update', {'camera_id': 0}, coalesce_key=('detection_update', 0))
+    assert queue.depth == 4 and queue.dropped_count == 4, "An update never displaces a control event"
+    socketio.release.set()
+    queue.start()
+    assert queue.wait_empty(2.0)
+    queue.stop()
+    assert [(event, data['n']) for event, data in socketio.emitted] == \
+        [('alert', 0), ('alert_clear', 1), ('alert', 2), ('alert_clear', 3)]
+
+
+def test_coalesced_latency_counts_from_first_update():
+    socketio = BlockingSocketIO()
+    socketio.release.set()
+    queue = EmitQueue(socketio)
+    queue.emit('detection_update', {'n': 0}, coalesce_key=('detection_update', 0))
+    time.sleep(0.1)
+    queue.emit('detection_update', {'n': 1}, coalesce_key=('detection_update', 0))  # Replaces n=0
+    queue.start()
+    assert queue.wait_empty(2.0)
+    queue.stop()
+    assert socketio.emitted == [('detection_update', {'n': 1})]
+    assert queue.stats()['max_latency_ms'] >= 100.0, "Latency includes the time the replaced update waited"
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("EMIT QUEUE TEST")
+    print("=" * 60)
+    test_detection_updates_coalesce_to_newest()
+    print("  ✓ detection_update coalesces to the newest per camera")
+    test_full_queue_drops_updates_never_alerts()
+    print("  ✓ A full queue drops detection updates, never alerts")
+    test_coalesced_latency_counts_from_first_update()
+    print("  ✓ Coalesced updates keep the first enqueue time for latency")
+    print("=" * 60)
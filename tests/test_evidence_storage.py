@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+"""Test glare image naming in evidence_storage"""
+
+import os
+
+import numpy as np
+
+from backend.evidence_storage import save_glare_image
+
+
+def test_glare_images_never_overwrite(tmp_path):
+    frame = np.zeros((8, 8, 3), np.uint8)
+    paths = [save_glare_image(frame, 40.0, 12.3456, camera_id, str(tmp_path)) for camera_id in (0, 1, 0, 0)]
+    assert [os.path.basename(path) for path in paths] == \
+        ['glare_cam0_12345.jpg', 'glare_cam1_12345.jpg', 'glare_cam0_12345_1.jpg', 'glare_cam0_12345_2.jpg']
+    assert all(os.path.getsize(path) > 0 for path in paths)
+
+
+if __name__ == '__main__':
+    import tempfile
+    from pathlib import Path
+    print("=" * 60)
+    print("EVIDENCE STORAGE TEST")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        test_glare_images_never_overwrite(Path(tmp))
+        print("  ✓ Glare images from the same millisecond get distinct files")
+    print("=" * 60)
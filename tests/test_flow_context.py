@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""Test that shake and reposition detection share one dense flow computation"""
+
+import numpy as np
+from backend import tamper_detector
+
+
+def make_frame_pair(dx=3, dy=0, seed=0, size=(240, 320)):
+    """Textured frame and a copy shifted by (dx, dy) pixels."""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 255, size, dtype=np.uint8)
+    base = np.kron(base[::4, ::4], np.ones((4, 4), dtype=np.uint8))  # blocky texture flow can track
+    shifted = np.roll(np.roll(base, dy, axis=0), dx, axis=1)
+    return shifted, base
+
+
+def test_flow_computed_once():
+    gray, prev_gray = make_frame_pair()
+    context = tamper_detector.FlowContext(gray, prev_gray)
+    tamper_detector.check_shake(gray, prev_gray, flow_context=context)
+    flow = context.flow
+    tamper_detector.detect_camera_reposition(gray, prev_gray, flow_context=context)
+    assert context.flow is flow, "Flow field should be reused, not recomputed"
+
+
+def test_shared_flow_matches_standalone():
+    gray, prev_gray = make_frame_pair(dx=4)
+    _, shake_standalone = tamper_detector.check_shake(gray, prev_gray)
+
+    context = tamper_detector.FlowContext(gray, prev_gray)
+    _, shake_shared = tamper_detector.check_shake(gray, prev_gray, flow_context=context)
+    assert abs(shake_standalone - shake_shared) < 1e-6
+
+    _, shift_magnitude, shift_x, shift_y = tamper_detector.detect_camera_reposition(
+        gray, prev_gray, flow_context=context
+    )
+    assert shift_x > 2.0, f"Expected rightward shift, got {shift_x}"
+    assert abs(shift_y) < 1.0
+
+
+def test_pyramid_reports_full_resolution_pixels():
+    gray, prev_gray = make_frame_pair(dx=6, size=(480, 640))
+    pyramid = tamper_detector.FramePyramid(gray, analysis_max_width=320)
+    prev_pyramid = tamper_detector.FramePyramid(prev_gray, analysis_max_width=320)
+    assert pyramid.analysis_level == 1
+    assert pyramid.level_for('blur') == 0
+
+    context = tamper_detector.FlowContext.from_pyramids(pyramid, prev_pyramid)
+    assert context.gray_frame.shape == (240, 320)
+    _, _, shift_x, _ = tamper_detector.detect_camera_reposition(
+        context.gray_frame, context.prev_gray_frame, flow_context=context
+    )
+    assert 4.5 < shift_x < 7.5, f"Expected ~6px full-resolution shift, got {shift_x}"
+
+
+def test_phase_engine_recovers_translation():
+    gray, prev_gray = make_frame_pair(dx=7, dy=3, size=(480, 640))
+    context = tamper_detector.create_motion_context(
+        tamper_detector.FramePyramid(gray), tamper_detector.FramePyramid(prev_gray), 'phase'
+    )
+    assert isinstance(context, tamper_detector.PhaseCorrelationContext)
+    _, shift_magnitude, shift_x, shift_y = tamper_detector.detect_camera_reposition(
+        gray, prev_gray, flow_context=context
+    )
+    assert abs(shift_x - 7) < 1.0 and abs(shift_y - 3) < 1.0, f"Expected (7, 3), got ({shift_x}, {shift_y})"
+    is_shaken, shake_magnitude = tamper_detector.check_shake(gray, prev_gray, flow_context=context)
+    assert is_shaken and abs(shake_magnitude - shift_magnitude) < 1e-6
+
+
+def test_phase_engine_ignores_flat_frames():
+    blank = np.zeros((480, 640), np.uint8)
+    context = tamper_detector.create_motion_context(
+        tamper_detector.FramePyramid(blank), tamper_detector.FramePyramid(blank), 'phase'
+    )
+    assert context.global_shift() == (0.0, 0.0, 0.0)
+
+
+def test_dis_engine_with_warm_start():
+    gray, prev_gray = make_frame_pair(dx=5)
+    flow_state = tamper_detector.FlowState(warm_start=True)
+    buffers = []
+    for engine in ('dis_ultrafast', 'dis_fast', 'farneback'):
+        for _ in range(2):
+            context = tamper_detector.FlowContext(gray, prev_gray, engine=engine, flow_state=flow_state)
+            _, _, shift_x, shift_y = tamper_detector.detect_camera_reposition(
+                gray, prev_gray, flow_context=context
+            )
+            assert abs(shift_x - 5) < 0.5 and abs(shift_y) < 0.5, f"{engine}: got ({shift_x}, {shift_y})"
+            buffers.append(context.flow)
+    assert not tamper_detector.FlowContext(gray, prev_gray).warm_started
+    assert context.warm_started, "Later frames should start from the previous flow"
+    assert len({id(buffer) for buffer in buffers}) == 2, "Flow should reuse the two persistent buffers"
+
+
+def test_motion_gate_skips_static_frames():
+    gray, prev_gray = make_frame_pair(dx=0, size=(480, 640))
+    noise = np.random.default_rng(1).normal(0, 2, gray.shape)
+    noisy = np.clip(gray + noise, 0, 255).astype(np.uint8)
+    pyramid, prev_pyramid = tamper_detector.FramePyramid(noisy), tamper_detector.FramePyramid(prev_gray)
+    tracker = tamper_detector.RepositionTracker()
+    context = tamper_detector.create_motion_context(
+        pyramid, prev_pyramid, gate_threshold=tamper_detector.MOTION_GATE_THRESHOLD
+    )
+    assert isinstance(context, tamper_detector.StaticMotionContext)
+    assert tamper_detector.check_shake(noisy, prev_gray, flow_context=context) == (False, 0.0)
+    tamper_detector.detect_camera_reposition(noisy, prev_gray, flow_context=context, tracker=tracker)
+    assert len(tracker) == 1, "Gated frames must still advance the tracker history"
+
+    moved, prev_gray = make_frame_pair(dx=2, size=(480, 640))
+    context = tamper_detector.create_motion_context(
+        tamper_detector.FramePyramid(moved), tamper_detector.FramePyramid(prev_gray),
+        gate_threshold=tamper_detector.MOTION_GATE_THRESHOLD
+    )
+    assert isinstance(context, tamper_detector.FlowContext), "A 2px shift must pass the gate"
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("FLOW CONTEXT TEST")
+    print("=" * 60)
+    test_flow_computed_once()
+    print("  ✓ Flow computed once per frame pair")
+    test_shared_flow_matches_standalone()
+    print("  ✓ Shared flow matches standalone detectors")
+    test_pyramid_reports_full_resolution_pixels()
+    print("  ✓ Downscaled flow reported in full-resolution pixels")
+    test_phase_engine_recovers_translation()
+    print("  ✓ Phase correlation engine recovers a global translation")
+    test_phase_engine_ignores_flat_frames()
+    print("  ✓ Phase correlation engine ignores flat frames")
+    test_dis_engine_with_warm_start()
+    print("  ✓ DIS and warm-started flow reuse persistent buffers")
+    test_motion_gate_skips_static_frames()
+    print("  ✓ Motion gate skips static frames and keeps tracker history")
+    print("=" * 60)
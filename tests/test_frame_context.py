@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""Test that FrameContext computes each derived buffer once and matches the direct computations"""
+
+import cv2
+import numpy as np
+from backend import tamper_detector
+from backend.frame_sources import SyntheticSource
+from backend.glare_rescue import clahe_rescue, get_image_viability_stats
+
+
+def glare_frame():
+    source = SyntheticSource(events=[('glare', 0, 1)], seed=5)
+    assert source.open()
+    return source.read()[1]
+
+
+def test_buffers_are_memoized():
+    context = tamper_detector.FrameContext(glare_frame())
+    assert context.gray is context.gray
+    assert context.pyramid is context.pyramid
+    assert context.hist256 is context.hist256
+    assert context.hist26 is context.hist26
+    assert context.lab is context.lab
+
+
+def test_derived_buffers_match_direct_computation():
+    frame = glare_frame()
+    context = tamper_detector.FrameContext(frame)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    assert np.array_equal(context.gray, gray)
+    assert abs(context.mean - np.mean(gray)) < 1e-6
+    expected26 = cv2.calcHist([context.hist_gray], [0], None, [26], [0, 256]).ravel()
+    assert np.array_equal(context.hist26, expected26)
+
+
+def test_small_highlights_keep_bright_pct():
+    # Dark scene with 2x2 saturated specular dots on a 6 px grid (~11% of pixels)
+    frame = np.full((480, 640, 3), 20, np.uint8)
+    for y in range(0, 480, 6):
+        for x in range(0, 640, 6):
+            frame[y:y + 2, x:x + 2] = 255
+    context = tamper_detector.FrameContext(frame, analysis_max_width=160)
+    full = get_image_viability_stats(frame)
+    shared = get_image_viability_stats(frame, frame_context=context)
+    assert full[3] > 10.0
+    assert abs(shared[3] - full[3]) < 0.5, "Subsampling must not blur highlights away"
+    assert shared[0] == full[0]
+
+
+def test_detectors_accept_context():
+    frame = glare_frame()
+    context = tamper_detector.FrameContext(frame)
+
+    direct = get_image_viability_stats(frame, dark_thresh=50, bright_thresh=252, gray=context.hist_gray)
+    shared = get_image_viability_stats(frame, dark_thresh=50, bright_thresh=252, frame_context=context)
+    assert direct[:4] == shared[:4]
+    assert shared[4] is context.hist256
+
+    is_glare, percentage, histogram = tamper_detector.check_glare(frame, frame_context=context)
+    _, direct_percentage, _ = tamper_detector.check_glare(frame)
+    assert abs(percentage - direct_percentage) < 1.0 and len(histogram) == 26
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    assert tamper_detector.check_blur(None, frame_context=context) == tamper_detector.check_blur(gray)
+
+    clahe = cv2.createCLAHE(clipLimit=16.0, tileGridSize=(4, 4))
+    assert np.array_equal(clahe_rescue(frame, clahe, frame_context=context), clahe_rescue(frame, clahe))
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("FRAME CONTEXT TEST")
+    print("=" * 60)
+    test_buffers_are_memoized()
+    print("  ✓ Derived buffers are computed once")
+    test_derived_buffers_match_direct_computation()
+    print("  ✓ Derived buffers match direct computation")
+    test_small_highlights_keep_bright_pct()
+    print("  ✓ Small specular highlights keep their bright_pct")
+    test_detectors_accept_context()
+    print("  ✓ Detectors and rescue accept the shared context")
+    print("=" * 60)
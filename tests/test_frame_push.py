@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""Test binary frame push and its per-client backpressure"""
+
+import threading
+import time
+
+import numpy as np
+from backend.frame_push import FramePusher, PUSH_IDLE_TIMEOUT
+from backend.pipeline_supervisor import CameraFeed
+
+
+class FakeSocketIO:
+    """Records emitted frames and keeps their ack callbacks."""
+
+    def __init__(self):
+        self.frames = []
+        self.lock = threading.Lock()
+
+    def emit(self, event, data, to=None, callback=None):
+        with self.lock:
+            self.frames.append((event, data, to, callback))
+
+    def sent(self, sid, stream):
+        with self.lock:
+            return [(data, callback) for event, data, to, callback in self.frames
+                    if to == sid and data['stream'] == stream]
+
+
+def frame(value):
+    return np.full((48, 64, 3), value, np.uint8)
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_slow_client_drops_frames_until_ack():
+    feed = CameraFeed(0, 'synthetic')
+    socketio = FakeSocketIO()
+    pusher = FramePusher(socketio, {0: feed}.get, max_fps=1000.0)
+    assert pusher.subscribe('slow', 0, ['raw'])
+    assert wait_until(lambda: len(socketio.sent('slow', 'raw')) == 1)
+
+    for value in range(1, 6):
+        feed.publish(frame(value), frame(value), {})
+        time.sleep(0.02)
+    assert len(socketio.sent('slow', 'raw')) == 1, "Nothing more is sent while the frame is unacknowledged"
+    newest = feed.snapshot.version
+
+    data, ack = socketio.sent('slow', 'raw')[0]
+    assert data['jpeg'][:2] == b'\xff\xd8' and data['camera_id'] == 0
+    ack()   # The camera has gone quiet: the ack itself sends the newest frame
+    assert len(socketio.sent('slow', 'raw')) == 2
+    assert socketio.sent('slow', 'raw')[1][0]['version'] == newest, "Next push is the newest frame"
+    assert pusher.stats(0)['dropped'] == 4, "The frames in between were skipped"
+
+    socketio.sent('slow', 'raw')[1][1]()
+    time.sleep(PUSH_IDLE_TIMEOUT + 0.2)
+    assert len(socketio.sent('slow', 'raw')) == 2, "A frame the client already has is not sent again"
+    pusher.unsubscribe('slow')
+
+
+def test_clients_share_one_encoding():
+    feed = CameraFeed(0, 'synthetic')
+    socketio = FakeSocketIO()
+    pusher = FramePusher(socketio, {0: feed}.get, max_fps=1000.0)
+    feed.publish(frame(50), frame(60), {})
+    for sid in ('a', 'b'):
+        pusher.subscribe(sid, 0, ['raw', 'processed'])
+    assert wait_until(lambda: all(socketio.sent(sid, stream) for sid in 'ab' for stream in ('raw', 'processed')))
+    assert socketio.sent('a', 'raw')[-1][0]['jpeg'] is socketio.sent('b', 'raw')[-1][0]['jpeg']
+    assert not pusher.subscribe('c', 1, ['raw']), "Unknown camera"
+    assert not pusher.subscribe('c', 0, ['depth']), "Unknown stream"
+    for sid in ('a', 'b'):
+        pusher.unsubscribe(sid)
+    assert pusher.stats()['subscribers'] == 0
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("FRAME PUSH TEST")
+    print("=" * 60)
+    test_slow_client_drops_frames_until_ack()
+    print("  ✓ Slow clients drop frames instead of queueing, and get the newest on ack")
+    test_clients_share_one_encoding()
+    print("  ✓ Clients share one JPEG encoding per version")
+    print("=" * 60)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""Test the headless frame sources (synthetic generator, image directory, video file)"""
+
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from backend import tamper_detector
+from backend.frame_sources import (
+    SyntheticSource, ImageDirectorySource, VideoFileSource, CaptureThread,
+    create_frame_source, parse_synthetic_events
+)
+from backend.glare_rescue import get_image_viability_stats
+
+
+def read_frames(source, count):
+    frames = []
+    for _ in range(count):
+        ret, frame = source.read()
+        assert ret, f"{source.name} ended early"
+        frames.append(frame)
+    return frames
+
+
+def test_synthetic_is_reproducible():
+    first = SyntheticSource(seed=7, num_frames=5)
+    second = SyntheticSource(seed=7, num_frames=5)
+    assert first.open() and second.open()
+    for a, b in zip(read_frames(first, 5), read_frames(second, 5)):
+        assert np.array_equal(a, b)
+    ret, _ = first.read()
+    assert not ret, "num_frames should end the stream"
+
+
+def test_synthetic_effects_trigger_detectors():
+    source = create_frame_source('synthetic:blur@1-2,glare@2-3,blackout@3-4,freeze@4-5')
+    assert source.open()
+    normal, blurred, glare, blackout, frozen = read_frames(source, 5)
+
+    _, sharp_variance = tamper_detector.check_blur(cv2.cvtColor(normal, cv2.COLOR_BGR2GRAY))
+    is_blurred, blur_variance = tamper_detector.check_blur(cv2.cvtColor(blurred, cv2.COLOR_BGR2GRAY), threshold=25.0)
+    assert is_blurred and blur_variance < sharp_variance
+
+    is_glare = get_image_viability_stats(glare, dark_thresh=50, bright_thresh=252)[0]
+    assert is_glare, "Synthetic glare should trip the loss-of-detail metric"
+
+    assert cv2.cvtColor(blackout, cv2.COLOR_BGR2GRAY).mean() < 25.0
+    assert np.array_equal(frozen, blackout), "Freeze should repeat the previous frame"
+
+
+def test_synthetic_shake_moves_view():
+    source = SyntheticSource(events=[('shake', 1, 10)], seed=3)
+    assert source.open()
+    frames = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in read_frames(source, 4)]
+    magnitudes = [tamper_detector.check_shake(b, a)[1] for a, b in zip(frames, frames[1:])]
+    assert max(magnitudes) > 2.0, f"Shake should produce large flow, got {magnitudes}"
+
+
+def test_image_directory_and_video_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(3):
+            cv2.imwrite(os.path.join(tmp, f"frame_{i:03d}.png"), np.full((48, 64, 3), i * 50, np.uint8))
+
+        images = ImageDirectorySource(tmp, loop=False)
+        assert images.open()
+        values = [int(f[0, 0, 0]) for f in read_frames(images, 3)]
+        assert values == [0, 50, 100]
+        assert not images.read()[0]
+
+        video_path = os.path.join(tmp, 'clip.avi')
+        writer = cv2.VideoWriter(video_path, cv2.VideoWriter.fourcc(*'MJPG'), 30, (64, 48))
+        for i in range(3):
+            writer.write(np.full((48, 64, 3), i * 50, np.uint8))
+        writer.release()
+
+        looped = VideoFileSource(video_path, loop=True, realtime=False)
+        assert looped.open()
+        assert len(read_frames(looped, 7)) == 7
+        looped.release()
+
+        once = create_frame_source({'type': 'file', 'path': video_path, 'loop': False, 'realtime': False})
+        assert once.open()
+        read_frames(once, 3)
+        assert not once.read()[0]
+        once.release()
+
+
+def test_parse_events():
+    assert parse_synthetic_events('blur@30-60, glare@90-120') == [('blur', 30, 60), ('glare', 90, 120)]
+
+
+def test_capture_thread_lossless_for_unpaced_sources():
+    source = SyntheticSource(num_frames=20, seed=2)
+    assert source.open() and not source.is_live
+    reference = SyntheticSource(num_frames=20, seed=2)
+    assert reference.open()
+
+    capture = CaptureThread(source)
+    capture.start()
+    frame_ids = []
+    while True:
+        captured = capture.read_latest(timeout=2.0)
+        if captured is None:
+            break
+        frame_id, frame, _, _ = captured
+        frame_ids.append(frame_id)
+        assert np.array_equal(frame, reference.read()[1])
+    capture.stop()
+    assert capture.ended and frame_ids == list(range(1, 21)) and capture.dropped_count == 0
+
+
+def test_capture_thread_drops_for_slow_reader():
+    source = SyntheticSource(width=160, height=120, num_frames=60, seed=2, fps=200)
+    assert source.open() and source.is_live
+
+    capture = CaptureThread(source)
+    capture.start()
+    frame_ids, buffers = [], set()
+    while True:
+        captured = capture.read_latest(timeout=2.0)
+        if captured is None:
+            break
+        frame_ids.append(captured[0])
+        buffers.add(id(captured[1]))
+        time.sleep(0.03)  # analysis slower than capture
+    capture.stop()
+    assert frame_ids == sorted(frame_ids) and frame_ids[-1] == 60, "Reader should always get the newest frame"
+    assert capture.dropped_count == 60 - len(frame_ids) > 0
+    assert len(buffers) <= capture.slots, "Frames are copied into the preallocated ring"
+
+
+def test_capture_thread_decodes_video_into_ring():
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = os.path.join(tmp, 'clip.avi')
+        writer = cv2.VideoWriter(video_path, cv2.VideoWriter.fourcc(*'MJPG'), 30, (64, 48))
+        for i in range(6):
+            writer.write(np.full((48, 64, 3), i * 40, np.uint8))
+        writer.release()
+
+        source = VideoFileSource(video_path, loop=False, realtime=False)
+        assert source.open()
+        outs = []
+        read = source.read
+        source.read = lambda out=None: (outs.append(out), read(out))[1]
+        capture = CaptureThread(source)
+        capture.start()
+        values = []
+        while True:
+            captured = capture.read_latest(timeout=2.0)
+            if captured is None:
+                break
+            values.append(int(captured[1][0, 0, 0]))
+        capture.stop()
+        source.release()
+
+    assert len(values) == 6 and values == sorted(values)
+    assert outs[0] is None and all(out is not None for out in outs[1:]), \
+        "After the first frame VideoCapture decodes straight into a ring slot"
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("FRAME SOURCE TEST")
+    print("=" * 60)
+    test_synthetic_is_reproducible()
+    print("  ✓ Synthetic stream is reproducible")
+    test_synthetic_effects_trigger_detectors()
+    print("  ✓ Synthetic blur/glare/blackout/freeze trip their detectors")
+    test_synthetic_shake_moves_view()
+    print("  ✓ Synthetic shake moves the view")
+    test_image_directory_and_video_file()
+    print("  ✓ Image directory and video file sources")
+    test_parse_events()
+    print("  ✓ Event schedule parsing")
+    test_capture_thread_lossless_for_unpaced_sources()
+    print("  ✓ Capture thread is lossless for unpaced sources")
+    test_capture_thread_drops_for_slow_reader()
+    print("  ✓ Capture thread skips to the newest frame for live sources")
+    test_capture_thread_decodes_video_into_ring()
+    print("  ✓ Capture thread decodes video frames straight into the ring")
+    print("=" * 60)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+"""Test write-behind incident grouping in AegisDatabase"""
+
+import sqlite3
+from contextlib import contextmanager
+
+from backend.database import AegisDatabase, INCIDENT_GROUP_TIMEOUT
+
+
+def incident_rows(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute('SELECT id, incident_type, primary_detection, count, timestamp FROM incidents ORDER BY id').fetchall()
+    conn.close()
+    return rows
+
+
+def test_grouping_is_written_behind(tmp_path):
+    path = str(tmp_path / 'aegis.db')
+    db = AegisDatabase(path)
+    db.incidents.flush_interval = 60.0  # Only explicit flushes and incident closes write
+
+    first = db.record_detection('glare', 100.0, 'glare')
+    assert db.record_detection('blur', 101.0, 'blur') == first, "Physical tamper types share an incident"
+    liveness = db.record_detection('freeze', 101.5, 'freeze')
+    assert liveness != first
+    for t in range(102, 110):
+        assert db.record_detection('glare', float(t), 'glare') == first
+    assert incident_rows(path) == [], "Nothing is written on the detection path"
+
+    db.add_glare_image('/tmp/glare.jpg', 40.0, 109.0, first)  # Id usable before the row exists
+    assert db.flush() == 2
+    assert incident_rows(path) == [(first, 'PHYSICAL_TAMPER', 'glare', 10, 109.0),
+                                   (liveness, 'LIVENESS_THREAT', 'freeze', 1, 101.5)]
+    assert db.flush() == 0, "Clean incidents are not rewritten"
+
+    second = db.record_detection('shake', 109.0 + INCIDENT_GROUP_TIMEOUT + 1, 'shake')
+    assert second > liveness
+    incident = db.get_recent_incidents(limit=1)[0]
+    assert incident['incident']['id'] == second, "Reads see pending incidents"
+    assert db.get_incident_by_id(first)['glare_images'][0]['file_path'] == '/tmp/glare.jpg'
+
+
+def test_failed_flush_is_retried(tmp_path):
+    path = str(tmp_path / 'aegis.db')
+    db = AegisDatabase(path, pragmas={'busy_timeout': 50})
+    db.incidents.flush_interval = 60.0
+    incident_id = db.record_detection('glare', 300.0, 'glare')
+    liveness = db.record_detection('freeze', 301.0, 'freeze')
+
+    locker = sqlite3.connect(path)
+    locker.execute('BEGIN IMMEDIATE')   # Another writer holds the lock: "database is locked"
+    try:
+        db.flush()
+        assert False, "The locked write raises"
+    except sqlite3.OperationalError:
+        pass
+    locker.rollback()
+    locker.close()
+
+    assert len(db.incidents.pending()) == 2, "Failed rows stay pending"
+    assert db.flush() == 2
+    assert incident_rows(path) == [(incident_id, 'PHYSICAL_TAMPER', 'glare', 1, 300.0),
+                                   (liveness, 'LIVENESS_THREAT', 'freeze', 1, 301.0)]
+
+
+def test_changes_during_flush_stay_pending(tmp_path):
+    path = str(tmp_path / 'aegis.db')
+    db = AegisDatabase(path)
+    db.incidents.flush_interval = 60.0
+    incident_id = db.record_detection('glare', 400.0, 'glare')
+    write = db.connections.write
+    seen = []
+
+    @contextmanager
+    def write_with_detection():
+        seen.append(len(db.incidents.pending()))   # Still visible while the write is in progress
+        db.record_detection('blur', 401.0, 'blur')  # Extends the incident being written
+        with write() as conn:
+            yield conn
+
+    db.connections.write = write_with_detection
+    assert db.flush() == 1
+    db.connections.write = write
+    assert seen == [1]
+    assert incident_rows(path)[0][3] == 1 and db.incidents.pending()[0]['count'] == 2
+    assert db.flush() == 1
+    assert incident_rows(path) == [(incident_id, 'PHYSICAL_TAMPER', 'glare', 2, 401.0)]
+
+
+def test_restart_continues_open_incident(tmp_path):
+    path = str(tmp_path / 'aegis.db')
+    db = AegisDatabase(path)
+    incident_id = db.record_detection('blur', 200.0, 'blur')
+    db.flush()
+
+    restarted = AegisDatabase(path)
+    assert restarted.record_detection('shake', 202.0, 'shake') == incident_id
+    assert restarted.record_detection('freeze', 202.0, 'freeze') == incident_id + 1
+    restarted.flush()
+    assert incident_rows(path)[0][3] == 2
+
+
+def test_cameras_group_separately(tmp_path):
+    path = str(tmp_path / 'aegis.db')
+    conn = sqlite3.connect(path)  # A database from before incidents had a camera_id
+    conn.execute('''
+        CREATE TABLE incidents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, incident_type TEXT NOT NULL, primary_detection TEXT NOT NULL,
+            timestamp REAL NOT NULL, count INTEGER DEFAULT 1, description TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO incidents (incident_type, primary_detection, timestamp) VALUES ('PHYSICAL_TAMPER', 'blur', 90.0)
+    ''')
+    conn.commit()
+    conn.close()
+
+    db = AegisDatabase(path)
+    legacy = db.record_detection('blur', 92.0, 'blur')
+    first = db.record_detection('glare', 100.0, 'glare', camera_id=0)
+    second = db.record_detection('glare', 100.5, 'glare', camera_id=1)
+    assert legacy == 1 and len({legacy, first, second}) == 3, "Each camera has its own open incident"
+    assert db.record_detection('blur', 101.0, 'blur', camera_id=1) == second
+    db.flush()
+
+    restarted = AegisDatabase(path)
+    assert restarted.record_detection('shake', 102.0, 'shake', camera_id=0) == first
+    restarted.flush()
+    conn = sqlite3.connect(path)
+    rows = conn.execute('SELECT id, camera_id, count FROM incidents ORDER BY id').fetchall()
+    conn.close()
+    assert rows == [(legacy, None, 2), (first, 0, 2), (second, 1, 2)]
+
+
+if __name__ == '__main__':
+    import tempfile
+    from pathlib import Path
+    print("=" * 60)
+    print("INCIDENT AGGREGATOR TEST")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        test_grouping_is_written_behind(Path(tmp))
+        print("  ✓ Detections are grouped in memory and flushed in batches")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_failed_flush_is_retried(Path(tmp))
+        print("  ✓ A failed flush keeps its incidents for the next one")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_changes_during_flush_stay_pending(Path(tmp))
+        print("  ✓ Changes made during a flush stay pending for the next one")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_restart_continues_open_incident(Path(tmp))
+        print("  ✓ A restart continues the latest open incident")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_cameras_group_separately(Path(tmp))
+        print("  ✓ Each camera groups its own incidents, also after migrating an old database")
+    print("=" * 60)
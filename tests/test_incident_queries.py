@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""Test set-based incident hydration and the recent-incidents cache"""
+
+import sqlite3
+
+from backend.database import (AegisDatabase, INCIDENT_GROUP_TIMEOUT, find_nearest_incident,
+                              encode_incident_cursor, decode_incident_cursor)
+
+
+def traced_database(path):
+    """Database with one read connection whose SELECT statements are recorded."""
+    db = AegisDatabase(path, read_pool_size=1)
+    statements = []
+    with db.connections.read() as conn:
+        conn.set_trace_callback(lambda sql: statements.append(sql) if 'SELECT' in sql else None)
+    return db, statements
+
+
+def populate(db, incidents):
+    for n in range(incidents):
+        t = 1000.0 + n * (INCIDENT_GROUP_TIMEOUT + 1)
+        incident_id = db.record_detection('glare', t, 'glare')
+        db.add_audio_log(f'speech {n}', t + 0.5, incident_id)
+        db.add_glare_image(f'glare_{n}.jpg', 40.0, t, incident_id)
+    db.flush()
+
+
+def test_hydration_uses_fixed_query_count(tmp_path):
+    db, statements = traced_database(str(tmp_path / 'aegis.db'))
+    populate(db, 5)
+    for limit in (1, 5):
+        statements.clear()
+        db.data_changed()
+        incidents = db.get_recent_incidents(limit=limit)
+        assert len(incidents) == limit
+        assert len(statements) == 4, "One incidents query plus one per child table"
+
+    newest = incidents[0]
+    assert newest['audio_logs'] == [{'text': 'speech 4', 'timestamp': newest['incident']['timestamp'] + 0.5}]
+    assert newest['glare_images'][0]['file_path'] == 'glare_4.jpg'
+    assert db.get_incident_by_id(newest['incident']['id']) == newest
+
+
+def test_recent_incidents_cached_until_write(tmp_path):
+    db, statements = traced_database(str(tmp_path / 'aegis.db'))
+    populate(db, 3)
+    first = db.get_recent_incidents(limit=5)
+    statements.clear()
+    assert db.get_recent_incidents(limit=5) == first
+    assert statements == [], "Repeated polls cost no SQL"
+
+    db.add_audio_log('late speech', 2000.0, first[0]['incident']['id'])
+    updated = db.get_recent_incidents(limit=5)
+    assert len(statements) == 4
+    assert [log['text'] for log in updated[0]['audio_logs']][-1] == 'late speech'
+
+    db.record_detection('blur', first[0]['incident']['timestamp'] + 1.0, 'blur')
+    assert db.get_recent_incidents(limit=5)[0]['incident']['count'] == 2, "Pending incident changes invalidate too"
+    assert db.recent_cache_hits == 1
+
+    cached = db.get_recent_incidents(limit=6)
+    assert db.get_recent_incidents(limit=2) == cached[:2] and db.recent_cache_hits == 3, "Small limits share one entry"
+    assert len(db.get_recent_incidents(limit=50)) == 3 and db.recent_cache_hits == 3, "Large limits are streamed"
+
+
+def test_nearest_incident_probes(tmp_path):
+    path = str(tmp_path / 'aegis.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE incidents (id INTEGER PRIMARY KEY AUTOINCREMENT, incident_type TEXT NOT NULL, '
+                 'primary_detection TEXT NOT NULL, timestamp REAL NOT NULL, count INTEGER DEFAULT 1, '
+                 'description TEXT, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)')
+    conn.execute('CREATE INDEX idx_incidents_type ON incidents(incident_type)')  # Pre-migration schema
+    conn.commit()
+    conn.close()
+
+    db = AegisDatabase(path)
+    with db.connections.write() as conn:
+        conn.executemany('INSERT INTO incidents (id, incident_type, primary_detection, timestamp) VALUES (?, ?, ?, ?)',
+                         [(1, 'PHYSICAL_TAMPER', 'blur', 100.0), (2, 'LIVENESS_THREAT', 'freeze', 105.0),
+                          (3, 'PHYSICAL_TAMPER', 'glare', 200.0)])
+    with db.connections.read() as conn:
+        cursor = conn.cursor()
+        indexes = {row[1] for row in cursor.execute("SELECT * FROM sqlite_master WHERE type = 'index'")}
+        assert 'idx_incidents_type_timestamp' in indexes and 'idx_incidents_type' not in indexes
+        assert cursor.execute('PRAGMA user_version').fetchone()[0] >= 1
+
+        assert find_nearest_incident(cursor, 104.0) == 2
+        assert find_nearest_incident(cursor, 104.0, 'PHYSICAL_TAMPER') == 1
+        assert find_nearest_incident(cursor, 160.0, 'PHYSICAL_TAMPER') == 3
+        assert find_nearest_incident(cursor, 50.0, 'LIVENESS_THREAT') == 2
+        assert find_nearest_incident(cursor, 50.0, 'UNKNOWN') is None
+        plan = ' '.join(row[-1] for row in cursor.execute(
+            'EXPLAIN QUERY PLAN SELECT id, timestamp FROM incidents WHERE incident_type = ? AND timestamp <= ? '
+            'ORDER BY timestamp DESC LIMIT 1', ('PHYSICAL_TAMPER', 150.0)))
+        assert 'idx_incidents_type_timestamp' in plan and 'TEMP B-TREE' not in plan
+
+    db.add_glare_image('glare.jpg', 40.0, 190.0)  # No incident id: attached to the nearest physical tamper
+    assert db.get_incident_by_id(3)['glare_images'][0]['file_path'] == 'glare.jpg'
+
+
+def test_incident_pages_keyset(tmp_path):
+    db = AegisDatabase(str(tmp_path / 'aegis.db'))
+    for n in range(25):
+        t = 1000.0 + n * (INCIDENT_GROUP_TIMEOUT + 1)
+        db.record_detection('glare' if n % 2 else 'freeze', t, None)
+    db.flush()
+    open_id = db.record_detection('freeze', 1000.0 + 24 * (INCIDENT_GROUP_TIMEOUT + 1) + 1.0, None)  # Pending only
+
+    everything = [i['incident'] for i in db.iter_incidents(limit=1000)]
+    assert len(everything) == 25 and everything[0]['id'] == open_id and everything[0]['count'] == 2
+    keys = [(i['timestamp'], i['id']) for i in everything]
+    assert keys == sorted(keys, reverse=True)
+
+    # Pages of 4, read in chunks of 3, continue exactly where the previous page stopped
+    pages, after = [], None
+    while True:
+        page = [i['incident'] for i in db.iter_incidents(after=after, limit=4, chunk_size=3)]
+        if not page:
+            break
+        pages += page
+        after = decode_incident_cursor(encode_incident_cursor(page[-1]['timestamp'], page[-1]['id']))
+    assert pages == everything
+
+    glare = [i['incident'] for i in db.iter_incidents(detection='glare', since=1030.0, until=1100.0)]
+    assert glare and all(i['primary_detection'] == 'glare' and 1030.0 <= i['timestamp'] < 1100.0 for i in glare)
+    assert len([i for i in db.iter_incidents(incident_type='LIVENESS_THREAT')]) == 13
+
+    with db.connections.read() as conn:
+        for column in ('incident_type', 'primary_detection'):
+            plan = ' '.join(row[-1] for row in conn.execute(
+                f'EXPLAIN QUERY PLAN SELECT * FROM incidents WHERE {column} = ? AND timestamp >= ? '
+                'AND (timestamp, id) < (?, ?) ORDER BY timestamp DESC, id DESC LIMIT 10', ('x', 0, 1, 1)))
+            assert 'USING INDEX' in plan and 'TEMP B-TREE' not in plan
+
+    try:
+        decode_incident_cursor('not a cursor')
+        assert False, "Malformed cursors are rejected"
+    except ValueError:
+        pass
+
+
+def test_recent_page_continues_with_cursor(tmp_path):
+    db = AegisDatabase(str(tmp_path / 'aegis.db'))
+    for n in range(3):
+        t = 1000.0 + n * (INCIDENT_GROUP_TIMEOUT + 1)
+        db.record_detection('glare', t, None)
+        db.record_detection('freeze', t, None)  # Same timestamp, separate incident
+    db.flush()
+    db.record_detection('blur', 1000.0 + 2 * (INCIDENT_GROUP_TIMEOUT + 1), None)  # Pending, still tied
+
+    everything = [i['incident']['id'] for i in db.iter_incidents()]
+    recent = [i['incident'] for i in db.get_recent_incidents(limit=3)]
+    assert [i['id'] for i in recent] == everything[:3], "Cached first page uses the keyset order"
+    rest = db.iter_incidents(after=(recent[-1]['timestamp'], recent[-1]['id']))
+    assert [i['incident']['id'] for i in rest] == everything[3:]
+
+
+if __name__ == '__main__':
+    import tempfile
+    from pathlib import Path
+    print("=" * 60)
+    print("INCIDENT QUERIES TEST")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        test_hydration_uses_fixed_query_count(Path(tmp))
+        print("  ✓ Hydration uses a fixed number of queries")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_recent_incidents_cached_until_write(Path(tmp))
+        print("  ✓ The newest incidents are cached until a write, larger pages are not")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_nearest_incident_probes(Path(tmp))
+        print("  ✓ Nearest incident found by index probes after migration")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_incident_pages_keyset(Path(tmp))
+        print("  ✓ Incident pages follow the (timestamp, id) keyset")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_recent_page_continues_with_cursor(Path(tmp))
+        print("  ✓ A cursor from the cached first page continues the keyset")
+    print("=" * 60)
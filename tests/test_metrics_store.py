@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+"""Test the metrics store: per-second sample blobs, 1 s/1 min/1 h rollups and history resolution"""
+
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from backend.metrics_store import MAX_HISTORY_POINTS, METRIC_NAMES, MetricsStore
+
+START = 1_699_999_200.0  # On an hour boundary
+
+
+def detection_data(value):
+    return {
+        'blur': {'variance': value},
+        'shake': {'magnitude': value + 1},
+        'reposition': {'magnitude': value + 2},
+        'glare': {'dark_pct': value + 3, 'mid_pct': value + 4, 'bright_pct': value + 5},
+        'liveness': {'mean_diff': value + 6, 'mean_brightness': value + 7},
+    }
+
+
+def make_store(tmp_path, now=START + 7200):
+    clock = [now]
+    store = MetricsStore(str(tmp_path / 'metrics.db'), clock=lambda: clock[0])
+    return store, clock
+
+
+def test_completed_seconds_written_with_rollups(tmp_path):
+    store, clock = make_store(tmp_path)
+    # 90 s at 10 fps, blur_variance = frame index
+    for n in range(900):
+        store.record(0, detection_data(float(n)), START + n / 10.0)
+    store.record(0, {'blur': {}}, START)  # Incomplete detection_data is skipped
+    clock[0] = START + 89.95
+    assert store.flush() == 89, "The newest second is held until it completes"
+    assert store.flush(final=True) == 1
+
+    raw = store.history(0, START + 10.0, START + 11.0, resolution='raw', metrics=['blur_variance'])
+    assert raw['timestamps'] == [round(START + 10.0 + i / 10.0, 3) for i in range(10)]
+    assert raw['series']['blur_variance']['values'] == [float(n) for n in range(100, 110)]
+
+    second = store.history(0, START, START + 90.0, resolution='1s')
+    assert len(second['timestamps']) == 90 and second['count'] == [10] * 90
+    assert second['series']['mean_brightness']['min'][5] == 57.0
+    assert second['series']['blur_variance']['max'][5] == 59.0
+
+    minute = store.history(0, START, START + 120.0, resolution='1m', metrics=['blur_variance'])
+    assert minute['timestamps'] == [START, START + 60] and minute['count'] == [600, 300]
+    assert minute['series']['blur_variance']['min'] == [0.0, 600.0]
+    assert minute['series']['blur_variance']['mean'] == [299.5, 749.5]
+
+    hour = store.history(0, START, START + 3600.0, resolution='1h')
+    assert hour['count'] == [900]
+    assert abs(hour['series']['shift_magnitude']['mean'][0] - (449.5 + 2)) < 1e-3
+    assert set(hour['series']) == set(METRIC_NAMES)
+
+
+def test_late_samples_and_stale_seconds(tmp_path):
+    store, clock = make_store(tmp_path)
+    for n in range(20):
+        store.record(1, detection_data(1.0), START + n / 10.0)
+    clock[0] = START + 1.5
+    assert store.flush() == 1
+    store.record(1, detection_data(9.0), START + 0.95)  # Late result for a written second
+    clock[0] = START + 5.0
+    assert store.flush() == 2, "The stopped camera's last second is written once stale"
+    series = store.history(1, START, START + 2.0, resolution='1s', metrics=['blur_variance'])
+    assert series['count'] == [11, 10]
+    assert series['series']['blur_variance']['max'] == [9.0, 1.0]
+
+
+def test_resolution_choice_and_pruning(tmp_path):
+    store, clock = make_store(tmp_path, now=START + 30 * 86400)
+    now = clock[0]
+    assert store.choose_resolution(now - 600, now) == 1
+    assert store.choose_resolution(now - 12 * 3600, now) == 60
+    assert store.choose_resolution(now - 86400, now) == 3600
+    assert store.choose_resolution(now - 8 * 86400, now - 8 * 86400 + 60) == 60, "1 s rollups are gone by then"
+
+    for day in (20, 0):
+        for n in range(30):
+            store.record(0, detection_data(1.0), now - day * 86400 - 100 + n / 10.0)
+    store.flush(final=True)
+    store.prune()
+    with store.connections.read() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM metrics_samples').fetchone()[0] == 3
+        resolutions = dict(conn.execute('SELECT resolution, COUNT(*) FROM metrics_rollups GROUP BY resolution'))
+    assert resolutions == {1: 3, 60: 2, 3600: 2}, "Only the 20-day-old samples and 1 s rollups expire"
+
+    try:
+        store.history(0, now - 60, now, metrics=['not_a_metric'])
+        assert False, "Unknown metrics are rejected"
+    except ValueError:
+        pass
+
+
+def test_failed_flush_is_retried(tmp_path):
+    store, clock = make_store(tmp_path)
+    for n in range(30):
+        store.record(0, detection_data(float(n)), START + n / 10.0)
+    write = store.connections.write
+
+    @contextmanager
+    def locked_write():
+        with write() as conn:
+            yield conn
+            raise sqlite3.OperationalError('database is locked')
+
+    store.connections.write = locked_write
+    clock[0] = START + 4.0  # Every second is complete
+    try:
+        store.flush()
+        assert False, "The failed write raises"
+    except sqlite3.OperationalError:
+        pass
+    store.connections.write = write
+    assert store.stats()['pending'] == 30, "Failed samples are queued again"
+    assert store.flush() == 3
+    assert store.history(0, START, START + 3.0, resolution='1s')['count'] == [10, 10, 10]
+
+
+def test_raw_history_is_clamped(tmp_path):
+    store, clock = make_store(tmp_path)
+    for n in range(3000):
+        store.record(0, detection_data(float(n)), START + n / 30.0)
+    store.flush(final=True)
+    raw = store.history(0, START + 0.5, START + 100.0, resolution='raw', metrics=['blur_variance'])
+    assert len(raw['timestamps']) == MAX_HISTORY_POINTS and raw['truncated']
+    assert raw['series']['blur_variance']['values'][0] == 15.0, "The oldest samples in range come first"
+    rest = store.history(0, raw['timestamps'][-1] + 0.001, START + 100.0, resolution='raw')
+    assert len(rest['timestamps']) == MAX_HISTORY_POINTS and rest['truncated']
+    short = store.history(0, START, START + 10.0, resolution='raw')
+    assert len(short['timestamps']) == 300 and not short['truncated']
+
+
+def test_record_is_cheap(tmp_path):
+    store, _ = make_store(tmp_path)
+    data = detection_data(1.0)
+    store.record(0, data, START)
+    samples = np.empty(2000)
+    for i in range(len(samples)):
+        t = time.perf_counter()
+        store.record(0, data, START + i / 30.0)
+        samples[i] = time.perf_counter() - t
+    assert np.median(samples) < 100e-6, "Well under 1% of a 33 ms frame"
+
+
+if __name__ == '__main__':
+    import tempfile
+    from pathlib import Path
+    print("=" * 60)
+    print("METRICS STORE TEST")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        test_completed_seconds_written_with_rollups(Path(tmp))
+        print("  ✓ Completed seconds written with 1 s/1 min/1 h rollups")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_late_samples_and_stale_seconds(Path(tmp))
+        print("  ✓ Late samples merged, stale seconds written")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_resolution_choice_and_pruning(Path(tmp))
+        print("  ✓ Resolution chosen by range and retention; old rows pruned")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_failed_flush_is_retried(Path(tmp))
+        print("  ✓ A failed flush queues its samples again")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_raw_history_is_clamped(Path(tmp))
+        print("  ✓ Raw history is cut off at MAX_HISTORY_POINTS")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_record_is_cheap(Path(tmp))
+        print("  ✓ record() stays well under 1% of frame time")
+    print("=" * 60)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""Test PipelineSupervisor in thread and process mode, and the SharedFrameRing handover"""
+
+import threading
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+import pytest
+
+from backend.pipeline_supervisor import PipelineSupervisor, SharedFrameRing
+
+RUN_TIMEOUT = 60.0
+
+
+def write_images(directory, sizes, per_size=4):
+    """Noise images: per_size of each (height, width), in filename order."""
+    directory.mkdir()
+    rng = np.random.default_rng(0)
+    for i, (height, width) in enumerate(sizes):
+        for n in range(per_size):
+            cv2.imwrite(str(directory / f'{i}_{n}.png'), rng.integers(0, 256, (height, width, 3), np.uint8))
+    return {'type': 'images', 'directory': str(directory), 'loop': False}
+
+
+def run_to_end(supervisor):
+    """Start, wait for every source to run out, stop. Returns the results seen by on_result."""
+    results = []
+    supervisor.on_result = lambda feed, detection_data, detections, glare_image_path, timestamp: \
+        results.append((feed.camera_id, feed.current_frame.shape, detection_data['frame']))
+    assert supervisor.start()
+    waiter = threading.Thread(target=supervisor.wait, args=(0.05,), daemon=True)
+    waiter.start()
+    waiter.join(RUN_TIMEOUT)
+    assert not waiter.is_alive(), "Pipelines did not stop at the end of their sources"
+    supervisor.stop()
+    return results
+
+
+def test_ring_round_trip_and_lap():
+    ring = SharedFrameRing((4, 6, 3), slots=2)
+    try:
+        reader = SharedFrameRing((4, 6, 3), 2, name=ring.name)
+        slot = ring.write(1, np.full((4, 6, 3), 7, np.uint8), np.full((4, 6, 3), 9, np.uint8))
+        frame, processed = reader.read(slot, 1)
+        assert int(frame[0, 0, 0]) == 7 and int(processed[0, 0, 0]) == 9
+        ring.write(3, frame, processed)  # Same slot, newer frame
+        assert reader.read(slot, 1) is None, "A lapped slot is reported, not returned torn"
+        reader.close()
+    finally:
+        ring.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=ring.name)
+
+
+def test_thread_mode_delivers_results():
+    supervisor = PipelineSupervisor({0: {'type': 'synthetic', 'num_frames': 12},
+                                     1: {'type': 'synthetic', 'num_frames': 8, 'width': 320, 'height': 240}},
+                                    mode='thread', pipeline_options={'analysis_max_width': 160})
+    results = run_to_end(supervisor)
+    assert {camera_id for camera_id, _, _ in results} == {0, 1}
+    assert (1, (240, 320, 3)) in {(camera_id, shape) for camera_id, shape, _ in results}
+    assert supervisor.get_feed(0).snapshot.version == sum(1 for r in results if r[0] == 0)
+    assert all(pipeline.analysis_max_width == 160 for pipeline in supervisor._pipelines.values())
+
+
+def test_process_mode_reattaches_ring_and_unlinks(tmp_path):
+    source = write_images(tmp_path / 'frames', [(120, 160), (90, 200)])
+    supervisor = PipelineSupervisor({0: source}, mode='process')
+    ring_names = []
+    handle_message = supervisor._handle_message
+
+    def record_ready(message):
+        if message[0] == 'ready':
+            ring_names.append(message[2])
+        handle_message(message)
+
+    supervisor._handle_message = record_ready
+    results = run_to_end(supervisor)
+
+    shapes = [shape for _, shape, _ in results]
+    assert (120, 160, 3) in shapes and shapes[-1] == (90, 200, 3), "Frames after the size change arrive"
+    assert len(ring_names) == 2, "A new ring is handed over when the frame shape changes"
+    assert not supervisor._rings and not supervisor.get_feed(0).is_running
+    for name in ring_names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+def test_process_mode_start_notices_dead_worker():
+    # An unknown CameraPipeline option raises in the worker before it can report anything
+    supervisor = PipelineSupervisor({0: {'type': 'synthetic', 'num_frames': 4}}, mode='process',
+                                    pipeline_options={'no_such_option': 1})
+    try:
+        assert not supervisor.start(), "start() succeeds only once a worker has sent its first frame"
+        assert not supervisor.get_feed(0).is_running
+        assert supervisor._processes[0].exitcode != 0
+    finally:
+        supervisor.stop()
+
+
+def test_drain_skips_vanished_ring():
+    supervisor = PipelineSupervisor({0: 'synthetic'}, mode='process')
+    dispatched = []
+    supervisor.on_result = lambda feed, detection_data, *_: dispatched.append(detection_data)
+    ring = SharedFrameRing((4, 6, 3))
+    name = ring.name
+    ring.close()  # The worker exited and unlinked it before the drain got to 'ready'
+
+    supervisor._handle_message(('ready', 0, name, (4, 6, 3), 4))
+    assert 0 not in supervisor._rings
+    supervisor._handle_message(('result', 0, 0, 1, {'frame': 1}, [], None, 1.0))
+    assert dispatched == [{'frame': 1}] and supervisor.get_feed(0).detection_data_cache == {'frame': 1}
+
+
+if __name__ == '__main__':
+    import tempfile
+    from pathlib import Path
+    print("=" * 60)
+    print("PIPELINE SUPERVISOR TEST")
+    print("=" * 60)
+    test_ring_round_trip_and_lap()
+    print("  ✓ Shared frame ring round trip, lap detection and unlink")
+    test_thread_mode_delivers_results()
+    print("  ✓ Thread mode delivers results for every camera")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_process_mode_reattaches_ring_and_unlinks(Path(tmp))
+        print("  ✓ Process mode reattaches the ring after a size change and unlinks on shutdown")
+    test_process_mode_start_notices_dead_worker()
+    print("  ✓ start() fails when a worker dies before its first frame")
+    test_drain_skips_vanished_ring()
+    print("  ✓ Result drain skips a ring that is already gone")
+    print("=" * 60)
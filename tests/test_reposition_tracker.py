@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""Test the per-camera RepositionTracker criteria"""
+
+from backend.tamper_detector import RepositionTracker
+
+THRESHOLD = 7.0
+
+
+def feed(tracker, shifts):
+    """Feed (shift_x, shift_y) pairs and return the detection results."""
+    results = []
+    for shift_x, shift_y in shifts:
+        magnitude = (shift_x ** 2 + shift_y ** 2) ** 0.5
+        results.append(tracker.update(magnitude, shift_x, shift_y, THRESHOLD))
+    return results
+
+
+def test_static_scene_never_triggers():
+    tracker = RepositionTracker()
+    assert not any(feed(tracker, [(0.0, 0.0)] * 40))
+
+
+def test_fast_reposition():
+    tracker = RepositionTracker()
+    # Large jumps: smoothing needs a few frames before 2 of the last 3 exceed 1.8x threshold
+    results = feed(tracker, [(60.0, 0.0)] * 4)
+    assert results[-1], f"Sustained large shift should trigger, got {results}"
+
+
+def test_slow_consistent_reposition():
+    tracker = RepositionTracker()
+    results = feed(tracker, [(6.0, 1.0)] * 12)
+    assert any(results), "Slow consistent pan should trigger"
+
+
+def test_slow_random_directions_do_not_trigger():
+    tracker = RepositionTracker()
+    directions = [(6.0, 0.0), (-6.0, 0.0), (0.0, 6.0), (0.0, -6.0)] * 6
+    assert not any(feed(tracker, directions)), "Back-and-forth motion is not a reposition"
+
+
+def test_trackers_are_independent():
+    moving, still = RepositionTracker(), RepositionTracker()
+    feed(moving, [(60.0, 0.0)] * 6)
+    assert not any(feed(still, [(0.0, 0.0)] * 6))
+    assert len(moving) == 6 and moving.last_smoothed_shift > 0
+    moving.reset()
+    assert len(moving) == 0 and moving.last_smoothed_shift == 0.0
+
+
+def test_ring_buffer_wraps():
+    tracker = RepositionTracker(history=8)
+    feed(tracker, [(60.0, 0.0)] * 20)
+    assert len(tracker) == 8
+    # After a long still period the old burst has aged out of the windows
+    assert not feed(tracker, [(0.0, 0.0)] * 20)[-1]
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("REPOSITION TRACKER TEST")
+    print("=" * 60)
+    test_static_scene_never_triggers()
+    print("  ✓ Static scene never triggers")
+    test_fast_reposition()
+    print("  ✓ Fast reposition")
+    test_slow_consistent_reposition()
+    print("  ✓ Slow consistent reposition")
+    test_slow_random_directions_do_not_trigger()
+    print("  ✓ Inconsistent directions ignored")
+    test_trackers_are_independent()
+    print("  ✓ Trackers are independent per camera")
+    test_ring_buffer_wraps()
+    print("  ✓ Ring buffer wraps")
+    print("=" * 60)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""Test the retention worker: age, row and storage limits, evidence files and vacuum"""
+
+import sqlite3
+
+from backend.database import AegisDatabase
+from backend.retention import RetentionPolicy, RetentionWorker, enable_incremental_vacuum
+
+DAY = 86400.0
+NOW = 1000.0 * DAY
+
+
+def populate(db, storage, days):
+    """One glare incident per day ending today, each with a 1000-byte JPEG and an audio log."""
+    glare_dir = storage / 'glare_images'
+    glare_dir.mkdir(parents=True, exist_ok=True)
+    for age in range(days - 1, -1, -1):
+        t = NOW - age * DAY
+        path = glare_dir / f'glare_{int(t)}.jpg'
+        path.write_bytes(b'\xff' * 1000)
+        incident_id = db.record_detection('glare', t, 'glare')
+        db.add_glare_image(str(path), 40.0, t, incident_id)
+        db.add_audio_log(f'speech {age}', t, incident_id)
+    db.flush()
+
+
+def make_worker(tmp_path, policy, days=10, batch_size=3):
+    db = AegisDatabase(str(tmp_path / 'aegis.db'))
+    storage = tmp_path / 'storage'
+    populate(db, storage, days)
+    worker = RetentionWorker(db, policy, storage_dir=str(storage), batch_size=batch_size, clock=lambda: NOW)
+    return db, storage, worker
+
+
+def storage_bytes(storage):
+    return sum(path.stat().st_size for path in storage.rglob('*') if path.is_file())
+
+
+def count(db, table):
+    with db.connections.read() as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+def test_max_age_deletes_rows_and_files(tmp_path):
+    db, storage, worker = make_worker(tmp_path, RetentionPolicy(4.5, None, None))
+    assert worker.run_once() == 5
+    assert count(db, 'incidents') == count(db, 'glare_images') == count(db, 'audio_logs') == 5
+    assert len(list((storage / 'glare_images').iterdir())) == 5
+    assert worker.deleted_files == 5 and worker.freed_bytes == 5000
+    oldest = min(i['incident']['timestamp'] for i in db.get_recent_incidents(limit=10))
+    assert oldest == NOW - 4 * DAY
+    assert worker.run_once() == 0
+
+
+def test_max_incidents_keeps_newest(tmp_path):
+    db, storage, worker = make_worker(tmp_path, RetentionPolicy(None, 3, None))
+    assert worker.run_once() == 7
+    assert [i['incident']['timestamp'] for i in db.get_recent_incidents(limit=10)] == \
+        [NOW, NOW - DAY, NOW - 2 * DAY]
+
+
+def test_storage_budget_and_open_incident(tmp_path):
+    db, storage, worker = make_worker(tmp_path, RetentionPolicy(None, None, 2500))
+    assert worker.run_once() == 8
+    assert storage_bytes(storage) == 2000
+
+    # The open incident is never pruned, even when storage stays over budget
+    worker.policy.max_storage_bytes = 0
+    worker.run_once()
+    assert count(db, 'incidents') == 1
+    incident_id = db.record_detection('glare', NOW + 1.0, 'glare')
+    db.flush()
+    assert db.get_incident_by_id(incident_id)['incident']['count'] == 2
+
+
+def test_storage_budget_ignores_orphan_files(tmp_path):
+    db, storage, worker = make_worker(tmp_path, RetentionPolicy(None, None, 8500))
+    orphan = storage / 'glare_images' / 'orphan.jpg'
+    orphan.write_bytes(b'\xff' * 50000)  # No row references it
+    assert worker.evidence_bytes() == 10000
+    assert worker.run_once() == 2, "Only referenced evidence counts against the budget"
+    assert orphan.exists() and storage_bytes(storage) == 58000
+
+    # Over budget only through the open incident, older files already gone: one batch, then stop
+    for path in (storage / 'glare_images').glob('glare_*.jpg'):
+        path.unlink()
+    big = storage / 'glare_images' / 'big.jpg'
+    big.write_bytes(b'\xff' * 9000)
+    db.add_glare_image(str(big), 40.0, NOW, db.incidents.open_ids()[0])
+    assert worker.run_once() == 3, "A batch that frees nothing ends the pass"
+    assert count(db, 'incidents') == 5 and big.exists()
+
+
+def test_storage_budget_counts_each_file_once(tmp_path):
+    db, storage, worker = make_worker(tmp_path, RetentionPolicy(None, None, None))
+    outside = tmp_path / 'elsewhere.jpg'
+    outside.write_bytes(b'\xff' * 50000)
+    oldest = db.get_recent_incidents(limit=10)[-1]['incident']
+    db.add_glare_image(str(outside), 40.0, oldest['timestamp'], oldest['id'])
+    shared = db.get_incident_by_id(oldest['id'])['glare_images'][0]['file_path']
+    db.add_glare_image(shared, 40.0, oldest['timestamp'], oldest['id'])
+    assert worker.evidence_bytes() == 10000
+    assert worker._delete_batch(None, max_bytes=2500) == (3, 3000), \
+        "Neither the outside file nor the second reference covers any of the excess"
+    assert outside.exists() and storage_bytes(storage) == 7000
+
+
+def test_files_outside_storage_untouched(tmp_path):
+    db, storage, worker = make_worker(tmp_path, RetentionPolicy(0.5, None, None), days=2)
+    outside = tmp_path / 'elsewhere.jpg'
+    outside.write_bytes(b'\xff' * 10)
+    db.add_glare_image(str(outside), 40.0, NOW - DAY)
+    worker.run_once()
+    assert outside.exists() and worker.deleted_files == 1
+
+
+def test_incremental_vacuum(tmp_path):
+    db, storage, worker = make_worker(tmp_path, RetentionPolicy(0.5, None, None), days=5)
+    with db.connections.read() as conn:
+        assert conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+    with db.connections.write() as conn:
+        conn.executemany('INSERT INTO audio_logs (incident_id, text, timestamp) VALUES (1, ?, ?)',
+                         ((('x' * 2000), NOW - 4 * DAY) for _ in range(500)))
+    with db.connections.read() as conn:
+        pages_before = conn.execute('PRAGMA page_count').fetchone()[0]
+    worker.run_once()
+    with db.connections.read() as conn:
+        assert conn.execute('PRAGMA freelist_count').fetchone()[0] == 0
+        assert conn.execute('PRAGMA page_count').fetchone()[0] < pages_before // 2
+
+
+def test_existing_database_converted(tmp_path):
+    path = str(tmp_path / 'aegis.db')
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('CREATE TABLE incidents (id INTEGER PRIMARY KEY AUTOINCREMENT, incident_type TEXT NOT NULL, '
+                 'primary_detection TEXT NOT NULL, timestamp REAL NOT NULL, count INTEGER DEFAULT 1, '
+                 'description TEXT, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)')
+    conn.close()
+    db = AegisDatabase(path)
+    with db.connections.read() as conn:
+        assert conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 0
+    assert enable_incremental_vacuum(db)
+    # Open connections keep the mode they read at open time; a new one sees the converted file
+    assert sqlite3.connect(path).execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+    assert not enable_incremental_vacuum(AegisDatabase(path)), "Converted only once"
+
+
+if __name__ == '__main__':
+    import tempfile
+    from pathlib import Path
+    print("=" * 60)
+    print("RETENTION TEST")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        test_max_age_deletes_rows_and_files(Path(tmp))
+        print("  ✓ Max age deletes incidents, child rows and files")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_max_incidents_keeps_newest(Path(tmp))
+        print("  ✓ Max incidents keeps the newest")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_storage_budget_and_open_incident(Path(tmp))
+        print("  ✓ Storage budget prunes oldest first, never the open incident")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_storage_budget_ignores_orphan_files(Path(tmp))
+        print("  ✓ Storage budget ignores unreferenced files and stops when nothing is freed")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_storage_budget_counts_each_file_once(Path(tmp))
+        print("  ✓ Storage budget counts each evidence file under storage/ once")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_files_outside_storage_untouched(Path(tmp))
+        print("  ✓ Files outside storage/ are never deleted")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_incremental_vacuum(Path(tmp))
+        print("  ✓ Incremental vacuum returns freed pages")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_existing_database_converted(Path(tmp))
+        print("  ✓ Existing database converted to incremental vacuum")
+    print("=" * 60)